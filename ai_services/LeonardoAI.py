@@ -1,13 +1,41 @@
-import requests
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
+from ai_services.cache import asset_cache
+from ai_services.limits import provider_slot
+from ai_services.http_client import get_session, download_to_file
+from instrumentation.tracing import tracer
+from instrumentation.latency import latency_history, request_shape
 
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv("LEONARDO_API_KEY")
+API_BASE = os.getenv("LEONARDO_API_BASE", "https://cloud.leonardo.ai/api/rest/v1")
 
-def generate_leonardo_image(prompt, unique_id, model_id="photoreal", save_dir="./assets/scenes"):
-    url = "https://cloud.leonardo.ai/api/rest/v1/generations"
+IMAGE_WIDTH = 768
+IMAGE_HEIGHT = 512
+
+# Image generations running at once (on top of the provider's rate limit)
+MAX_IN_FLIGHT = int(os.getenv("LEONARDO_MAX_IN_FLIGHT", 4))
+
+def _cache_key(prompt, model_id, width, height, photo_real):
+    return asset_cache.make_key(
+        "leonardo", prompt, modelId=model_id, width=width, height=height, num_images=1, photoReal=photo_real
+    )
+
+@tracer.traced("leonardo.request", category="provider")
+def _request_generation(prompt, model_id, width, height, photo_real, num_images):
+    """
+    Run one Leonardo generation request.
+
+    Returns:
+        tuple: (URLs of the generated images, which may be fewer than
+        num_images, and the seconds spent waiting for a provider slot).
+    """
+    url = f"{API_BASE}/generations"
     headers = {
         "Authorization": f"Bearer {API_KEY}",
         "Content-Type": "application/json"
@@ -15,28 +43,131 @@ def generate_leonardo_image(prompt, unique_id, model_id="photoreal", save_dir=".
     payload = {
         "prompt": prompt,
         "modelId": model_id,
-        "width": 768,
-        "height": 512,
-        "num_images": 1,
-        "photoReal": True
+        "width": width,
+        "height": height,
+        "num_images": num_images,
+        "photoReal": photo_real
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    with provider_slot("leonardo") as queued:
+        response = get_session().post(url, headers=headers, json=payload)
     response.raise_for_status()
 
     try:
-        image_url = response.json()['generations_by_pk']['generated_images'][0]['url']
+        return [image['url'] for image in response.json()['generations_by_pk']['generated_images']], queued
     except KeyError:
         print("⚠️ Error: Could not find image URL in response.")
+        return [], queued
+
+@tracer.traced("leonardo.image", category="provider")
+def generate_leonardo_image(prompt, unique_id, model_id="photoreal", save_dir="./assets/scenes"):
+    # Return a cached image for an identical request
+    image_path = os.path.join(save_dir, f"{unique_id}_leonardo.jpg")
+    cache_key = _cache_key(prompt, model_id, IMAGE_WIDTH, IMAGE_HEIGHT, True)
+    if asset_cache.fetch(cache_key, image_path):
+        return image_path
+
+    start = time.monotonic()
+    image_urls, queued = _request_generation(prompt, model_id, IMAGE_WIDTH, IMAGE_HEIGHT, True, num_images=1)
+    if not image_urls:
         return None
 
     # Ensure save directory exists
     os.makedirs(save_dir, exist_ok=True)
-    image_path = os.path.join(save_dir, f"{unique_id}_leonardo.jpg")
 
-    # Download and save the image
-    img_data = requests.get(image_url).content
-    with open(image_path, 'wb') as f:
-        f.write(img_data)
+    # Stream the image to disk
+    download_to_file(image_urls[0], image_path)
+    latency_history.record("leonardo", request_shape("image"), time.monotonic() - start - queued)
+
+    asset_cache.store(cache_key, image_path)
+    return image_path
+
+class LeonardoPool:
+    """
+    Runs image requests through a bounded pool of `max_in_flight` workers.
+
+    Requests are sent as soon as they arrive. Leonardo takes one prompt per
+    generation, so there is nothing to gain from holding requests back; an
+    identical request (same prompt and parameters) made while one is running
+    waits for it and gets a copy of its image instead of a second generation.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="leonardo")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, prompt, unique_id, model_id="photoreal", save_dir="./assets/scenes"):
+        """
+        Queue an image request.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the saved image path (or None).
+        """
+        image_path = os.path.join(save_dir, f"{unique_id}_leonardo.jpg")
+        cache_key = _cache_key(prompt, model_id, IMAGE_WIDTH, IMAGE_HEIGHT, True)
+
+        # Cache hits never wait for a worker
+        if asset_cache.fetch(cache_key, image_path):
+            future = Future()
+            future.set_result(image_path)
+            return future
+
+        with self._lock:
+            running = self._in_flight.get(cache_key)
+            if running is None:
+                future = self._in_flight[cache_key] = self._pool.submit(
+                    generate_leonardo_image, prompt, unique_id, model_id, save_dir
+                )
+        if running is not None:
+            return self._copy_when_done(running, cache_key, image_path)
+        future.add_done_callback(lambda _: self._forget(cache_key))
+        return future
+
+    def _forget(self, cache_key):
+        with self._lock:
+            self._in_flight.pop(cache_key, None)
+
+    def _copy_when_done(self, running, cache_key, image_path):
+        # Resolve to a copy of the running request's image under this scene's name
+        future = Future()
+
+        def copy(done):
+            try:
+                shared_path = done.result()
+                if shared_path and not asset_cache.fetch(cache_key, image_path):
+                    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+                    shutil.copyfile(shared_path, image_path)
+                future.set_result(image_path if shared_path else None)
+            except Exception as e:
+                future.set_exception(e)
+
+        running.add_done_callback(copy)
+        return future
+
+def generate_leonardo_images(image_requests, pool=None):
+    """
+    Generate images for many scenes at once.
+
+    Args:
+        image_requests (list): Dicts with the keyword arguments of
+            generate_leonardo_image (prompt, unique_id, model_id, save_dir).
+        pool (LeonardoPool): Pool to use. Defaults to the shared one.
+
+    Returns:
+        list: Saved image paths (None for failures), in request order.
+    """
+    pool = pool or image_pool
+    futures = [pool.submit(**request) for request in image_requests]
+
+    image_paths = []
+    for request, future in zip(image_requests, futures):
+        try:
+            image_paths.append(future.result())
+        except Exception as e:
+            print(f"Failed to generate image for {request['unique_id']}: {e}")
+            image_paths.append(None)
+    return image_paths
 
-    return image_path
\ No newline at end of file
+# Shared pool used by scene processing
+image_pool = LeonardoPool()
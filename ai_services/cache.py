@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+DEFAULT_CACHE_DIR = "./assets/cache"
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+DEFAULT_MAX_AGE_DAYS = 30
+
+class AssetCache:
+    """
+    Content-addressed on-disk cache for generated AI assets.
+
+    Entries are keyed by a hash of the provider, the prompt and every request
+    parameter, and stored as blobs next to a JSON index that records their
+    size and last access time. The index is evicted least-recently-used first
+    once it passes `max_bytes`, and entries older than `max_age_seconds` are
+    dropped. All index access goes through one lock, and blobs and the index
+    are written with atomic renames, so scene threads can share one cache.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age_seconds=DEFAULT_MAX_AGE_DAYS * 86400, enabled=True):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._index = self._load_index() if enabled else {}
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cache configured from ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES,
+        ASSET_CACHE_MAX_AGE_DAYS and ASSET_CACHE_DISABLED.
+        """
+        return cls(
+            cache_dir=os.getenv("ASSET_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("ASSET_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            max_age_seconds=float(os.getenv("ASSET_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)) * 86400,
+            enabled=os.getenv("ASSET_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+        )
+
+    @staticmethod
+    def make_key(provider, prompt, **params):
+        """
+        Hash a request into a cache key.
+
+        Args:
+            provider (str): Name of the AI provider (e.g. "leonardo").
+            prompt (str): Prompt or text sent to the provider.
+            **params: Every other parameter that changes the generated asset.
+
+        Returns:
+            str: Hex digest identifying the request.
+        """
+        payload = json.dumps({"provider": provider, "prompt": prompt, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, key, dest_path):
+        """
+        Copy a cached asset to dest_path.
+
+        Args:
+            key (str): Cache key from make_key.
+            dest_path (str): Where the caller expects the asset.
+
+        Returns:
+            str or None: dest_path on a hit, None on a miss.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+            if not entry:
+                return None
+            blob_path = os.path.join(self.blob_dir, entry["blob"])
+            if not os.path.exists(blob_path) or self._expired(entry, time.time()):
+                self._remove_entry(key)
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+            # Link while holding the lock so eviction cannot remove the blob underneath us
+            self._materialize(blob_path, dest_path)
+        print(f"Cache hit for {os.path.basename(dest_path)}")
+        return dest_path
+
+    def store(self, key, src_path):
+        """
+        Add a freshly generated asset to the cache.
+
+        Args:
+            key (str): Cache key from make_key.
+            src_path (str): Path of the generated asset. The file is left in place.
+        """
+        if not self.enabled or not src_path or not os.path.exists(src_path):
+            return
+        os.makedirs(self.blob_dir, exist_ok=True)
+        blob_name = key + os.path.splitext(src_path)[1]
+        blob_path = os.path.join(self.blob_dir, blob_name)
+        temp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(src_path, temp_path)
+        os.replace(temp_path, blob_path)
+
+        now = time.time()
+        with self._lock:
+            self._index[key] = {
+                "blob": blob_name,
+                "size": os.path.getsize(blob_path),
+                "created": now,
+                "last_access": now
+            }
+            self._evict(now)
+            self._save_index()
+
+    def _expired(self, entry, now):
+        return self.max_age_seconds is not None and now - entry["created"] > self.max_age_seconds
+
+    def _evict(self, now):
+        for key in [k for k, entry in self._index.items() if self._expired(entry, now)]:
+            self._remove_entry(key)
+        if self.max_bytes is None:
+            return
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._remove_entry(key)
+
+    def _remove_entry(self, key):
+        entry = self._index.pop(key, None)
+        if entry:
+            blob_path = os.path.join(self.blob_dir, entry["blob"])
+            try:
+                os.remove(blob_path)
+            except FileNotFoundError:
+                pass
+
+    def _materialize(self, blob_path, dest_path):
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError:
+            shutil.copyfile(blob_path, dest_path)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+# Shared cache used by all ai_services generators
+asset_cache = AssetCache.from_env()
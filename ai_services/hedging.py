@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from instrumentation.latency import latency_history
+
+# A duplicate request goes out once a call runs past this percentile of its history
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 95))
+# Samples a request shape needs before its percentile is trusted enough to pay for a hedge
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+HEDGING_ENABLED = os.getenv("HEDGING_DISABLED", "").lower() not in ("1", "true", "yes")
+# Worker threads per provider for hedged calls
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", 16))
+
+# One pool per provider, so requests abandoned at a deadline or lost to a hedge
+# (e.g. a Veo3 job still polling) never delay calls to the other providers
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _pool(provider):
+    with _pools_lock:
+        if provider not in _pools:
+            _pools[provider] = {
+                "executor": ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix=f"hedge-{provider}"),
+                "busy": 0
+            }
+        return _pools[provider]
+
+def _submit(provider, fn):
+    pool = _pool(provider)
+
+    def finished(_):
+        with _pools_lock:
+            pool["busy"] -= 1
+
+    with _pools_lock:
+        pool["busy"] += 1
+    future = pool["executor"].submit(fn)
+    # Also runs for requests cancelled before they started
+    future.add_done_callback(finished)
+    return future
+
+def _has_spare_worker(provider):
+    pool = _pool(provider)
+    with _pools_lock:
+        return pool["busy"] < HEDGE_WORKERS
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a call has no result by its deadline.
+    """
+
+def time_left(deadline):
+    """
+    Seconds until a time.monotonic() deadline (never negative), or None without a deadline.
+    """
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+def hedged_call(provider, shape, call, hedge=None, deadline=None, history=latency_history):
+    """
+    Run a provider call with a hedge and a deadline.
+
+    When `call` is still running after the HEDGE_PERCENTILE latency of its
+    provider and request shape (see LatencyHistory), `hedge` is started as
+    a duplicate request and the first successful result wins; the other
+    request is left to finish in the background and its result is dropped.
+    Shapes with fewer than HEDGE_MIN_SAMPLES samples are never hedged, and
+    neither are calls whose provider pool has no free worker for the hedge.
+
+    Args:
+        provider (str): Provider name in the latency history, e.g. "veo3".
+        shape (str): Request shape (see request_shape).
+        call (callable): The request; returns the result, or None on failure.
+        hedge (callable): The duplicate request (e.g. with another output
+            name). Without it, the call is only bounded by the deadline.
+        deadline (float): time.monotonic() time by which a result is needed.
+        history (LatencyHistory): Where the hedge threshold comes from.
+
+    Returns:
+        The first non-None result, or None if every request failed.
+
+    Raises:
+        DeadlineExceeded: If no request succeeded by the deadline.
+        Exception: The last error, if every request raised.
+    """
+    hedge_after = None
+    if hedge is not None and HEDGING_ENABLED and history.sample_count(provider, shape) >= HEDGE_MIN_SAMPLES:
+        hedge_after = time.monotonic() + history.percentile(provider, shape, HEDGE_PERCENTILE)
+    pending = {_submit(provider, call)}
+    hedged = False
+    error = None
+    try:
+        while True:
+            timeouts = [time_left(deadline)]
+            if hedge_after is not None and not hedged:
+                timeouts.append(time_left(hedge_after))
+            timeouts = [timeout for timeout in timeouts if timeout is not None]
+            done, pending = wait(pending, timeout=min(timeouts) if timeouts else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif future.result() is not None:
+                    if hedged:
+                        print(f"{provider} request finished after hedging")
+                    return future.result()
+            if not pending and (hedged or hedge_after is None or done):
+                # Every request failed; a failed call is not retried here
+                if error is not None:
+                    raise error
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceeded(f"{provider} request missed its deadline")
+            if hedge_after is not None and not hedged and time.monotonic() >= hedge_after:
+                hedged = True
+                if _has_spare_worker(provider):
+                    print(f"{provider} request is slower than its p{HEDGE_PERCENTILE:g}, sending a hedge request")
+                    pending.add(_submit(provider, hedge))
+                else:
+                    print(f"{provider} request is slower than its p{HEDGE_PERCENTILE:g}, but no worker is free to hedge it")
+    finally:
+        # Requests that never started are dropped; running ones finish in the background
+        for future in pending:
+            future.cancel()
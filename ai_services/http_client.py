@@ -0,0 +1,216 @@
+import os
+import random
+import threading
+import time
+import uuid
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation.tracing import tracer
+
+# Number of hosts to keep pools for, and connections kept alive per host
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 16))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 32))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+def _trace_response(response, *args, **kwargs):
+    """
+    Session response hook: attach the HTTP status to the caller's open span.
+    """
+    span = tracer.current()
+    span.set(http_status=response.status_code)
+    span.add("http_requests", 1)
+
+def get_session():
+    """
+    Return the process-wide requests session.
+
+    The session keeps a keep-alive connection pool per host, so repeated calls
+    to the same provider reuse TCP+TLS connections instead of opening new ones.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.hooks["response"].append(_trace_response)
+            _session = session
+        return _session
+
+def save_response_to_file(response, dest_path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Stream a response body to disk in chunks, then atomically rename it into place.
+
+    Args:
+        response (requests.Response): Response opened with stream=True.
+        dest_path (str): Final path of the file.
+        chunk_size (int): Bytes read per chunk.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    temp_path = f"{dest_path}.{uuid.uuid4().hex}.part"
+    written = 0
+    try:
+        with open(temp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+        os.replace(temp_path, dest_path)
+    finally:
+        response.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        tracer.current().add("bytes_downloaded", written)
+    return written
+
+def download_to_file(url, dest_path, chunk_size=DOWNLOAD_CHUNK_SIZE, **kwargs):
+    """
+    Download a URL to disk without buffering the whole body in memory.
+
+    Args:
+        url (str): URL to download.
+        dest_path (str): Final path of the file.
+        chunk_size (int): Bytes read per chunk.
+        **kwargs: Extra arguments for requests (e.g. headers, timeout).
+
+    Returns:
+        str: dest_path.
+
+    Raises:
+        requests.HTTPError: If the server does not return a success status.
+    """
+    with tracer.span("download", category="http", url=url):
+        response = get_session().get(url, stream=True, **kwargs)
+        if not response.ok:
+            response.close()
+            response.raise_for_status()
+        save_response_to_file(response, dest_path, chunk_size=chunk_size)
+    return dest_path
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Zero-based retry attempt.
+        base (float): Delay scale in seconds.
+        cap (float): Maximum delay in seconds.
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def _partial_total(response):
+    # Total size from a 416 response's "Content-Range: bytes */<total>", or None
+    value = response.headers.get("Content-Range", "")
+    total = value.rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+def remove_partial(partial_path):
+    """
+    Delete a partial download and the resume key stored with it.
+    """
+    for path in (partial_path, f"{partial_path}.key"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def download_with_resume(url, dest_path, partial_path=None, max_retries=5, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                         resume_key=None, **kwargs):
+    """
+    Download a URL to disk, resuming with HTTP Range requests after a dropped connection.
+
+    Bytes already in `partial_path` are kept, so a download interrupted by a
+    crash can be resumed by a later run that passes the same partial path.
+    The resume key (e.g. a job ID, defaulting to the URL) is stored next to
+    the partial file, and bytes left by a different download are discarded
+    instead of being continued.
+
+    Args:
+        url (str): URL to download.
+        dest_path (str): Final path of the file.
+        partial_path (str): Where the incomplete download is kept. Defaults to dest_path + ".part".
+        max_retries (int): Retries after connection errors or server errors.
+        chunk_size (int): Bytes read per chunk.
+        resume_key (str): What the partial bytes belong to. Defaults to the URL.
+        **kwargs: Extra arguments for requests (e.g. headers, timeout).
+
+    Returns:
+        str: dest_path.
+
+    Raises:
+        requests.RequestException: If the download still fails after all retries.
+    """
+    partial_path = partial_path or f"{dest_path}.part"
+    os.makedirs(os.path.dirname(partial_path) or ".", exist_ok=True)
+    key_path = f"{partial_path}.key"
+    resume_key = str(resume_key or url)
+    try:
+        with open(key_path, "r") as f:
+            stored_key = f.read()
+    except FileNotFoundError:
+        stored_key = None
+    if stored_key != resume_key:
+        # Bytes of another download (or of unknown origin) must never be continued
+        remove_partial(partial_path)
+        with open(key_path, "w") as f:
+            f.write(resume_key)
+    base_headers = kwargs.pop("headers", {})
+    session = get_session()
+
+    with tracer.span("download", category="http", url=url, resumable=True) as span:
+        for attempt in range(max_retries + 1):
+            offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            headers = dict(base_headers)
+            # Byte offsets must refer to the raw body, not a decompressed one
+            headers.setdefault("Accept-Encoding", "identity")
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            try:
+                response = session.get(url, stream=True, headers=headers, **kwargs)
+                try:
+                    if response.status_code == 416 and offset:
+                        if _partial_total(response) == offset:
+                            # Nothing left to fetch: the partial file is already complete
+                            break
+                        # The partial file does not match this resource: start over
+                        os.remove(partial_path)
+                        raise requests.ConnectionError(f"Range not satisfiable at byte {offset}, restarting")
+                    if response.status_code >= 500:
+                        raise requests.HTTPError(f"Server error {response.status_code}", response=response)
+                    response.raise_for_status()
+
+                    # 206 continues the partial file, 200 means the server restarted from zero
+                    mode = "ab" if offset and response.status_code == 206 else "wb"
+                    expected = response.headers.get("Content-Length")
+                    received = 0
+                    with open(partial_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                received += len(chunk)
+                    span.add("bytes_downloaded", received)
+                    if expected is not None and received < int(expected):
+                        raise requests.ConnectionError(f"Connection closed after {received} of {expected} bytes")
+                    break
+                finally:
+                    response.close()
+            except requests.RequestException as e:
+                status = getattr(e.response, "status_code", None) if isinstance(e, requests.HTTPError) else None
+                if attempt == max_retries or (status is not None and status < 500):
+                    raise
+                span.add("retries", 1)
+                delay = backoff_delay(attempt)
+                print(f"Download of {url} interrupted ({e}), resuming in {delay:.1f}s")
+                time.sleep(delay)
+
+    os.replace(partial_path, dest_path)
+    remove_partial(partial_path)
+    return dest_path
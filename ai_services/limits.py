@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Default per-provider limits, overridable from PROVIDER_LIMITS_FILE or
+# <PROVIDER>_MAX_CONCURRENCY / <PROVIDER>_RATE_PER_MINUTE environment variables
+DEFAULT_LIMITS = {
+    "openai": {"max_concurrency": 4, "rate_per_minute": 60},
+    "leonardo": {"max_concurrency": 4, "rate_per_minute": 60},
+    "veo3": {"max_concurrency": 2, "rate_per_minute": 10},
+    "elevenlabs": {"max_concurrency": 4, "rate_per_minute": 100},
+    "suno": {"max_concurrency": 2, "rate_per_minute": 20},
+}
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter. Tokens refill continuously at `rate_per_minute`
+    up to `capacity`; acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, int(self.rate_per_second))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+            time.sleep(wait)
+
+class ProviderLimiter:
+    """
+    Concurrency cap plus rate limit for a single provider. Callers that go
+    over either limit wait in line instead of failing.
+    """
+
+    def __init__(self, name, max_concurrency, rate_per_minute=None, burst=None):
+        self.name = name
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_minute, burst) if rate_per_minute else None
+
+    @contextmanager
+    def slot(self):
+        with self._semaphore:
+            if self._bucket:
+                self._bucket.acquire()
+            yield
+
+def load_limits():
+    """
+    Resolve the limits for every provider.
+
+    Returns:
+        dict: provider name -> {"max_concurrency", "rate_per_minute", "burst"}.
+    """
+    limits = {name: dict(values) for name, values in DEFAULT_LIMITS.items()}
+
+    config_file = os.getenv("PROVIDER_LIMITS_FILE")
+    if config_file:
+        try:
+            with open(config_file, "r") as f:
+                for name, values in json.load(f).items():
+                    limits.setdefault(name, {}).update(values)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading provider limits from {config_file}: {e}")
+
+    for name, values in limits.items():
+        prefix = name.upper()
+        if os.getenv(f"{prefix}_MAX_CONCURRENCY"):
+            values["max_concurrency"] = int(os.getenv(f"{prefix}_MAX_CONCURRENCY"))
+        if os.getenv(f"{prefix}_RATE_PER_MINUTE"):
+            values["rate_per_minute"] = float(os.getenv(f"{prefix}_RATE_PER_MINUTE"))
+        if os.getenv(f"{prefix}_BURST"):
+            values["burst"] = int(os.getenv(f"{prefix}_BURST"))
+    return limits
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider):
+    """
+    Return the shared limiter for a provider, creating it on first use.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            values = load_limits().get(provider, {})
+            _limiters[provider] = ProviderLimiter(
+                provider,
+                max_concurrency=values.get("max_concurrency", 4),
+                rate_per_minute=values.get("rate_per_minute"),
+                burst=values.get("burst")
+            )
+        return _limiters[provider]
+
+@contextmanager
+def provider_slot(provider):
+    """
+    Hold one request slot for a provider for the duration of the block.
+
+    Args:
+        provider (str): Provider name, e.g. "leonardo", "veo3", "elevenlabs", "suno".
+
+    Yields:
+        float: Seconds spent waiting for the slot, so callers can leave the
+        wait out of the provider's latency.
+    """
+    queued = time.monotonic()
+    with get_limiter(provider).slot():
+        yield time.monotonic() - queued
@@ -1,11 +1,18 @@
-import requests
 import os
+import time
 from dotenv import load_dotenv
+from ai_services.cache import asset_cache
+from ai_services.limits import provider_slot
+from ai_services.http_client import get_session, save_response_to_file
+from instrumentation.tracing import tracer
+from instrumentation.latency import latency_history, request_shape
 
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv("SUNO_API_KEY")
+API_BASE = os.getenv("SUNO_API_BASE", "https://api.suno.ai/v1")  # Hypothetical endpoint
 
+@tracer.traced("suno.music", category="provider")
 def generate_suno_music_and_save(
     prompt: str,
     unique_id: str,
@@ -32,7 +39,7 @@ def generate_suno_music_and_save(
         str: Path to the saved audio file.
     """
 
-    url = "https://api.suno.ai/v1/generate-music"  # Hypothetical endpoint
+    url = f"{API_BASE}/generate-music"
 
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -48,7 +55,15 @@ def generate_suno_music_and_save(
         "duration_seconds": duration_seconds
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    # Return cached music for an identical request
+    file_path = os.path.join(save_dir, f"{unique_id}_suno.mp3")
+    cache_key = asset_cache.make_key("suno", prompt, genre=genre, mood=mood, duration=duration_seconds)
+    if asset_cache.fetch(cache_key, file_path):
+        return file_path
+
+    start = time.monotonic()
+    with provider_slot("suno") as queued:
+        response = get_session().post(url, headers=headers, json=payload)
     if response.status_code != 200:
         raise Exception(f"Error generating music: {response.status_code} {response.text}")
 
@@ -60,16 +75,14 @@ def generate_suno_music_and_save(
     # Make sure save directory exists
     os.makedirs(save_dir, exist_ok=True)
 
-    # Prepare local file path
-    local_filename = f"{unique_id}_suno.mp3"
-    file_path = os.path.join(save_dir, local_filename)
-
-    # Download the audio content and save locally
-    audio_response = requests.get(music_url)
+    # Stream the audio content to disk
+    audio_response = get_session().get(music_url, stream=True)
     if audio_response.status_code != 200:
+        audio_response.close()
         raise Exception(f"Failed to download audio file: {audio_response.status_code}")
 
-    with open(file_path, "wb") as f:
-        f.write(audio_response.content)
+    save_response_to_file(audio_response, file_path)
+    latency_history.record("suno", request_shape("music", duration_seconds), time.monotonic() - start - queued)
 
+    asset_cache.store(cache_key, file_path)
     return file_path
\ No newline at end of file
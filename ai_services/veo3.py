@@ -1,63 +1,259 @@
-import requests
+import json
 import os
+import shutil
+import threading
+import time
+import requests
+from concurrent.futures import Future
 from dotenv import load_dotenv
+from ai_services.cache import asset_cache
+from ai_services.limits import provider_slot
+from ai_services.http_client import get_session, backoff_delay, download_with_resume, remove_partial
+from instrumentation.tracing import tracer
+from instrumentation.latency import latency_history, request_shape
 
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv("VEO3_API_KEY")
+API_BASE = os.getenv("VEO3_API_BASE", "https://api.veo3.com/v1")  # Example endpoint, replace with actual Veo3 API URL
+
+# Submitted jobs are persisted here so a crashed run can pick up finished generations
+JOBS_DIR = os.getenv("VEO3_JOBS_DIR", "./assets/jobs/veo3")
+POLL_TIMEOUT = float(os.getenv("VEO3_POLL_TIMEOUT", 900))
+_jobs_lock = threading.Lock()
+
+# Identical requests running at the same time share one job and one download
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+class Veo3JobError(RuntimeError):
+    """
+    Raised when Veo3 reports that a job failed or no longer exists.
+    """
+
+def _headers():
+    return {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+def _jobs_file():
+    return os.path.join(JOBS_DIR, "jobs.json")
+
+def _load_jobs():
+    try:
+        with open(_jobs_file(), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _update_job(key, record):
+    """
+    Persist (or with record=None, forget) a submitted job under its request key.
+    """
+    with _jobs_lock:
+        jobs = _load_jobs()
+        if record is None:
+            jobs.pop(key, None)
+        else:
+            jobs[key] = record
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        temp_path = f"{_jobs_file()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(jobs, f)
+        os.replace(temp_path, _jobs_file())
+
+def _partial_path(job_id):
+    # Keyed by job, so a resubmitted request never continues another generation's bytes
+    return os.path.join(JOBS_DIR, f"{job_id}.mp4.part")
+
+def _forget_job(key, job_id):
+    """
+    Drop a job record and its partial download.
+    """
+    _update_job(key, None)
+    if job_id:
+        remove_partial(_partial_path(job_id))
+
+def submit_veo3_job(prompt, duration_seconds):
+    """
+    Submit a generation job to Veo3.
+
+    Args:
+        prompt (str): Description for the video generation.
+        duration_seconds (int): Duration of the video in seconds.
+
+    Returns:
+        dict: The API response, with either a "job_id" to poll or a ready "video_url".
+
+    Raises:
+        requests.HTTPError: If the API rejects the request.
+    """
+    return _submit_job(prompt, duration_seconds)[0]
+
+@tracer.traced("veo3.submit", category="provider")
+def _submit_job(prompt, duration_seconds):
+    # Also returns the seconds spent waiting for a provider slot
+    payload = {
+        "prompt": prompt,
+        "duration": duration_seconds
+    }
+    with provider_slot("veo3") as queued:
+        response = get_session().post(f"{API_BASE}/generate", headers=_headers(), json=payload)
+    if response.status_code not in (200, 201, 202):
+        raise requests.HTTPError(f"Error generating video: {response.status_code} - {response.text}", response=response)
+    return response.json(), queued
 
-def generate_veo3_video(prompt, duration_seconds, unique_id, save_dir="./assets/scenes"):
+@tracer.traced("veo3.poll", category="provider")
+def poll_veo3_job(job_id, timeout=POLL_TIMEOUT):
+    """
+    Poll a Veo3 job with exponential backoff and jitter until it finishes.
+
+    Args:
+        job_id (str): Job identifier returned by submit_veo3_job.
+        timeout (float): Seconds to wait before giving up.
+
+    Returns:
+        str: URL of the generated video.
+
+    Raises:
+        Veo3JobError: If the job fails or is unknown to the API.
+        TimeoutError: If the job does not finish within `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        try:
+            response = get_session().get(f"{API_BASE}/jobs/{job_id}", headers=_headers())
+            if response.status_code == 200:
+                job = response.json()
+                status = job.get("status")
+                if status in ("completed", "succeeded") and job.get("video_url"):
+                    return job["video_url"]
+                if status in ("failed", "error", "cancelled"):
+                    raise Veo3JobError(f"Veo3 job {job_id} {status}: {job.get('error')}")
+            elif response.status_code == 404:
+                raise Veo3JobError(f"Veo3 job {job_id} not found")
+            elif response.status_code < 500 and response.status_code != 429:
+                raise Veo3JobError(f"Error polling Veo3 job {job_id}: {response.status_code} - {response.text}")
+        except requests.RequestException as e:
+            print(f"Error polling Veo3 job {job_id}: {e}")
+
+        delay = backoff_delay(attempt, base=2.0, cap=30.0)
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Veo3 job {job_id} did not finish within {timeout}s")
+        time.sleep(delay)
+        attempt += 1
+
+@tracer.traced("veo3.video", category="provider")
+def generate_veo3_video(prompt, duration_seconds, unique_id, save_dir="./assets/scenes", resume=True):
     """
     Generate a video using Veo3 API and save it locally.
 
+    The request is submitted as a job and polled until done. The job ID is
+    persisted under JOBS_DIR, so an identical request in a later run resumes
+    the existing job instead of paying for a new generation, and the download
+    resumes from the bytes already on disk. Identical requests made while
+    one is running wait for it and get a copy of its video, so they never
+    share a job record or a partial download.
+
     Args:
         prompt (str): Description for the video generation.
         duration_seconds (int): Duration of the video in seconds (max depends on API limits).
         unique_id (str): Unique identifier for naming the saved video.
         save_dir (str): Directory to save the video file.
+        resume (bool): Resume and persist the job of an identical request.
+            Hedge requests pass False, so they submit a new job instead of
+            polling the one they duplicate.
 
     Returns:
         str or None: Path to the saved video file if successful, else None.
     """
+    # Return a cached video for an identical request
+    video_path = os.path.join(save_dir, f"{unique_id}_veo.mp4")
+    cache_key = asset_cache.make_key("veo3", prompt, duration=duration_seconds)
+    if asset_cache.fetch(cache_key, video_path):
+        return video_path
+    if not resume:
+        return _generate_video(prompt, duration_seconds, cache_key, video_path, save_dir, resume=False)
 
-    url = "https://api.veo3.com/v1/generate"  # Example endpoint, replace with actual Veo3 API URL
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "prompt": prompt,
-        "duration": duration_seconds
-    }
+    with _in_flight_lock:
+        future = _in_flight.get(cache_key)
+        owner = future is None
+        if owner:
+            future = _in_flight[cache_key] = Future()
+    if not owner:
+        print("Waiting for an identical Veo3 request already in flight")
+        shared_path = future.result()
+        if shared_path is None:
+            return None
+        if not asset_cache.fetch(cache_key, video_path):
+            os.makedirs(save_dir, exist_ok=True)
+            shutil.copyfile(shared_path, video_path)
+        return video_path
 
-    response = requests.post(url, headers=headers, json=payload)
+    try:
+        video_path = _generate_video(prompt, duration_seconds, cache_key, video_path, save_dir, resume=True)
+        future.set_result(video_path)
+        return video_path
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(cache_key, None)
 
-    if response.status_code != 200:
-        print(f"Error generating video: {response.status_code} - {response.text}")
-        return None
+def _generate_video(prompt, duration_seconds, cache_key, video_path, save_dir, resume):
+    """
+    Submit (or resume), poll and download one Veo3 generation.
 
-    # Assuming response JSON has a field with direct video URL
+    Returns:
+        str or None: video_path if successful, else None.
+    """
+    job = _load_jobs().get(cache_key) if resume else None
+    job_id = job["job_id"] if job else None
+    start = time.monotonic()
+    queued = 0.0
     try:
-        video_url = response.json().get("video_url")
-        if not video_url:
-            print("Video URL not found in API response.")
-            return None
+        if job:
+            print(f"Resuming Veo3 job {job_id}")
+            video_url = poll_veo3_job(job_id)
+        else:
+            response, queued = _submit_job(prompt, duration_seconds)
+            video_url = response.get("video_url")
+            if not video_url:
+                job_id = response.get("job_id") or response.get("id")
+                if not job_id:
+                    print("Video URL not found in API response.")
+                    return None
+                if resume:
+                    _update_job(cache_key, {"job_id": job_id, "submitted": time.time()})
+                video_url = poll_veo3_job(job_id)
     except Exception as e:
-        print(f"Error parsing response JSON: {e}")
+        print(f"Error generating video: {e}")
+        # Forget jobs that failed on the provider side; timed-out jobs stay resumable
+        if isinstance(e, Veo3JobError) and resume:
+            _forget_job(cache_key, job_id)
         return None
 
     # Prepare save directory and filename
     os.makedirs(save_dir, exist_ok=True)
-    video_path = os.path.join(save_dir, f"{unique_id}_veo.mp4")
 
-    # Download the video file
-    video_resp = requests.get(video_url, stream=True)
-    if video_resp.status_code == 200:
-        with open(video_path, 'wb') as f:
-            for chunk in video_resp.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"Video saved to {video_path}")
-        return video_path
-    else:
-        print(f"Error downloading video: {video_resp.status_code}")
-        return None
\ No newline at end of file
+    # Download the video file, resuming any partial download from an earlier run
+    try:
+        # Only a persisted job can be resumed by a later run; other downloads
+        # (hedges, videos returned without a job) keep their partial next to video_path
+        partial_path = _partial_path(job_id) if resume and job_id else None
+        download_with_resume(video_url, video_path, partial_path=partial_path, resume_key=job_id)
+    except requests.RequestException as e:
+        print(f"Error downloading video: {e}")
+        return None
+
+    print(f"Video saved to {video_path}")
+    if not job:
+        # A resumed job only shows part of the generation time
+        latency_history.record("veo3", request_shape("video", duration_seconds), time.monotonic() - start - queued)
+    asset_cache.store(cache_key, video_path)
+    if resume:
+        _update_job(cache_key, None)
+    return video_path
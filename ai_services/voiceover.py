@@ -1,10 +1,18 @@
-import requests
 import os
+import json
+import time
+import base64
 from dotenv import load_dotenv
+from ai_services.cache import asset_cache
+from ai_services.limits import provider_slot
+from ai_services.http_client import get_session, save_response_to_file
+from instrumentation.tracing import tracer
+from instrumentation.latency import latency_history, request_shape
 
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv("ELEVENLABS_API_KEY")
+API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io/v1")
 
 # Mapping of (gender, style) to VOICE_ID (replace with actual IDs from ElevenLabs Voice Library)
 VOICE_ID_MAP = {
@@ -20,6 +28,18 @@ VOICE_ID_MAP = {
 
 DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Default fallback voice (male, calm)
 
+VOICE_SETTINGS = {
+    "stability": 0.75,
+    "similarity_boost": 0.75
+}
+
+def voice_id_for(voice_gender="male", voice_style="calm"):
+    """
+    ElevenLabs voice ID for a (gender, style) pair, or DEFAULT_VOICE_ID.
+    """
+    return VOICE_ID_MAP.get((str(voice_gender).lower(), str(voice_style).lower()), DEFAULT_VOICE_ID)
+
+@tracer.traced("elevenlabs.voiceover", category="provider")
 def generate_voiceover(text, unique_id, voice_gender="male", voice_style="calm", save_dir="./assets/audio"):
     """
     Generate a voiceover using ElevenLabs API with specified gender and style.
@@ -35,11 +55,10 @@ def generate_voiceover(text, unique_id, voice_gender="male", voice_style="calm",
         str or None: Path to the saved audio file if successful, else None.
     """
     # Select VOICE_ID based on gender and style
-    voice_key = (voice_gender.lower(), voice_style.lower())
-    voice_id = VOICE_ID_MAP.get(voice_key, DEFAULT_VOICE_ID)
+    voice_id = voice_id_for(voice_gender, voice_style)
     print(f"Using voice ID {voice_id} for gender={voice_gender}, style={voice_style}")
 
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    url = f"{API_BASE}/text-to-speech/{voice_id}"
 
     headers = {
         "Accept": "audio/mpeg",
@@ -49,21 +68,91 @@ def generate_voiceover(text, unique_id, voice_gender="male", voice_style="calm",
 
     data = {
         "text": text,
-        "voice_settings": {
-            "stability": 0.75,
-            "similarity_boost": 0.75
-        }
+        "voice_settings": VOICE_SETTINGS
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    # Return a cached voiceover for an identical request
+    output_path = os.path.join(save_dir, f"{unique_id}_eventlabs.mp3")
+    cache_key = asset_cache.make_key("elevenlabs", text, voice_id=voice_id, voice_settings=data["voice_settings"])
+    if asset_cache.fetch(cache_key, output_path):
+        return output_path
+
+    start = time.monotonic()
+    with provider_slot("elevenlabs") as queued:
+        response = get_session().post(url, headers=headers, json=data, stream=True)
 
     if response.status_code == 200:
-        os.makedirs(save_dir, exist_ok=True)
-        output_path = os.path.join(save_dir, f"{unique_id}_eventlabs.mp3")
-        with open(output_path, "wb") as f:
-            f.write(response.content)
+        save_response_to_file(response, output_path)
+        latency_history.record("elevenlabs", request_shape("text", text=text), time.monotonic() - start - queued)
         print(f"Voiceover saved to {output_path}")
+        asset_cache.store(cache_key, output_path)
         return output_path
     else:
         print(f"Error generating voiceover: {response.status_code}, {response.text}")
-        return None
\ No newline at end of file
+        return None
+
+@tracer.traced("elevenlabs.voiceover_timestamps", category="provider")
+def generate_voiceover_with_timestamps(text, unique_id, voice_id=DEFAULT_VOICE_ID, save_dir="./assets/audio"):
+    """
+    Generate a voiceover together with its character alignment.
+
+    Uses the ElevenLabs with-timestamps endpoint, which returns the audio
+    (base64) and the start and end time of every character of `text`.
+
+    Args:
+        text (str): The text to convert to speech.
+        unique_id (str): Unique identifier for the output file.
+        voice_id (str): ElevenLabs voice ID (see voice_id_for).
+        save_dir (str): Directory to save the audio file.
+
+    Returns:
+        tuple: (audio path, alignment dict with "characters",
+        "character_start_times_seconds" and "character_end_times_seconds"),
+        or (None, None) on failure.
+    """
+    url = f"{API_BASE}/text-to-speech/{voice_id}/with-timestamps"
+
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "xi-api-key": API_KEY
+    }
+
+    data = {
+        "text": text,
+        "voice_settings": VOICE_SETTINGS
+    }
+
+    # The audio and its alignment are cached as two entries of the same request
+    output_path = os.path.join(save_dir, f"{unique_id}_eventlabs.mp3")
+    alignment_path = os.path.join(save_dir, f"{unique_id}_alignment.json")
+    cache_key = asset_cache.make_key("elevenlabs", text, voice_id=voice_id, voice_settings=VOICE_SETTINGS)
+    alignment_key = asset_cache.make_key("elevenlabs.alignment", text, voice_id=voice_id, voice_settings=VOICE_SETTINGS)
+    if asset_cache.fetch(alignment_key, alignment_path) and asset_cache.fetch(cache_key, output_path):
+        with open(alignment_path, "r") as f:
+            return output_path, json.load(f)
+
+    start = time.monotonic()
+    with provider_slot("elevenlabs") as queued:
+        response = get_session().post(url, headers=headers, json=data)
+
+    if response.status_code != 200:
+        print(f"Error generating voiceover: {response.status_code}, {response.text}")
+        return None, None
+
+    result = response.json()
+    alignment = result.get("alignment") or result.get("normalized_alignment")
+    if not result.get("audio_base64") or not alignment:
+        print("Error generating voiceover: response has no audio or alignment")
+        return None, None
+
+    os.makedirs(save_dir, exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(base64.b64decode(result["audio_base64"]))
+    with open(alignment_path, "w") as f:
+        json.dump(alignment, f)
+    latency_history.record("elevenlabs", request_shape("text", text=text), time.monotonic() - start - queued)
+    print(f"Voiceover saved to {output_path}")
+    asset_cache.store(cache_key, output_path)
+    asset_cache.store(alignment_key, alignment_path)
+    return output_path, alignment
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import argparse
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables once, before the project modules read their settings
+load_dotenv()
+
+from video_processing.pipeline import generate_video
+from video_processing.manifest import load_plan
+from video_processing.scheduler import DEFAULT_SCENE_WORKERS
+from ffmpeg_tools.combine import _default_workers
+from instrumentation.tracing import tracer, TRACE_DIR
+
+DEFAULT_CONCURRENT_JOBS = 2
+
+def read_jobs(jobs_path):
+    """
+    Read batch jobs from a JSONL file.
+
+    Each line is an object with:
+        id (str): Job identifier, used for the output name. Defaults to the line number.
+        prompt (str): Description of the video (not needed when a plan is given).
+        plan (str or dict): Optional plan JSON path, manifest path, or inline plan.
+        output (str): Optional output path. Defaults to <output_dir>/<id>.mp4.
+        profile (str): Optional render profile (e.g. "draft").
+        transition (float): Optional crossfade length in seconds between scenes.
+        deadline (float): Optional time budget of the job in seconds.
+
+    Args:
+        jobs_path (str): Path to the JSONL file.
+
+    Returns:
+        list: Job dicts, in file order.
+    """
+    jobs = []
+    with open(jobs_path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number} of {jobs_path}: {e}")
+                continue
+            job.setdefault("id", f"job{line_number}")
+            jobs.append(job)
+    return jobs
+
+def _safe_name(job_id):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(job_id))
+
+def _finished_ids(results_path):
+    """
+    IDs of jobs that already succeeded according to an existing results file.
+    """
+    finished = set()
+    if not os.path.exists(results_path):
+        return finished
+    with open(results_path, "r") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get("status") == "ok":
+                finished.add(result.get("id"))
+    return finished
+
+class ResultsWriter:
+    """
+    Appends one JSON line per finished job, safely from several job threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, result):
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(result) + "\n")
+                f.flush()
+
+def run_job(job, output_dir, scene_pool, ffmpeg_pool, results):
+    """
+    Run one batch job and record its status.
+
+    Returns:
+        dict: The job's result line.
+    """
+    output_path = job.get("output") or os.path.join(output_dir, f"{_safe_name(job['id'])}.mp4")
+    result = {"id": job["id"], "output": output_path, "profile": job.get("profile"), "started": time.time()}
+    try:
+        plan = job.get("plan")
+        if isinstance(plan, str):
+            plan = load_plan(plan)
+        if plan is None and not job.get("prompt"):
+            raise ValueError("Job needs a prompt or a plan")
+        final_path = generate_video(
+            job.get("prompt", ""),
+            output_path,
+            plan=plan,
+            profile=job.get("profile"),
+            scene_pool=scene_pool,
+            ffmpeg_pool=ffmpeg_pool,
+            export_trace=False,
+            transition=job.get("transition"),
+            deadline=job.get("deadline")
+        )
+        result["status"] = "ok" if final_path else "failed"
+        if not final_path:
+            result["error"] = "No video was produced"
+    except Exception as e:
+        traceback.print_exc()
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["finished"] = time.time()
+    result["seconds"] = round(result["finished"] - result["started"], 3)
+    results.write(result)
+    print(f"Job {job['id']} {result['status']} in {result['seconds']}s")
+    return result
+
+def run_batch(jobs, output_dir="./assets/batch", results_path=None, max_jobs=DEFAULT_CONCURRENT_JOBS,
+              scene_workers=None, ffmpeg_workers=None, skip_finished=True):
+    """
+    Run many jobs in one process over shared, bounded pools.
+
+    Scenes of every job share one scene pool and one normalization process
+    pool; provider calls share the process-wide limits, HTTP session and
+    asset cache. ffmpeg renders in this process share FFMPEG_MAX_PROCESSES,
+    and each normalization worker runs one ffmpeg at a time, so at most
+    FFMPEG_MAX_PROCESSES + ffmpeg_workers ffmpeg processes run at once.
+    Throughput is therefore set by the pool sizes, not by the number of jobs.
+
+    Args:
+        jobs (list): Job dicts (see read_jobs).
+        output_dir (str): Where outputs without an explicit path are written.
+        results_path (str): JSONL file receiving one status line per job.
+            Defaults to <output_dir>/results.jsonl.
+        max_jobs (int): Jobs in flight at once (planning and assembly).
+        scene_workers (int): Size of the shared scene pool.
+        ffmpeg_workers (int): Size of the shared normalization pool.
+        skip_finished (bool): Skip jobs already recorded as ok in results_path.
+
+    Returns:
+        list: Result dicts of the jobs that ran.
+    """
+    results_path = results_path or os.path.join(output_dir, "results.jsonl")
+    os.makedirs(output_dir, exist_ok=True)
+    if skip_finished:
+        finished = _finished_ids(results_path)
+        skipped = [job["id"] for job in jobs if job["id"] in finished]
+        if skipped:
+            print(f"Skipping {len(skipped)} finished jobs: {skipped}")
+        jobs = [job for job in jobs if job["id"] not in finished]
+
+    results = ResultsWriter(results_path)
+    scene_pool = ThreadPoolExecutor(
+        max_workers=scene_workers or int(os.getenv("SCENE_WORKERS", DEFAULT_SCENE_WORKERS)),
+        thread_name_prefix="scene"
+    )
+    ffmpeg_pool = ProcessPoolExecutor(max_workers=ffmpeg_workers or _default_workers())
+    if tracer.enabled:
+        tracer.reset()
+    try:
+        with ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job") as job_pool:
+            futures = [
+                job_pool.submit(run_job, job, output_dir, scene_pool, ffmpeg_pool, results)
+                for job in jobs
+            ]
+            return [future.result() for future in futures]
+    finally:
+        scene_pool.shutdown(wait=True)
+        ffmpeg_pool.shutdown(wait=True)
+        if tracer.enabled:
+            trace_path = os.path.join(TRACE_DIR, f"batch_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            tracer.export_chrome_trace(trace_path)
+            print(tracer.summary())
+            print(f"Trace saved to {trace_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many videos from a JSONL file of jobs.")
+    parser.add_argument("jobs", help="JSONL file, one job per line (id, prompt or plan, output, profile)")
+    parser.add_argument("--output-dir", default="./assets/batch", help="Directory for outputs without an explicit path")
+    parser.add_argument("--results", help="Results JSONL (default: <output-dir>/results.jsonl)")
+    parser.add_argument("--jobs-in-flight", type=int, default=DEFAULT_CONCURRENT_JOBS, help="Jobs run at once")
+    parser.add_argument("--scene-workers", type=int, help="Shared scene pool size")
+    parser.add_argument("--ffmpeg-workers", type=int, help="Shared normalization pool size")
+    parser.add_argument("--rerun", action="store_true", help="Also rerun jobs already recorded as ok")
+    args = parser.parse_args()
+
+    results = run_batch(
+        read_jobs(args.jobs),
+        output_dir=args.output_dir,
+        results_path=args.results,
+        max_jobs=args.jobs_in_flight,
+        scene_workers=args.scene_workers,
+        ffmpeg_workers=args.ffmpeg_workers,
+        skip_finished=not args.rerun
+    )
+    failed = [result["id"] for result in results if result["status"] != "ok"]
+    print(f"{len(results) - len(failed)} of {len(results)} jobs succeeded")
+    if failed:
+        print(f"Failed jobs: {failed}")
+
+if __name__ == "__main__":
+    main()
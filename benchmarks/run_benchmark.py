@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_server import build_plan, start_stub_server, stub_environment
+from instrumentation.tracing import tracer
+
+# name: (scene count, share of image scenes)
+SCENARIOS = {
+    "5-image": (5, 0.8),
+    "5-video": (5, 0.2),
+    "20-image": (20, 0.8),
+    "20-video": (20, 0.2),
+    "60-image": (60, 0.8),
+    "60-video": (60, 0.2),
+}
+
+def measure_scenario(name, work_dir, profile=None):
+    """
+    Run the full pipeline for one scenario in this process.
+
+    Called in a fresh interpreter per scenario (see run_scenario), so the
+    peak RSS and the child rusage cover this scenario only.
+
+    Returns:
+        dict: Wall time, per-stage timings, ffmpeg CPU seconds and peak RSS.
+    """
+    # Module-level state (latency history, caches) loads on import, so move
+    # into the run directory first; run_scenario also points its paths there
+    run_dir = os.path.join(work_dir, name)
+    os.makedirs(run_dir, exist_ok=True)
+    os.chdir(run_dir)
+    from video_processing.pipeline import generate_video
+    tracer.enable()
+
+    start = time.perf_counter()
+    try:
+        output_path = generate_video(f"Benchmark scenario {name}", "./assets/final/final_video.mp4", profile=profile)
+    finally:
+        wall = time.perf_counter() - start
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return {
+        "success": bool(output_path),
+        "wall_seconds": round(wall, 3),
+        "ffmpeg_cpu_seconds": round(children.ru_utime + children.ru_stime, 3),
+        # ru_maxrss is in KiB on Linux; children is the largest single ffmpeg process
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(children.ru_maxrss / 1024, 1),
+        # Spans recorded by the pipeline's tracer; the Chrome trace is under <run dir>/assets/traces
+        "stages": {
+            f"{row['category']}:{row['name']}": {
+                "count": row["count"], "total": round(row["total"], 3),
+                "max": round(row["max"], 3), "cpu": round(row["cpu"], 3)
+            }
+            for row in tracer.stats()
+        }
+    }
+
+def run_scenario(name, state, work_dir, profile=None):
+    """
+    Run one scenario against the stub server in a subprocess.
+
+    ru_maxrss is a high-water mark for the lifetime of a process (and of all
+    its children), so each scenario gets its own interpreter; otherwise every
+    scenario after the first would report the peak of the earlier ones.
+
+    Returns:
+        dict: The scenario's measurements (see measure_scenario) and provider request counts.
+    """
+    scene_count, image_ratio = SCENARIOS[name]
+    state.plan = build_plan(scene_count, image_ratio=image_ratio)
+    state.request_counts = {}
+
+    result_path = os.path.join(work_dir, f"{name}_result.json")
+    command = [sys.executable, os.path.abspath(__file__), "--measure", name, "--work-dir", work_dir,
+               "--output", result_path]
+    if profile:
+        command += ["--profile", profile]
+    environment = dict(os.environ, **stub_environment(state.base_url, os.path.join(work_dir, name)))
+    completed = subprocess.run(command, env=environment)
+    try:
+        with open(result_path, "r") as f:
+            measured = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"Scenario {name} exited with code {completed.returncode} without results")
+        measured = {"success": False, "wall_seconds": 0.0, "ffmpeg_cpu_seconds": 0.0,
+                    "peak_rss_mb": 0.0, "peak_child_rss_mb": 0.0, "stages": {}}
+
+    return dict(
+        {"scenario": name, "scenes": scene_count, "image_ratio": image_ratio, "profile": profile},
+        **measured,
+        provider_requests=dict(state.request_counts)
+    )
+
+def print_report(results):
+    print()
+    print(f"{'scenario':<10} {'ok':<3} {'wall s':>8} {'ffmpeg cpu s':>13} {'rss MB':>8} {'child rss MB':>13}")
+    for result in results:
+        print(
+            f"{result['scenario']:<10} {'y' if result['success'] else 'n':<3} {result['wall_seconds']:>8.2f} "
+            f"{result['ffmpeg_cpu_seconds']:>13.2f} {result['peak_rss_mb']:>8.1f} {result['peak_child_rss_mb']:>13.1f}"
+        )
+    for result in results:
+        print(f"\n{result['scenario']} stages (summed across threads):")
+        print(f"  {'stage':<36} {'count':>6} {'total s':>9} {'max s':>8} {'cpu s':>8}")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage[:36]:<36} {stats['count']:>6} {stats['total']:>9.2f} {stats['max']:>8.2f} {stats['cpu']:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the video pipeline end to end against local provider stand-ins.")
+    parser.add_argument("--scenarios", default="5-image,5-video",
+                        help=f"Comma-separated scenarios from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="Multiplier applied to the simulated provider latencies")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Share of provider requests that fail with a 500")
+    parser.add_argument("--profile", default="final", help="Render profile (e.g. draft or final)")
+    parser.add_argument("--work-dir", default=None, help="Where runs write their assets (default: a temp dir)")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        # One scenario in a fresh process, started by run_scenario
+        with open(args.output, "w") as f:
+            json.dump(measure_scenario(args.measure, args.work_dir, profile=args.profile), f)
+        return
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="video_bench_"))
+    profiles = None
+    if args.failure_rate:
+        profiles = {provider: {"failure_rate": args.failure_rate}
+                    for provider in ("leonardo", "veo3", "elevenlabs", "suno")}
+    server, state = start_stub_server(os.path.join(work_dir, "stub_media"), profiles=profiles, time_scale=args.time_scale)
+
+    # Scenario processes inherit the environment, so every client points at the stub
+    os.environ.update(stub_environment(state.base_url))
+    os.environ["ASSET_CACHE_DISABLED"] = "1"
+
+    results = []
+    try:
+        for name in names:
+            print(f"=== Running scenario {name} ===")
+            results.append(run_scenario(name, state, work_dir, profile=args.profile))
+    finally:
+        server.shutdown()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
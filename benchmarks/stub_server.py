@@ -0,0 +1,364 @@
+import base64
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ffmpeg
+
+# Latency (seconds, lognormal around the median) and failure rate per provider
+DEFAULT_PROVIDER_PROFILES = {
+    "openai": {"median": 0.2, "sigma": 0.3, "failure_rate": 0.0, "token_delay": 0.002},
+    "leonardo": {"median": 4.0, "sigma": 0.4, "failure_rate": 0.0},
+    "veo3": {"median": 30.0, "sigma": 0.5, "failure_rate": 0.0},
+    "elevenlabs": {"median": 1.5, "sigma": 0.3, "failure_rate": 0.0},
+    "suno": {"median": 10.0, "sigma": 0.4, "failure_rate": 0.0},
+}
+
+EFFECTS = ["fade_in", "fade_out", "grayscale", "zoom_in", "speed_up"]
+GENRES = [("ambient", "calm"), ("orchestral", "dramatic"), ("electronic", "energetic")]
+VOICES = [("male", "calm"), ("female", "hopeful"), ("male", "serious"), ("female", "emotional")]
+
+def build_plan(scene_count, image_ratio=0.5, scene_duration=5, seed=0):
+    """
+    Build a deterministic synthetic video plan in the scene_generator format.
+
+    Args:
+        scene_count (int): Number of scenes.
+        image_ratio (float): Share of "image" scenes (the rest are "video").
+        scene_duration (int): Duration of each scene in seconds.
+        seed (int): Random seed for types, effects, voices and music.
+
+    Returns:
+        dict: {"scenes": [...]}
+    """
+    rng = random.Random(seed)
+    scenes = []
+    for number in range(1, scene_count + 1):
+        voice_gender, voice_style = VOICES[(number - 1) // 3 % len(VOICES)]
+        genre, mood = GENRES[(number - 1) // 4 % len(GENRES)]
+        scenes.append({
+            "scene_number": number,
+            "description": f"Synthetic scene {number}: a slow pan across a test pattern",
+            "type": "image" if rng.random() < image_ratio else "video",
+            "duration": scene_duration,
+            "audio": {
+                "voiceover": rng.random() < 0.8,
+                "voice_gender": voice_gender,
+                "voice_style": voice_style,
+                "voice_text": f"This is narration for scene number {number}. " * rng.randint(1, 3),
+                "background_music": rng.random() < 0.7,
+                "music_mood": mood,
+                "music_description": f"{mood} {genre} background",
+                "music_genre": genre
+            },
+            "ffmpeg_effects": rng.sample(EFFECTS, rng.randint(0, 3))
+        })
+    return {"scenes": scenes}
+
+class StubState:
+    """
+    Configuration and bookkeeping shared by the request handlers.
+    """
+
+    def __init__(self, media_dir, profiles=None, time_scale=1.0, seed=0):
+        self.media_dir = media_dir
+        self.profiles = {name: dict(values) for name, values in DEFAULT_PROVIDER_PROFILES.items()}
+        for name, values in (profiles or {}).items():
+            self.profiles.setdefault(name, {}).update(values)
+        self.time_scale = time_scale
+        self.plan = build_plan(5)
+        self.jobs = {}
+        self.request_counts = {}
+        self.base_url = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._media_locks = {}
+        os.makedirs(media_dir, exist_ok=True)
+
+    def latency(self, provider):
+        profile = self.profiles[provider]
+        with self._lock:
+            self.request_counts[provider] = self.request_counts.get(provider, 0) + 1
+            sample = profile["median"] * math.exp(profile.get("sigma", 0) * self._rng.gauss(0, 1))
+        return sample * self.time_scale
+
+    def should_fail(self, provider):
+        with self._lock:
+            return self._rng.random() < self.profiles[provider].get("failure_rate", 0)
+
+    def media(self, name, build):
+        """
+        Return the path of a synthetic media file, generating it with ffmpeg lavfi on first use.
+        """
+        path = os.path.join(self.media_dir, name)
+        with self._lock:
+            lock = self._media_locks.setdefault(name, threading.Lock())
+        with lock:
+            if not os.path.exists(path):
+                build(path)
+        return path
+
+    def image(self):
+        return self.media("image.jpg", lambda path: (
+            ffmpeg
+            .input("testsrc2=size=768x512:rate=1", f="lavfi", t=1)
+            .output(path, vframes=1)
+            .run(overwrite_output=True, quiet=True)
+        ))
+
+    def video(self, duration):
+        def build(path):
+            video = ffmpeg.input("testsrc2=size=1280x720:rate=30", f="lavfi", t=duration)
+            audio = ffmpeg.input("sine=frequency=220:sample_rate=44100", f="lavfi", t=duration)
+            (
+                ffmpeg
+                .output(video, audio, path, vcodec="libx264", pix_fmt="yuv420p", acodec="aac", ac=2, ar=44100)
+                .run(overwrite_output=True, quiet=True)
+            )
+        return self.media(f"video_{duration}.mp4", build)
+
+    def tone(self, prefix, duration, frequency):
+        return self.media(f"{prefix}_{duration}.mp3", lambda path: (
+            ffmpeg
+            .input(f"sine=frequency={frequency}:sample_rate=44100", f="lavfi", t=duration)
+            .output(path, acodec="libmp3lame", ac=2)
+            .run(overwrite_output=True, quiet=True)
+        ))
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Mimics the OpenAI, Leonardo, Veo3, ElevenLabs and Suno endpoints used by
+    prompts/ and ai_services/, each mounted under its own path prefix.
+    """
+
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail_or_wait(self, provider):
+        time.sleep(self.state.latency(provider))
+        if self.state.should_fail(provider):
+            self._send_json({"error": f"synthetic {provider} failure"}, status=500)
+            return True
+        return False
+
+    def _media_url(self, path):
+        return f"{self.state.base_url}/media/{os.path.basename(path)}"
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path == "/openai/v1/chat/completions":
+            return self._openai(self._read_json())
+        if path == "/leonardo/generations":
+            return self._leonardo(self._read_json())
+        if path == "/veo3/generate":
+            return self._veo3_submit(self._read_json())
+        match = re.fullmatch(r"/elevenlabs/text-to-speech/([^/]+)(/with-timestamps)?", path)
+        if match:
+            return self._elevenlabs(self._read_json(), with_timestamps=bool(match.group(2)))
+        if path == "/suno/generate-music":
+            return self._suno(self._read_json())
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        match = re.fullmatch(r"/veo3/jobs/([^/]+)", path)
+        if match:
+            return self._veo3_poll(match.group(1))
+        if path.startswith("/media/"):
+            return self._media(os.path.join(self.state.media_dir, os.path.basename(path)))
+        self._send_json({"error": "not found"}, status=404)
+
+    def _openai(self, request):
+        if self._fail_or_wait("openai"):
+            return
+        content = json.dumps(self.state.plan, indent=2)
+        if not request.get("stream"):
+            return self._send_json({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+        # Server-sent events, a few characters per chunk like a token stream
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        delay = self.state.profiles["openai"].get("token_delay", 0) * self.state.time_scale
+        for start in range(0, len(content), 16):
+            chunk = {"choices": [{"index": 0, "delta": {"content": content[start:start + 16]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if delay:
+                time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def _leonardo(self, request):
+        if self._fail_or_wait("leonardo"):
+            return
+        url = self._media_url(self.state.image())
+        images = [{"url": url} for _ in range(int(request.get("num_images", 1)))]
+        self._send_json({"generations_by_pk": {"generated_images": images}})
+
+    def _veo3_submit(self, request):
+        if self.state.should_fail("veo3"):
+            return self._send_json({"error": "synthetic veo3 failure"}, status=500)
+        job_id = str(uuid.uuid4())
+        duration = int(request.get("duration", 5))
+        self.state.jobs[job_id] = {"ready_at": time.time() + self.state.latency("veo3"), "duration": duration}
+        self._send_json({"job_id": job_id, "status": "pending"}, status=202)
+
+    def _veo3_poll(self, job_id):
+        job = self.state.jobs.get(job_id)
+        if not job:
+            return self._send_json({"error": "unknown job"}, status=404)
+        if time.time() < job["ready_at"]:
+            return self._send_json({"job_id": job_id, "status": "pending"})
+        url = self._media_url(self.state.video(job["duration"]))
+        self._send_json({"job_id": job_id, "status": "completed", "video_url": url})
+
+    def _elevenlabs(self, request, with_timestamps=False):
+        if self._fail_or_wait("elevenlabs"):
+            return
+        text = request.get("text", "")
+        duration = max(1, math.ceil(len(text) / 15))
+        path = self.state.tone("voice", duration, 440)
+        if not with_timestamps:
+            return self._media(path, content_type="audio/mpeg")
+
+        # Spread the characters evenly over the clip, like an alignment response
+        with open(path, "rb") as f:
+            audio = base64.b64encode(f.read()).decode("ascii")
+        step = duration / max(len(text), 1)
+        self._send_json({
+            "audio_base64": audio,
+            "alignment": {
+                "characters": list(text),
+                "character_start_times_seconds": [i * step for i in range(len(text))],
+                "character_end_times_seconds": [(i + 1) * step for i in range(len(text))]
+            }
+        })
+
+    def _suno(self, request):
+        if self._fail_or_wait("suno"):
+            return
+        duration = max(1, int(math.ceil(float(request.get("duration_seconds", 5)))))
+        path = self.state.tone("music", duration, 330)
+        self._send_json({"music_url": self._media_url(path)})
+
+    def _media(self, path, content_type="application/octet-stream"):
+        if not os.path.exists(path):
+            return self._send_json({"error": "not found"}, status=404)
+        size = os.path.getsize(path)
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read()
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_stub_server(media_dir, profiles=None, time_scale=1.0, host="127.0.0.1", port=0):
+    """
+    Start the stand-in server on a background thread.
+
+    Args:
+        media_dir (str): Where synthetic media is generated and served from.
+        profiles (dict): Per-provider overrides of DEFAULT_PROVIDER_PROFILES.
+        time_scale (float): Multiplier applied to every simulated latency.
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free one).
+
+    Returns:
+        tuple: (server, state). Call server.shutdown() to stop it.
+    """
+    state = StubState(media_dir, profiles=profiles, time_scale=time_scale)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    state.base_url = f"http://{host}:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-server").start()
+    return server, state
+
+def stub_environment(base_url, work_dir=None):
+    """
+    Environment variables that point every client in the repo at the stand-in server.
+
+    With `work_dir`, every file the pipeline keeps between runs (latency
+    history, asset cache, Veo3 jobs, render manifests, scratch and traces)
+    also goes under it, so a run never reads state left by another one.
+    """
+    environment = {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_API_BASE": f"{base_url}/openai/v1",
+        "LEONARDO_API_KEY": "stub",
+        "LEONARDO_API_BASE": f"{base_url}/leonardo",
+        "VEO3_API_KEY": "stub",
+        "VEO3_API_BASE": f"{base_url}/veo3",
+        "ELEVENLABS_API_KEY": "stub",
+        "ELEVENLABS_API_BASE": f"{base_url}/elevenlabs",
+        "SUNO_API_KEY": "stub",
+        "SUNO_API_BASE": f"{base_url}/suno",
+    }
+    if work_dir:
+        assets_dir = os.path.join(work_dir, "assets")
+        environment.update({
+            "LATENCY_HISTORY_PATH": os.path.join(assets_dir, "latency_history.json"),
+            "ASSET_CACHE_DIR": os.path.join(assets_dir, "cache"),
+            "VEO3_JOBS_DIR": os.path.join(assets_dir, "jobs", "veo3"),
+            "RENDER_DIR": os.path.join(assets_dir, "renders"),
+            "SCRATCH_DIR": os.path.join(assets_dir, "temp"),
+            "TRACE_DIR": os.path.join(assets_dir, "traces"),
+        })
+    return environment
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the AI providers used by the video generator.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--media-dir", default="./assets/stub_media")
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--scenes", type=int, default=5)
+    parser.add_argument("--image-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server, state = start_stub_server(args.media_dir, time_scale=args.time_scale, port=args.port)
+    state.plan = build_plan(args.scenes, image_ratio=args.image_ratio)
+    print("Stub server running. Point the generator at it with:")
+    for key, value in stub_environment(state.base_url).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,431 @@
+import os
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+import traceback
+import socketserver
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+# Load environment variables once, before the project modules read their settings
+load_dotenv()
+
+from video_processing.pipeline import generate_video, JobCancelled
+from video_processing.manifest import load_plan
+from video_processing.scheduler import DEFAULT_SCENE_WORKERS
+from ffmpeg_tools.combine import _default_workers
+from ffmpeg_tools.profiles import get_profile
+from ai_services.http_client import get_session
+from batch import _safe_name
+from instrumentation.tracing import tracer, TRACE_DIR
+
+DAEMON_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", 8765))
+# Serve on a Unix socket instead of TCP when set
+DAEMON_SOCKET = os.getenv("DAEMON_SOCKET")
+DAEMON_OUTPUT_DIR = os.getenv("DAEMON_OUTPUT_DIR", "./assets/daemon")
+DEFAULT_CONCURRENT_JOBS = 2
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+def _confined_path(path, directory):
+    """
+    Resolve a client-supplied path relative to `directory`.
+
+    Raises:
+        ValueError: If the path resolves to somewhere outside `directory`.
+    """
+    root = os.path.realpath(directory)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Path {path!r} is outside {directory}")
+    return resolved
+
+class Job:
+    """
+    One submitted video: its request, state and progress events.
+
+    Events are kept for the lifetime of the daemon, so a client can attach
+    to a job's event stream at any time and replay it from the start.
+    """
+
+    def __init__(self, request, output_dir):
+        self.id = str(request.get("id") or uuid.uuid4().hex[:12])
+        self.request = request
+        # Clients only read and write files inside output_dir
+        self.output = _confined_path(request.get("output") or f"{_safe_name(self.id)}.mp4", output_dir)
+        self.plan = request.get("plan")
+        if isinstance(self.plan, str):
+            self.plan = _confined_path(self.plan, output_dir)
+        self.state = "queued"
+        self.error = None
+        self.events = []
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.created = time.time()
+        self._changed = threading.Condition()
+        self.event("queued")
+
+    def event(self, stage, scene_number=None, **info):
+        """
+        Record a progress event and wake up every client streaming this job.
+        """
+        self._append(stage, scene_number, **info)
+
+    def finish(self, state, error=None):
+        """
+        Record the final event and state together, so a client that sees the
+        job finished has always been sent its last event.
+        """
+        if error:
+            self._append(state, state=state, error=error)
+        else:
+            self._append(state, state=state)
+
+    def _append(self, stage, scene_number=None, state=None, **info):
+        entry = {"time": round(time.time(), 3), "stage": stage}
+        if scene_number is not None:
+            entry["scene_number"] = scene_number
+        entry.update(info)
+        with self._changed:
+            self.events.append(entry)
+            if state:
+                self.state = state
+                self.error = info.get("error")
+            self._changed.notify_all()
+
+    def wait_for_events(self, since, timeout=15.0):
+        """
+        Events after index `since`, waiting up to `timeout` for new ones.
+
+        Returns:
+            list: New events (empty on timeout).
+        """
+        with self._changed:
+            if len(self.events) <= since and self.state not in FINISHED_STATES:
+                self._changed.wait(timeout)
+            return self.events[since:]
+
+    def summary(self, events=False):
+        summary = {
+            "id": self.id,
+            "state": self.state,
+            "output": self.output,
+            "profile": self.request.get("profile"),
+            "error": self.error,
+            "created": self.created,
+            "scenes": self._scene_stages(),
+            "eta_seconds": self._eta()
+        }
+        if events:
+            summary["events"] = list(self.events)
+        return summary
+
+    def _eta(self):
+        # Latest estimate of the time left until every scene is rendered
+        if self.state in FINISHED_STATES:
+            return None
+        estimate = next((entry for entry in reversed(self.events) if entry["stage"] == "eta"), None)
+        if estimate is None:
+            return None
+        return max(round(estimate["seconds"] - (time.time() - estimate["time"]), 1), 0.0)
+
+    def _scene_stages(self):
+        # Latest stage reached by each scene
+        stages = {}
+        for entry in self.events:
+            if "scene_number" in entry:
+                stages[str(entry["scene_number"])] = entry["stage"]
+        return stages
+
+class RenderDaemon:
+    """
+    Long-running video service.
+
+    Imports, the HTTP session, the asset cache, the provider limits and the
+    scene and ffmpeg pools are set up once and shared by every job, so a job
+    starts planning immediately and concurrent jobs share the host's CPU
+    through the same bounded pools (as in batch mode).
+    """
+
+    def __init__(self, output_dir=DAEMON_OUTPUT_DIR, max_jobs=DEFAULT_CONCURRENT_JOBS,
+                 scene_workers=None, ffmpeg_workers=None):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self.scene_pool = ThreadPoolExecutor(
+            max_workers=scene_workers or int(os.getenv("SCENE_WORKERS", DEFAULT_SCENE_WORKERS)),
+            thread_name_prefix="scene"
+        )
+        self.ffmpeg_workers = ffmpeg_workers or _default_workers()
+        self.ffmpeg_pool = ProcessPoolExecutor(max_workers=self.ffmpeg_workers)
+        self.job_pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+
+    def warm_up(self):
+        """
+        Open the HTTP session and start the ffmpeg worker processes before the first job.
+        """
+        get_session()
+        wait([self.ffmpeg_pool.submit(os.getpid) for _ in range(self.ffmpeg_workers)])
+
+    def submit(self, request):
+        """
+        Queue a job.
+
+        Args:
+            request (dict): {"prompt" or "plan", optional "id", "output", "profile", "transition", "deadline"}.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            ValueError: If the request is invalid or the id is taken.
+        """
+        if not request.get("prompt") and not request.get("plan"):
+            raise ValueError("Job needs a prompt or a plan")
+        get_profile(request.get("profile"))
+        job = Job(request, self.output_dir)
+        with self._lock:
+            if job.id in self.jobs:
+                raise ValueError(f"Job {job.id} already exists")
+            self.jobs[job.id] = job
+        job.future = self.job_pool.submit(self._run, job)
+        print(f"Queued job {job.id}")
+        return job
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            return job.finish("cancelled")
+        job.state = "running"
+        job.event("started")
+        try:
+            plan = job.plan
+            if isinstance(plan, str):
+                plan = load_plan(plan)
+            final_path = generate_video(
+                job.request.get("prompt", ""),
+                job.output,
+                plan=plan,
+                profile=job.request.get("profile"),
+                scene_pool=self.scene_pool,
+                ffmpeg_pool=self.ffmpeg_pool,
+                export_trace=False,
+                on_progress=job.event,
+                cancel_event=job.cancel_event,
+                transition=job.request.get("transition"),
+                deadline=job.request.get("deadline")
+            )
+            if final_path:
+                job.finish("done")
+            else:
+                job.finish("failed", "No video was produced")
+        except JobCancelled:
+            job.finish("cancelled")
+        except Exception as e:
+            traceback.print_exc()
+            job.finish("failed", f"{type(e).__name__}: {e}")
+        print(f"Job {job.id} {job.state}")
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return [job.summary() for job in self.jobs.values()]
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            Job or None: The job, or None if there is no such job.
+        """
+        job = self.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            # Never started
+            job.finish("cancelled")
+        else:
+            job.event("cancelling")
+        return job
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self.job_pool.shutdown(wait=True)
+        self.scene_pool.shutdown(wait=True)
+        self.ffmpeg_pool.shutdown(wait=True)
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """
+    Job API:
+
+        POST   /jobs                 submit {"prompt" or "plan", "id", "output", "profile", "transition", "deadline"}
+        GET    /jobs                 list jobs
+        GET    /jobs/<id>            job state, per-scene stage and events
+        GET    /jobs/<id>/events     stream progress as JSON lines (?since=<n> to resume)
+        POST   /jobs/<id>/cancel     cancel (DELETE /jobs/<id> does the same)
+    """
+
+    protocol_version = "HTTP/1.1"
+    daemon = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_or_404(self, job_id):
+        job = self.daemon.get(job_id)
+        if job is None:
+            self._send_json({"error": f"no job {job_id}"}, status=404)
+        return job
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path == "/jobs":
+            try:
+                job = self.daemon.submit(self._read_json())
+            except (ValueError, json.JSONDecodeError) as e:
+                return self._send_json({"error": str(e)}, status=400)
+            return self._send_json(job.summary(), status=202)
+        match = re.fullmatch(r"/jobs/([^/]+)/cancel", path)
+        if match:
+            return self._cancel(match.group(1))
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_DELETE(self):
+        match = re.fullmatch(r"/jobs/([^/]+)", self.path.split("?")[0])
+        if match:
+            return self._cancel(match.group(1))
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/jobs":
+            return self._send_json({"jobs": self.daemon.list_jobs()})
+        match = re.fullmatch(r"/jobs/([^/]+)(/events)?", path)
+        if not match:
+            return self._send_json({"error": "not found"}, status=404)
+        job = self._job_or_404(match.group(1))
+        if job is None:
+            return
+        if not match.group(2):
+            return self._send_json(job.summary(events=True))
+        since = re.search(r"(?:^|&)since=(\d+)", query)
+        self._stream_events(job, int(since.group(1)) if since else 0)
+
+    def _cancel(self, job_id):
+        job = self.daemon.cancel(job_id)
+        if job is not None:
+            self._send_json(job.summary())
+        else:
+            self._send_json({"error": f"no job {job_id}"}, status=404)
+
+    def _stream_events(self, job, since):
+        # One JSON object per line, flushed as each event happens, until the job ends
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            while True:
+                events = job.wait_for_events(since)
+                for entry in events:
+                    self.wfile.write((json.dumps(entry) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                since += len(events)
+                if job.state in FINISHED_STATES and since >= len(job.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+def start_daemon_server(daemon, host=DAEMON_HOST, port=DAEMON_PORT, socket_path=DAEMON_SOCKET):
+    """
+    Start the job API on a background thread.
+
+    Returns:
+        socketserver.BaseServer: The running server (call shutdown() to stop it).
+    """
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"daemon": daemon})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        address = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="daemon-api", daemon=True).start()
+    print(f"Render daemon listening on {address}")
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the video generator as a local job service.")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--output-dir", default=DAEMON_OUTPUT_DIR, help="Directory for outputs without an explicit path")
+    parser.add_argument("--jobs-in-flight", type=int, default=DEFAULT_CONCURRENT_JOBS, help="Jobs run at once")
+    parser.add_argument("--scene-workers", type=int, help="Shared scene pool size")
+    parser.add_argument("--ffmpeg-workers", type=int, help="Shared normalization pool size")
+    args = parser.parse_args()
+
+    daemon = RenderDaemon(
+        output_dir=args.output_dir,
+        max_jobs=args.jobs_in_flight,
+        scene_workers=args.scene_workers,
+        ffmpeg_workers=args.ffmpeg_workers
+    )
+    daemon.warm_up()
+    server = start_daemon_server(daemon, host=args.host, port=args.port, socket_path=args.socket)
+    if tracer.enabled:
+        tracer.reset()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        server.shutdown()
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        daemon.shutdown()
+        if tracer.enabled:
+            trace_path = os.path.join(TRACE_DIR, f"daemon_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            tracer.export_chrome_trace(trace_path)
+            print(tracer.summary())
+            print(f"Trace saved to {trace_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import ffmpeg
+from ffmpeg_tools.runner import run_ffmpeg
+
+SAMPLE_RATE = 44100
+
+def slice_audio(input_path, segments, sample_rate=SAMPLE_RATE):
+    """
+    Cut one audio file into several pieces with a single ffmpeg process.
+
+    Cuts are made on exact sample positions (atrim start_sample/end_sample)
+    after resampling to `sample_rate`, and written as PCM WAV so no encoder
+    priming or padding shifts the boundaries.
+
+    Args:
+        input_path (str): Audio file to slice.
+        segments (list): Tuples (start_seconds, end_seconds, output_path).
+        sample_rate (int): Sample rate used for the cut points and outputs.
+
+    Returns:
+        list: Output paths, in the order of `segments`.
+    """
+    if not segments:
+        return []
+
+    audio = ffmpeg.input(input_path).audio.filter('aresample', sample_rate)
+    split = audio.asplit() if len(segments) > 1 else None
+
+    outputs = []
+    for i, (start, end, output_path) in enumerate(segments):
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        stream = split[i] if split is not None else audio
+        piece = (
+            stream
+            .filter('atrim', start_sample=int(round(start * sample_rate)), end_sample=int(round(end * sample_rate)))
+            .filter('asetpts', 'PTS-STARTPTS')
+        )
+        outputs.append(ffmpeg.output(piece, output_path, acodec='pcm_s16le', ar=sample_rate, ac=2))
+
+    run_ffmpeg(ffmpeg.merge_outputs(*outputs), name="slice_audio")
+    return [output_path for _, _, output_path in segments]
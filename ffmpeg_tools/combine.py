@@ -1,136 +1,495 @@
 import ffmpeg
 import os
 import uuid
+import threading
 import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from ffmpeg_tools.runner import run_ffmpeg, probe_media
+from ffmpeg_tools.effects import EFFECT_PARAMS, build_effects_chain, build_audio_mix
+from ffmpeg_tools.profiles import get_profile, frame_size, conform_video, video_args, audio_args
+from ffmpeg_tools.transitions import crossfade_segments, TRANSITION_DURATION
+from instrumentation.tracing import tracer
 
-def combine_scenes(scene_files, output_path):
+SILENT_AUDIO = 'anullsrc=channel_layout=stereo:sample_rate=44100'
+
+# Ken Burns motion for still images: end zoom, and the resolution zoompan works at
+# (rendering above the output size avoids the jitter of zoompan's integer offsets)
+KEN_BURNS_ZOOM = 1.1
+KEN_BURNS_OVERSCALE = 2
+
+def _frame_rate(rate):
     """
-    Combine multiple scenes (videos or images) into a single video.
+    Convert an ffprobe rate string such as "30/1" to a float.
+    """
+    num, _, den = (rate or "0/1").partition('/')
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def is_conformant_video(stream, profile=None):
+    """
+    Check whether a probed video stream already matches the concat format
+    of a render profile. The H.264 profile is part of the check because the
+    concat copy needs identical H.264 parameters across segments.
+    """
+    profile = get_profile(profile)
+    return (
+        stream.get('codec_name') == 'h264'
+        and stream.get('profile') == 'High'
+        and stream.get('pix_fmt') == 'yuv420p'
+        and stream.get('width') == profile['width']
+        and stream.get('height') == profile['height']
+        and abs(_frame_rate(stream.get('r_frame_rate')) - profile['fps']) < 0.01
+        and stream.get('sample_aspect_ratio', '1:1') in ('1:1', '0:1')
+    )
+
+def is_conformant_audio(stream):
+    """
+    Check whether a probed audio stream already matches the concat format.
+    """
+    return (
+        stream.get('codec_name') == 'aac'
+        and str(stream.get('sample_rate')) == '44100'
+        and stream.get('channels') == 2
+    )
+
+def render_still(image_path, output_path, duration, effects=(), audio_beds=(), pan="right", motion=True,
+                 profile=None):
+    """
+    Render a still image straight to a concat-ready clip in one ffmpeg process.
+
+    The image is decoded once and zoompan emits every frame of the clip at
+    the profile's size and frame rate with a slow Ken Burns zoom and pan. The scene's remaining
+    effects are applied on the same graph, and the audio is the scene's mix
+    (see build_audio_mix) or generated silence. The output already matches
+    the concat format, so normalize_scene only remuxes it.
 
     Args:
-        scene_files (list): List of tuples (file_path, duration_seconds).
+        image_path (str): Source image.
+        output_path (str): Path to save the clip.
+        duration (float): Clip duration in seconds.
+        effects (list): Effect names from the scene plan. zoom_in sets the
+            strength of the Ken Burns zoom; speed_up does not apply to stills.
+        audio_beds (list): Audio beds to mix, see build_audio_mix.
+        pan (str): Horizontal drift: "right", "left" or "center".
+        motion (bool): Ken Burns zoom and pan; False holds the framed image still.
+        profile (str or dict): Render profile for the output format and encoder settings.
+
+    Returns:
+        str: Path to the rendered clip.
+    """
+    profile = get_profile(profile)
+    width, height, fps = profile['width'], profile['height'], profile['fps']
+    frames = max(int(round(duration * fps)), 1)
+    zoom = EFFECT_PARAMS["zoom_in"]["zoom_factor"] if "zoom_in" in effects else KEN_BURNS_ZOOM
+    if not motion:
+        zoom, pan = 1.0, "center"
+    pan_position = {"right": f"on/{frames}", "left": f"1-on/{frames}"}.get(pan, "0.5")
+
+    # Fill the 16:9 frame, then let zoompan produce all frames from the single decoded image
+    video = (
+        ffmpeg
+        .input(image_path)
+        .filter('scale', width * KEN_BURNS_OVERSCALE, height * KEN_BURNS_OVERSCALE,
+                force_original_aspect_ratio='increase')
+        .filter('crop', width * KEN_BURNS_OVERSCALE, height * KEN_BURNS_OVERSCALE)
+        .filter(
+            'zoompan',
+            z=f'1+{(zoom - 1) / frames}*on',
+            x=f'(iw-iw/zoom)*({pan_position})',
+            y='(ih-ih/zoom)/2',
+            d=frames,
+            s=frame_size(profile),
+            fps=fps
+        )
+    )
+    still_effects = [effect for effect in effects if effect not in ("zoom_in", "speed_up")]
+    video, _ = build_effects_chain(video, still_effects, duration, fps=fps)
+    video = conform_video(video, profile)
+
+    audio = build_audio_mix(audio_beds)
+    if audio is None:
+        audio = ffmpeg.input(SILENT_AUDIO, f='lavfi', t=duration)
+    else:
+        # Pad short beds with silence so audio covers the whole clip
+        audio = audio.filter('apad')
+
+    run_ffmpeg(
+        ffmpeg.output(video, audio, output_path, t=duration, **video_args(profile), **audio_args(profile)),
+        name="render_still"
+    )
+    return output_path
+
+def normalize_scene(file_path, duration, output_path, profile=None):
+    """
+    Normalize one scene (video or image) to the common concat format:
+    H.264/yuv420p at the render profile's size and frame rate (1280x720 at
+    30fps for "final") with 44.1kHz stereo AAC audio.
+
+    Inputs that already match the format are remuxed with stream copy, and
+    inputs longer than `duration` are trimmed at decode time.
+
+    Runs in a worker process, so it only takes and returns plain values.
+
+    Args:
+        file_path (str): Scene video or image.
+        duration (float): Scene duration in seconds (used for images and silent audio).
+        output_path (str): Path to save the normalized segment.
+        profile (str or dict): Render profile of the concat format.
+
+    Returns:
+        str: Path to the normalized segment, or None if an error occurs.
+    """
+    profile = get_profile(profile)
+    if not os.path.exists(file_path):
+        print(f"Error: File {file_path} does not exist")
+        return None
+
+    try:
+        # Check if input has an audio stream
+        probe = probe_media(file_path)
+        has_audio = any(stream['codec_type'] == 'audio' for stream in probe['streams'])
+
+        # If it's an image, render it with motion and silent audio in one pass
+        if file_path.endswith(('.jpg', '.png')):
+            render_still(file_path, output_path, duration, profile=profile)
+        else:
+            video_stream = next((st for st in probe['streams'] if st['codec_type'] == 'video'), None)
+            audio_stream = next((st for st in probe['streams'] if st['codec_type'] == 'audio'), None)
+            clip_duration = float(probe['format'].get('duration', 0) or 0)
+
+            # Trim at the input so frames past the scene duration are never decoded or encoded
+            input_args = {}
+            if duration and clip_duration > duration:
+                input_args['t'] = duration
+            stream = ffmpeg.input(file_path, **input_args)
+            silence_duration = min(duration, clip_duration) if clip_duration else duration
+
+            video_ok = video_stream is not None and is_conformant_video(video_stream, profile)
+            audio_ok = audio_stream is not None and is_conformant_audio(audio_stream)
+            audio_encode_args = audio_args(profile)
+
+            if video_ok and audio_ok:
+                # Already in the concat format: remux (and trim) without re-encoding
+                output = ffmpeg.output(stream.video, stream.audio, output_path, c='copy')
+            elif video_ok and has_audio:
+                # Only the audio needs converting
+                output = ffmpeg.output(stream.video, stream.audio, output_path, vcodec='copy', **audio_encode_args)
+            elif video_ok:
+                # Add silence without touching the video
+                silent_audio = ffmpeg.input(SILENT_AUDIO, f='lavfi', t=silence_duration)
+                output = ffmpeg.output(stream.video, silent_audio, output_path, vcodec='copy', shortest=None,
+                                       **audio_encode_args)
+            else:
+                # Re-encode video to ensure consistent format
+                args = {**video_args(profile), **audio_encode_args}
+                video = conform_video(stream.video, profile)
+                if has_audio:
+                    output = ffmpeg.output(video, stream.audio, output_path, **args)
+                else:
+                    # Add silent audio in the same pass so every segment has an audio stream
+                    silent_audio = ffmpeg.input(SILENT_AUDIO, f='lavfi', t=silence_duration)
+                    output = ffmpeg.output(video, silent_audio, output_path, shortest=None, **args)
+            run_ffmpeg(output, name="normalize_scene")
+
+        return output_path
+    except ffmpeg.Error as e:
+        print(f"Error processing {file_path}: {e.stderr.decode() if e.stderr else e}")
+        return None
+    except Exception as e:
+        print(f"Unexpected error processing {file_path}: {str(e)}")
+        traceback.print_exc()
+        return None
+
+def _normalize_traced(file_path, duration, output_path, trace, remove_source=False, keep_path=None, profile=None):
+    """
+    Process-pool entry point: normalize a scene and hand back the spans it
+    recorded, so they end up in the parent's trace. With remove_source, the
+    scene file is deleted once its normalized segment exists. With keep_path,
+    the finished segment is renamed there, so it is never seen half-written.
+    """
+    if trace:
+        tracer.enable()
+        tracer.drain()
+    with tracer.span("normalize_scene", category="scene", file=os.path.basename(file_path)):
+        result = normalize_scene(file_path, duration, output_path, profile)
+    if keep_path:
+        if result:
+            os.replace(result, keep_path)
+            result = keep_path
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+    if result and remove_source:
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            print(f"Error deleting {file_path}: {e}")
+    return result, tracer.drain() if trace else []
+
+def _codec_signature(file_path):
+    """
+    Describe the codec parameters that must match for a stream-copy concat.
+    """
+    probe = probe_media(file_path)
+    signature = []
+    for stream in probe['streams']:
+        if stream['codec_type'] == 'video':
+            signature.append((
+                'video',
+                stream.get('codec_name'),
+                stream.get('profile'),
+                stream.get('width'),
+                stream.get('height'),
+                stream.get('pix_fmt'),
+                stream.get('r_frame_rate'),
+                stream.get('sample_aspect_ratio')
+            ))
+        elif stream['codec_type'] == 'audio':
+            signature.append((
+                'audio',
+                stream.get('codec_name'),
+                stream.get('sample_rate'),
+                stream.get('channels')
+            ))
+    return tuple(signature)
+
+def can_stream_copy(file_paths):
+    """
+    Check whether all segments share codec parameters, so they can be
+    concatenated without re-encoding.
+
+    Args:
+        file_paths (list): Paths of the segments to concatenate.
+
+    Returns:
+        bool: True if every segment has the same codec signature.
+    """
+    try:
+        signatures = {_codec_signature(path) for path in file_paths}
+    except ffmpeg.Error as e:
+        print(f"Error probing segments: {e.stderr.decode() if e.stderr else e}")
+        return False
+    return len(signatures) == 1
+
+def _default_workers():
+    return int(os.getenv("FFMPEG_WORKERS", os.cpu_count() or 1))
+
+def concat_segments(segments, output_path, temp_dir="./assets/temp", profile=None):
+    """
+    Concatenate normalized segments into the final video, remuxing with
+    stream copy when all segments share codec parameters.
+
+    Args:
+        segments (list): Paths of the normalized segments, in order.
         output_path (str): Path to save the final combined video.
+        temp_dir (str): Where the concat list file is written.
+        profile (str or dict): Render profile used if the segments must be re-encoded.
 
     Returns:
         str: Path to the final combined video, or None if an error occurs.
     """
-    # Create temporary directory for intermediate files
-    temp_dir = "./assets/temp"
-    os.makedirs(temp_dir, exist_ok=True)
+    if not segments:
+        print("Error: No valid files to concatenate")
+        return None
 
     # Create a temporary file list for FFmpeg concat
+    os.makedirs(temp_dir, exist_ok=True)
     temp_file_list = os.path.join(temp_dir, f"concat_list_{uuid.uuid4()}.txt")
-    temp_files = []
 
     try:
         with open(temp_file_list, "w") as f:
-            for file_path, duration in scene_files:
-                if not os.path.exists(file_path):
-                    print(f"Error: File {file_path} does not exist")
-                    continue
-
-                # Generate unique temporary file name
-                temp_video = os.path.join(temp_dir, f"temp_{uuid.uuid4()}.mp4")
-                temp_files.append(temp_video)
-
-                try:
-                    # Check if input has an audio stream
-                    probe = ffmpeg.probe(file_path)
-                    has_audio = any(stream['codec_type'] == 'audio' for stream in probe['streams'])
-
-                    # If it's an image, convert to video with specified duration
-                    if file_path.endswith(('.jpg', '.png')):
-                        (
-                            ffmpeg
-                            .input(file_path, t=duration)
-                            .filter('fps', fps=30)
-                            .output(temp_video, c_v='libx264', pix_fmt='yuv420p', s='1280x720', an=1)
-                            .run(overwrite_output=True)
-                        )
-                        # Add silent audio to ensure compatibility
-                        silent_audio = ffmpeg.input('anullsrc=channel_layout=stereo:sample_rate=44100', f='lavfi', t=duration)
-                        (
-                            ffmpeg
-                            .input(temp_video)
-                            .output(temp_video + '.tmp.mp4', c_v='copy', c_a='aac', ac=2, ar=44100, shortest=1)
-                            .run(overwrite_output=True)
-                        )
-                        os.replace(temp_video + '.tmp.mp4', temp_video)
-                    else:
-                        # Re-encode video to ensure consistent format
-                        stream = ffmpeg.input(file_path)
-                        args = {
-                            'c_v': 'libx264',
-                            'pix_fmt': 'yuv420p',
-                            'r': 30,
-                            's': '1280x720'
-                        }
-                        if has_audio:
-                            args['c_a'] = 'aac'
-                            args['ac'] = 2
-                            args['ar'] = 44100
-                        else:
-                            args['an'] = 1
-                        (
-                            stream
-                            .output(temp_video, **args)
-                            .run(overwrite_output=True)
-                        )
-                        # Add silent audio if no audio stream
-                        if not has_audio:
-                            silent_audio = ffmpeg.input('anullsrc=channel_layout=stereo:sample_rate=44100', f='lavfi', t=duration)
-                            (
-                                ffmpeg
-                                .input(temp_video)
-                                .output(temp_video + '.tmp.mp4', c_v='copy', c_a='aac', ac=2, ar=44100, shortest=1)
-                                .run(overwrite_output=True)
-                            )
-                            os.replace(temp_video + '.tmp.mp4', temp_video)
-
-                    f.write(f"file '{temp_video}'\n")
-                except ffmpeg.Error as e:
-                    print(f"Error processing {file_path}: {e.stderr.decode()}")
-                    continue
-                except Exception as e:
-                    print(f"Unexpected error processing {file_path}: {str(e)}")
-                    traceback.print_exc()
-                    continue
-
-        if not temp_files:
-            print("Error: No valid files to concatenate")
-            return None
+            for segment in segments:
+                f.write(f"file '{os.path.abspath(segment)}'\n")
 
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-        # Concatenate all files
+        # Concatenate all files, remuxing when the segments allow it
         try:
-            (
-                ffmpeg
-                .input(temp_file_list, format='concat', safe=0)
-                .output(output_path, c_v='libx264', c_a='aac', pix_fmt='yuv420p')
-                .run(overwrite_output=True)
-            )
+            source = ffmpeg.input(temp_file_list, format='concat', safe=0)
+            if can_stream_copy(segments):
+                output = source.output(output_path, c='copy')
+            else:
+                profile = get_profile(profile)
+                output = ffmpeg.output(conform_video(source.video, profile), source.audio, output_path,
+                                       **video_args(profile), **audio_args(profile))
+            run_ffmpeg(output, name="concat_segments")
             print(f"Final video saved to {output_path}")
             return output_path
         except ffmpeg.Error as e:
-            print(f"Error concatenating files: {e.stderr.decode()}")
+            print(f"Error concatenating files: {e.stderr.decode() if e.stderr else e}")
             return None
         except Exception as e:
             print(f"Unexpected error during concatenation: {str(e)}")
             traceback.print_exc()
             return None
-
     finally:
-        # Clean up temporary files
         if os.path.exists(temp_file_list):
             try:
                 os.remove(temp_file_list)
             except Exception as e:
                 print(f"Error deleting {temp_file_list}: {e}")
-        for temp_file in temp_files:
+
+class SceneAssembler:
+    """
+    Streaming assembly of the final video.
+
+    Each scene is handed to a normalization worker as soon as it is added, so
+    normalization overlaps with the scenes that are still being generated.
+    finish() waits for the outstanding segments and runs the concat in scene
+    order. add() may be called from several scene threads at once.
+
+    Segments can be kept (segment_path) and handed back on a later run with
+    add_segment(), so unchanged scenes skip rendering and normalization.
+
+    Several assemblers (e.g. the jobs of a batch) can share one process pool
+    by passing `pool`; a shared pool is left running by close().
+
+    on_segment(order, segment_path) is called as each added scene finishes
+    normalizing (segment_path is None if it failed).
+
+    With a `transition` duration, scenes are crossfaded instead of hard cut;
+    only the boundary windows are re-encoded (see crossfade_segments).
+    """
+
+    def __init__(self, max_workers=None, temp_dir="./assets/temp", profile=None, pool=None, on_segment=None,
+                 transition=None):
+        self.temp_dir = temp_dir
+        self.profile = get_profile(profile)
+        self.transition = TRANSITION_DURATION if transition is None else transition
+        self.on_segment = on_segment
+        os.makedirs(temp_dir, exist_ok=True)
+        self._owns_pool = pool is None
+        self._pool = pool or ProcessPoolExecutor(max_workers=max_workers or _default_workers())
+        self._segments = {}
+        self._temp_files = []
+        self._lock = threading.Lock()
+        self.completed = {}
+
+    def add(self, order, file_path, duration, remove_source=False, segment_path=None):
+        """
+        Start normalizing a finished scene.
+
+        Args:
+            order (int): Position of the scene in the final video (e.g. scene_number).
+            file_path (str): Rendered scene video or image.
+            duration (float): Scene duration in seconds.
+            remove_source (bool): Delete file_path once it is normalized
+                (for scene renders that only exist as intermediates).
+            segment_path (str): Keep the normalized segment at this path
+                instead of a temp file (see add_segment).
+        """
+        if segment_path:
+            os.makedirs(os.path.dirname(segment_path) or ".", exist_ok=True)
+            temp_video = f"{os.path.splitext(segment_path)[0]}.{uuid.uuid4().hex}.part.mp4"
+        else:
+            temp_video = os.path.join(self.temp_dir, f"temp_{uuid.uuid4()}.mp4")
+        with self._lock:
+            self._temp_files.append(temp_video)
+            future = self._pool.submit(
+                _normalize_traced, file_path, duration, temp_video, tracer.enabled, remove_source, segment_path,
+                self.profile
+            )
+            self._segments[order] = future
+        if self.on_segment:
+            future.add_done_callback(lambda done: self._segment_done(order, done))
+
+    def _segment_done(self, order, future):
+        try:
+            path = None if future.exception() else future.result()[0]
+            self.on_segment(order, path)
+        except Exception as e:
+            print(f"Error reporting segment {order}: {e}")
+
+    def add_segment(self, order, segment_path):
+        """
+        Add a segment normalized by an earlier run, skipping normalization.
+
+        Args:
+            order (int): Position of the scene in the final video.
+            segment_path (str): Normalized segment kept with add(segment_path=...).
+        """
+        future = Future()
+        future.set_result((segment_path, []))
+        with self._lock:
+            self._segments[order] = future
+
+    def finish(self, output_path):
+        """
+        Wait for all normalized segments and concatenate them in order.
+        The segments that made it into the video are left in `completed`
+        (order -> segment path).
+
+        Args:
+            output_path (str): Path to save the final combined video.
+
+        Returns:
+            str: Path to the final combined video, or None if an error occurs.
+        """
+        try:
+            with self._lock:
+                ordered = [(order, self._segments[order]) for order in sorted(self._segments)]
+            segments = []
+            with tracer.span("wait_for_segments", category="assembly"):
+                for order, future in ordered:
+                    path, events = future.result()
+                    tracer.merge(events)
+                    if path:
+                        self.completed[order] = path
+                        segments.append(path)
+            if self.transition > 0 and len(segments) > 1 and can_stream_copy(segments):
+                with tracer.span("crossfade", category="assembly", segments=len(segments)):
+                    final_path = crossfade_segments(
+                        segments, output_path, duration=self.transition, temp_dir=self.temp_dir,
+                        profile=self.profile
+                    )
+                if final_path:
+                    return final_path
+                print("Crossfade failed, joining the scenes with hard cuts")
+            with tracer.span("concat", category="assembly", segments=len(segments)):
+                return concat_segments(segments, output_path, temp_dir=self.temp_dir, profile=self.profile)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop the workers and clean up temporary files.
+        """
+        if self._owns_pool:
+            self._pool.shutdown(wait=True)
+        else:
+            with self._lock:
+                pending = list(self._segments.values())
+            wait(pending)
+        for temp_file in self._temp_files:
             if os.path.exists(temp_file):
                 try:
                     os.remove(temp_file)
                 except Exception as e:
-                    print(f"Error deleting {temp_file}: {e}")
\ No newline at end of file
+                    print(f"Error deleting {temp_file}: {e}")
+
+def combine_scenes(scene_files, output_path, max_workers=None, profile=None, transition=None):
+    """
+    Combine multiple scenes (videos or images) into a single video.
+
+    Scenes are normalized in parallel across a process pool. When every
+    normalized segment shares codec parameters the final concat is a stream
+    copy; otherwise it falls back to a full re-encode.
+
+    Args:
+        scene_files (list): List of tuples (file_path, duration_seconds).
+        output_path (str): Path to save the final combined video.
+        max_workers (int): Number of normalization processes. Defaults to
+            the FFMPEG_WORKERS environment variable or the CPU count.
+        profile (str or dict): Render profile of the output (see ffmpeg_tools.profiles).
+        transition (float): Crossfade length in seconds between scenes.
+            Defaults to TRANSITION_DURATION; 0 for hard cuts.
+
+    Returns:
+        str: Path to the final combined video, or None if an error occurs.
+    """
+    assembler = SceneAssembler(max_workers=max_workers, profile=profile, transition=transition)
+    for order, (file_path, duration) in enumerate(scene_files):
+        assembler.add(order, file_path, duration)
+    return assembler.finish(output_path)
@@ -1,16 +1,31 @@
 import ffmpeg
+from ffmpeg_tools.runner import run_ffmpeg, probe_media
+from ffmpeg_tools.profiles import get_profile, conform_video, video_args, audio_args
+
+DEFAULT_FPS = 30
+
+# Parameters used when an effect is requested by name from a scene plan
+EFFECT_PARAMS = {
+    "fade_in": {"duration": 2},
+    "fade_out": {"duration": 2},
+    "zoom_in": {"zoom_factor": 1.5},
+    "speed_up": {"speed_factor": 1.2},
+}
+
+# sidechaincompress settings used to duck a bed under the non-ducked beds
+DUCKING_PARAMS = {"threshold": 0.05, "ratio": 8, "attack": 20, "release": 300}
 
 def fade_in(input_path, duration, output_path):
     """
     Apply fade-in effect at the start of the video.
     duration: seconds of fade-in
     """
-    (
+    run_ffmpeg(
         ffmpeg
         .input(input_path)
         .filter('fade', type='in', start_time=0, duration=duration)
-        .output(output_path)
-        .run(overwrite_output=True)
+        .output(output_path),
+        name="fade_in"
     )
     return output_path
 
@@ -19,16 +34,16 @@ def fade_out(input_path, duration, output_path):
     Apply fade-out effect at the end of the video.
     duration: seconds of fade-out
     """
-    probe = ffmpeg.probe(input_path)
+    probe = probe_media(input_path)
     video_duration = float(probe['format']['duration'])
     start_time = video_duration - duration
 
-    (
+    run_ffmpeg(
         ffmpeg
         .input(input_path)
         .filter('fade', type='out', start_time=start_time, duration=duration)
-        .output(output_path)
-        .run(overwrite_output=True)
+        .output(output_path),
+        name="fade_out"
     )
     return output_path
 
@@ -36,12 +51,12 @@ def apply_grayscale(input_path, output_path):
     """
     Convert the video to grayscale.
     """
-    (
+    run_ffmpeg(
         ffmpeg
         .input(input_path)
         .filter('hue', s=0)
-        .output(output_path)
-        .run(overwrite_output=True)
+        .output(output_path),
+        name="apply_grayscale"
     )
     return output_path
 
@@ -53,12 +68,12 @@ def zoom_in(input_path, zoom_factor, duration, output_path):
     """
     zoom_expr = f"zoom+{(zoom_factor-1)*'t/{duration}'}"
     # Using zoompan filter for zoom effect - simplified here for demonstration
-    (
+    run_ffmpeg(
         ffmpeg
         .input(input_path)
         .filter('zoompan', z='min(zoom+0.0015, {0})'.format(zoom_factor), d=duration*30)  # assuming 30 fps
-        .output(output_path)
-        .run(overwrite_output=True)
+        .output(output_path),
+        name="zoom_in"
     )
     return output_path
 
@@ -67,12 +82,12 @@ def speed_up(input_path, speed_factor, output_path):
     Speed up the video by speed_factor.
     speed_factor >1 speeds up, <1 slows down.
     """
-    (
+    run_ffmpeg(
         ffmpeg
         .input(input_path)
         .filter('setpts', f'PTS/{speed_factor}')
-        .output(output_path)
-        .run(overwrite_output=True)
+        .output(output_path),
+        name="speed_up"
     )
     return output_path
 
@@ -89,9 +104,236 @@ def add_background_music(video_path, audio_path, output_path, video_volume=1.0,
 
     mixed_audio = ffmpeg.filter([video_audio, music_audio], 'amix', inputs=2, duration='shortest')
 
-    (
+    run_ffmpeg(
+        ffmpeg
+        .output(video.video, mixed_audio, output_path, vcodec='copy', acodec='aac', strict='experimental'),
+        name="add_background_music"
+    )
+    return output_path
+
+
+def build_effects_chain(stream, effects, duration, fps=DEFAULT_FPS):
+    """
+    Append the filters for a scene's ffmpeg_effects list to a single video stream.
+
+    Effects are applied in list order. The running clip duration is tracked so
+    fade_out can be placed without probing the file, and speed_up shortens the
+    duration seen by the effects that follow it.
+
+    Args:
+        stream: ffmpeg-python video stream to filter.
+        effects (list): Effect names from the scene plan (e.g. ["fade_in", "grayscale"]).
+        duration (float): Duration of the input clip in seconds.
+        fps (int): Frame rate used by frame-based filters such as zoompan.
+
+    Returns:
+        tuple: (filtered stream, duration of the filtered clip in seconds).
+    """
+    for effect in effects:
+        if effect == "fade_in":
+            fade_duration = EFFECT_PARAMS["fade_in"]["duration"]
+            stream = stream.filter('fade', type='in', start_time=0, duration=fade_duration)
+        elif effect == "fade_out":
+            fade_duration = EFFECT_PARAMS["fade_out"]["duration"]
+            start_time = max(duration - fade_duration, 0)
+            stream = stream.filter('fade', type='out', start_time=start_time, duration=fade_duration)
+        elif effect == "grayscale":
+            stream = stream.filter('hue', s=0)
+        elif effect == "zoom_in":
+            # One output frame per input frame, zoom grows linearly to zoom_factor
+            zoom_factor = EFFECT_PARAMS["zoom_in"]["zoom_factor"]
+            step = (zoom_factor - 1) / max(int(duration * fps), 1)
+            stream = stream.filter(
+                'zoompan',
+                z=f'min(1+{step}*on,{zoom_factor})',
+                x='iw/2-(iw/zoom/2)',
+                y='ih/2-(ih/zoom/2)',
+                d=1,
+                fps=fps
+            )
+        elif effect == "speed_up":
+            speed_factor = EFFECT_PARAMS["speed_up"]["speed_factor"]
+            stream = stream.filter('setpts', f'PTS/{speed_factor}')
+            duration = duration / speed_factor
+        else:
+            print(f"Unknown effect {effect}, skipping")
+    return stream, duration
+
+def effects_duration(effects, duration):
+    """
+    Duration of a clip after the effects list is applied (only speed_up changes it).
+    """
+    for effect in effects:
+        if effect == "speed_up":
+            duration = duration / EFFECT_PARAMS["speed_up"]["speed_factor"]
+    return duration
+
+def apply_effects(input_path, effects, duration, output_path, is_image=False, profile=None):
+    """
+    Apply a whole list of effects to a video or image in a single encode.
+
+    Args:
+        input_path (str): Source video or image.
+        effects (list): Effect names from the scene plan, applied in order.
+        duration (float): Duration of the source clip (or of the clip to make from an image).
+        output_path (str): Path to save the rendered video.
+        is_image (bool): Loop a still image for `duration` seconds instead of reading a video.
+        profile (str or dict): Render profile for the output format and encoder settings.
+
+    Returns:
+        str: Path to the rendered video.
+    """
+    profile = get_profile(profile)
+    fps = profile['fps']
+    if is_image:
+        source = ffmpeg.input(input_path, loop=1, t=duration, framerate=fps)
+    else:
+        source = ffmpeg.input(input_path)
+
+    video, _ = build_effects_chain(source.video, effects, duration, fps=fps)
+
+    run_ffmpeg(
+        ffmpeg
+        .output(conform_video(video, profile), output_path, **video_args(profile)),
+        name="apply_effects"
+    )
+    return output_path
+
+def has_audio_stream(media_path):
+    """
+    Check whether a media file contains at least one audio stream.
+    """
+    probe = probe_media(media_path)
+    return any(stream['codec_type'] == 'audio' for stream in probe['streams'])
+
+def build_audio_mix(audio_beds):
+    """
+    Build a single amix graph from any number of audio beds.
+
+    Each bed is a dict with:
+        path (str): Audio file to read (or `stream` with an existing ffmpeg-python audio stream).
+        volume (float): Gain applied to the bed. Defaults to 1.0.
+        offset (float): Seconds of silence before the bed starts. Defaults to 0.
+        duck (bool): Compress the bed whenever a non-ducked bed (e.g. voiceover) is playing.
+        tempo (float): Playback speed change, used to keep source audio in sync with speed_up.
+
+    Args:
+        audio_beds (list): Bed dicts as described above.
+
+    Returns:
+        ffmpeg-python audio stream, or None if there are no beds.
+    """
+    streams = []
+    for bed in audio_beds:
+        stream = bed["stream"] if "stream" in bed else ffmpeg.input(bed["path"]).audio
+        stream = stream.filter('aformat', sample_rates=44100, channel_layouts='stereo')
+        tempo = bed.get("tempo", 1.0)
+        if tempo != 1.0:
+            stream = stream.filter('atempo', tempo)
+        volume = bed.get("volume", 1.0)
+        if volume != 1.0:
+            stream = stream.filter('volume', volume)
+        offset_ms = int(bed.get("offset", 0) * 1000)
+        if offset_ms > 0:
+            stream = stream.filter('adelay', f'{offset_ms}|{offset_ms}')
+        streams.append(stream)
+
+    if not streams:
+        return None
+
+    ducked = [i for i, bed in enumerate(audio_beds) if bed.get("duck")]
+    keys = [i for i, bed in enumerate(audio_beds) if not bed.get("duck")]
+    if ducked and keys:
+        # Each key bed feeds both the mix and the sidechain
+        key_streams = []
+        for i in keys:
+            split = streams[i].asplit()
+            streams[i] = split[0]
+            key_streams.append(split[1])
+        if len(key_streams) == 1:
+            sidechain = key_streams[0]
+        else:
+            sidechain = ffmpeg.filter(key_streams, 'amix', inputs=len(key_streams), duration='longest', normalize=0)
+        sidechain_split = sidechain.asplit() if len(ducked) > 1 else None
+        for n, i in enumerate(ducked):
+            key = sidechain_split[n] if sidechain_split is not None else sidechain
+            streams[i] = ffmpeg.filter([streams[i], key], 'sidechaincompress', **DUCKING_PARAMS)
+
+    if len(streams) == 1:
+        return streams[0]
+    return ffmpeg.filter(streams, 'amix', inputs=len(streams), duration='longest', normalize=0)
+
+def render_scene(media_path, output_path, duration, effects=(), audio_beds=(), is_image=False,
+                 keep_source_audio=False, source_volume=1.0, profile=None):
+    """
+    Render a scene's video effects and its full audio mix with one ffmpeg process.
+
+    Args:
+        media_path (str): Source video or image.
+        output_path (str): Path to save the finished scene.
+        duration (float): Duration of the source clip (or of the clip to make from an image).
+        effects (list): Effect names from the scene plan, applied in order.
+        audio_beds (list): Audio beds to mix, see build_audio_mix.
+        is_image (bool): Loop a still image for `duration` seconds instead of reading a video.
+        keep_source_audio (bool): Mix the source video's own audio track in as a bed.
+        source_volume (float): Gain for the source audio when it is kept.
+        profile (str or dict): Render profile for the output format and encoder settings.
+
+    Returns:
+        str: Path to the rendered scene.
+    """
+    profile = get_profile(profile)
+    fps = profile['fps']
+    if is_image:
+        source = ffmpeg.input(media_path, loop=1, t=duration, framerate=fps)
+    else:
+        source = ffmpeg.input(media_path)
+
+    video, video_duration = build_effects_chain(source.video, effects, duration, fps=fps)
+
+    beds = list(audio_beds)
+    if keep_source_audio and not is_image:
+        # Keep the source audio in sync with speed_up
+        beds.insert(0, {"stream": source.audio, "volume": source_volume, "tempo": duration / video_duration})
+
+    encode_args = video_args(profile)
+    if not effects and not is_image:
+        encode_args = {'vcodec': 'copy'}
+    else:
+        video = conform_video(video, profile)
+
+    mixed_audio = build_audio_mix(beds)
+    if mixed_audio is None:
+        output = ffmpeg.output(video, output_path, t=video_duration, **encode_args)
+    else:
+        # Pad short beds with silence so audio covers the whole scene
+        mixed_audio = mixed_audio.filter('apad')
+        output = ffmpeg.output(video, mixed_audio, output_path, t=video_duration,
+                               **encode_args, **audio_args(profile))
+
+    run_ffmpeg(output, name="render_scene")
+    return output_path
+
+def mux_audio(video_path, output_path, duration, audio_beds, profile=None):
+    """
+    Mix audio beds onto an already rendered video, copying the video stream.
+
+    Args:
+        video_path (str): Rendered video (its own audio, if any, is ignored).
+        output_path (str): Path to save the finished scene.
+        duration (float): Duration of the video in seconds.
+        audio_beds (list): Audio beds to mix, see build_audio_mix.
+        profile (str or dict): Render profile for the audio encoder settings.
+
+    Returns:
+        str: Path to the finished scene.
+    """
+    profile = get_profile(profile)
+    video = ffmpeg.input(video_path).video
+    mixed_audio = build_audio_mix(audio_beds).filter('apad')
+    run_ffmpeg(
         ffmpeg
-        .output(video.video, mixed_audio, output_path, vcodec='copy', acodec='aac', strict='experimental')
-        .run(overwrite_output=True)
+        .output(video, mixed_audio, output_path, vcodec='copy', t=duration, **audio_args(profile)),
+        name="mux_audio"
     )
     return output_path
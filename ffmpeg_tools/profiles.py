@@ -0,0 +1,91 @@
+import os
+
+# Output format and encoder settings per render profile. Every profile keeps
+# H.264 High/yuv420p + AAC, so segments of one profile always stream-copy
+# concat. (superfast rather than ultrafast for drafts: ultrafast drops CABAC
+# and 8x8 transforms, which changes the H.264 profile.)
+RENDER_PROFILES = {
+    "draft": {
+        "width": 854,
+        "height": 480,
+        "fps": 15,
+        "preset": "superfast",
+        "crf": 30,
+        "audio_bitrate": "96k"
+    },
+    "final": {
+        "width": 1280,
+        "height": 720,
+        "fps": 30,
+        "preset": "medium",
+        "crf": 20,
+        "audio_bitrate": "192k"
+    },
+}
+
+DEFAULT_PROFILE = os.getenv("RENDER_PROFILE", "final")
+
+AUDIO_SAMPLE_RATE = 44100
+
+# Seconds between forced keyframes, so segments can be cut with stream copy
+# at predictable points (see ffmpeg_tools.transitions)
+KEYFRAME_INTERVAL = 1
+
+def get_profile(profile=None):
+    """
+    Resolve a render profile.
+
+    Args:
+        profile (str or dict): Profile name, an already resolved profile, or
+            None for DEFAULT_PROFILE.
+
+    Returns:
+        dict: Profile settings, including its "name".
+
+    Raises:
+        ValueError: If the name is not in RENDER_PROFILES.
+    """
+    if isinstance(profile, dict):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile {name!r}, expected one of {sorted(RENDER_PROFILES)}")
+    return {"name": name, **RENDER_PROFILES[name]}
+
+def frame_size(profile):
+    return f"{profile['width']}x{profile['height']}"
+
+def conform_video(stream, profile):
+    """
+    Scale a video stream to the profile's frame size with square pixels.
+
+    Frame sizes such as 854x480 are not exactly 16:9, so scaling alone
+    leaves a sample aspect ratio that depends on the source (e.g. 1280:1281
+    for a 720p clip). Every encode forces it to 1:1, so segments from
+    different sources still stream-copy into one file.
+    """
+    return stream.filter('scale', profile['width'], profile['height']).filter('setsar', 1)
+
+def video_args(profile):
+    """
+    ffmpeg output arguments for an H.264 encode in this profile's format,
+    with a keyframe every KEYFRAME_INTERVAL seconds.
+    """
+    gop = int(profile['fps'] * KEYFRAME_INTERVAL)
+    return {
+        'vcodec': 'libx264',
+        'pix_fmt': 'yuv420p',
+        'preset': profile['preset'],
+        'crf': profile['crf'],
+        's': frame_size(profile),
+        'r': profile['fps'],
+        'g': gop,
+        'keyint_min': gop,
+        'sc_threshold': 0
+    }
+
+def audio_args(profile):
+    """
+    ffmpeg output arguments for the AAC audio of this profile.
+    """
+    return {'acodec': 'aac', 'ac': 2, 'ar': AUDIO_SAMPLE_RATE, 'audio_bitrate': profile['audio_bitrate']}
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import threading
+import time
+import ffmpeg
+from instrumentation.tracing import tracer
+
+# ffmpeg processes run at once by this process, shared by every scene and job in it.
+# The limit is per process: each normalization worker process has its own, but
+# runs one ffmpeg at a time (see _default_workers in combine.py).
+MAX_FFMPEG_PROCESSES = int(os.getenv("FFMPEG_MAX_PROCESSES", os.cpu_count() or 1))
+_ffmpeg_slots = threading.BoundedSemaphore(MAX_FFMPEG_PROCESSES)
+
+def _read_pipe(pipe, chunks):
+    chunks.append(pipe.read())
+    pipe.close()
+
+def run_ffmpeg(stream_spec, name="ffmpeg", overwrite_output=True, quiet=False):
+    """
+    Run an ffmpeg-python graph, like stream_spec.run(), inside a trace span.
+
+    The span records the argv, the wall time, and the CPU time and peak memory
+    of the ffmpeg process itself (from its rusage, so concurrent runs in other
+    threads are not counted). At most MAX_FFMPEG_PROCESSES runs of this
+    process execute at once; further calls wait for a slot before the span
+    opens, and the wait is recorded on the span as queued_seconds.
+
+    Args:
+        stream_spec: ffmpeg-python output (or merged outputs) to run.
+        name (str): Span name, usually the calling function.
+        overwrite_output (bool): Pass -y to ffmpeg.
+        quiet (bool): Capture stdout and stderr instead of inheriting them.
+
+    Returns:
+        tuple: (stdout, stderr) bytes, or None for streams that were not captured.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status.
+    """
+    args = ffmpeg.compile(stream_spec, overwrite_output=overwrite_output)
+    pipe = subprocess.PIPE if quiet else None
+
+    queued = time.monotonic()
+    with _ffmpeg_slots, tracer.span(name, category="ffmpeg") as span:
+        if tracer.enabled:
+            span.set(argv=subprocess.list2cmdline(args), queued_seconds=round(time.monotonic() - queued, 6))
+        process = subprocess.Popen(args, stdout=pipe, stderr=pipe)
+
+        if not hasattr(os, "wait4"):
+            stdout, stderr = process.communicate()
+        else:
+            # Drain the pipes on threads so wait4 can reap the process and return its rusage
+            outputs = {"stdout": [], "stderr": []}
+            readers = [
+                threading.Thread(target=_read_pipe, args=(getattr(process, key), chunks), daemon=True)
+                for key, chunks in outputs.items() if getattr(process, key)
+            ]
+            for reader in readers:
+                reader.start()
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            for reader in readers:
+                reader.join()
+            stdout = outputs["stdout"][0] if outputs["stdout"] else None
+            stderr = outputs["stderr"][0] if outputs["stderr"] else None
+            # ru_maxrss is in KiB on Linux
+            span.set(cpu_seconds=round(usage.ru_utime + usage.ru_stime, 6), max_rss_mb=round(usage.ru_maxrss / 1024, 1))
+
+        span.set(returncode=process.returncode)
+        if process.returncode != 0:
+            raise ffmpeg.Error('ffmpeg', stdout, stderr)
+    return stdout, stderr
+
+def probe_media(filename, **kwargs):
+    """
+    ffmpeg.probe() inside a trace span.
+    """
+    with tracer.span("ffprobe", category="ffmpeg"):
+        return ffmpeg.probe(filename, **kwargs)
@@ -0,0 +1,181 @@
+import ffmpeg
+import os
+import uuid
+import traceback
+from ffmpeg_tools.runner import run_ffmpeg, probe_media
+from ffmpeg_tools.profiles import get_profile, conform_video, video_args, audio_args
+
+# Crossfade length in seconds between consecutive scenes; 0 keeps hard cuts
+TRANSITION_DURATION = float(os.getenv("TRANSITION_DURATION", 0))
+# Any ffmpeg xfade transition (fade, wipeleft, slideup, dissolve, ...)
+TRANSITION_TYPE = os.getenv("TRANSITION_TYPE", "fade")
+
+# Tolerance when comparing keyframe timestamps to cut points
+_EPSILON = 1e-3
+
+def keyframe_times(file_path):
+    """
+    Timestamps of the video keyframes of a file, read without decoding other frames.
+
+    Returns:
+        list: Keyframe times in seconds, ascending.
+    """
+    probe = probe_media(
+        file_path,
+        select_streams='v:0',
+        skip_frame='nokey',
+        show_entries='frame=pts_time,best_effort_timestamp_time'
+    )
+    times = []
+    for frame in probe.get('frames', []):
+        value = frame.get('pts_time', frame.get('best_effort_timestamp_time'))
+        if value not in (None, 'N/A'):
+            times.append(float(value))
+    return sorted(times)
+
+def plan_cuts(durations, keyframes, duration):
+    """
+    Decide where each segment is cut for crossfades of `duration` seconds.
+
+    The overlap window at a boundary runs from a keyframe of the outgoing
+    segment at least `duration` before its end, to the first keyframe of the
+    incoming segment at or after `duration`. Everything between the windows
+    starts on a keyframe and can be stream-copied. A boundary is left as a
+    hard cut when either segment is too short to give it a window.
+
+    Args:
+        durations (list): Segment durations in seconds.
+        keyframes (list): Keyframe times of each segment (see keyframe_times).
+        duration (float): Crossfade length in seconds.
+
+    Returns:
+        tuple: (heads, tails, fades): per segment, where its copied middle
+            starts and ends, and per boundary whether it crossfades.
+    """
+    heads = [0.0] * len(durations)
+    tails = list(durations)
+    fades = [False] * max(len(durations) - 1, 0)
+    for i in range(len(fades)):
+        tail_start = max(
+            (k for k in keyframes[i] if k <= durations[i] - duration + _EPSILON), default=None
+        )
+        head_end = next(
+            (k for k in keyframes[i + 1] if k >= duration - _EPSILON and k < durations[i + 1]), None
+        )
+        if tail_start is None or head_end is None or tail_start < heads[i] - _EPSILON:
+            continue
+        tails[i] = tail_start
+        heads[i + 1] = head_end
+        fades[i] = True
+    return heads, tails, fades
+
+def _copy_piece(file_path, start, end, output_path):
+    # Input seeking with stream copy starts at the keyframe at `start`
+    run_ffmpeg(
+        ffmpeg
+        .input(file_path, ss=start, t=end - start)
+        .output(output_path, c='copy', avoid_negative_ts='make_zero'),
+        name="copy_piece"
+    )
+
+def _crossfade_window(outgoing, tail_start, outgoing_duration, incoming, head_end, output_path,
+                      duration, transition, profile):
+    # Re-encode only the overlap: the outgoing tail crossfaded into the incoming head
+    tail = ffmpeg.input(outgoing, ss=tail_start)
+    head = ffmpeg.input(incoming, t=head_end)
+    video = ffmpeg.filter(
+        [
+            tail.video.filter('setpts', 'PTS-STARTPTS').filter('settb', 'AVTB'),
+            head.video.filter('setpts', 'PTS-STARTPTS').filter('settb', 'AVTB')
+        ],
+        'xfade',
+        transition=transition,
+        duration=duration,
+        offset=outgoing_duration - tail_start - duration
+    )
+    audio = ffmpeg.filter([tail.audio, head.audio], 'acrossfade', d=duration)
+    run_ffmpeg(
+        ffmpeg.output(conform_video(video, profile), audio, output_path, **video_args(profile), **audio_args(profile)),
+        name="crossfade_window"
+    )
+
+def crossfade_segments(segments, output_path, duration=TRANSITION_DURATION, transition=TRANSITION_TYPE,
+                       temp_dir="./assets/temp", profile=None):
+    """
+    Join normalized segments with crossfades, re-encoding only the boundaries.
+
+    Each boundary is rendered as a short window (xfade + acrossfade) cut at
+    keyframes on both sides; the middle of every segment is stream-copied
+    and the pieces are joined with a copy concat. Renders have a keyframe
+    every KEYFRAME_INTERVAL seconds, so a window is at most about one
+    interval longer than the crossfade. The video gets `duration` shorter
+    per crossfaded boundary.
+
+    The segments must share codec parameters (see can_stream_copy).
+
+    Args:
+        segments (list): Paths of the normalized segments, in order.
+        output_path (str): Path to save the final video.
+        duration (float): Crossfade length in seconds.
+        transition (str): xfade transition name.
+        temp_dir (str): Where the pieces and the concat list are written.
+        profile (str or dict): Render profile of the segments.
+
+    Returns:
+        str: Path to the final video, or None if an error occurs.
+    """
+    if not segments:
+        print("Error: No valid files to concatenate")
+        return None
+    profile = get_profile(profile)
+    os.makedirs(temp_dir, exist_ok=True)
+    run_id = uuid.uuid4().hex
+    pieces = []
+    temp_file_list = os.path.join(temp_dir, f"concat_list_{run_id}.txt")
+
+    def piece_path():
+        path = os.path.join(temp_dir, f"piece_{run_id}_{len(pieces)}.mp4")
+        pieces.append(path)
+        return path
+
+    try:
+        durations = [float(probe_media(segment)['format']['duration']) for segment in segments]
+        keyframes = [keyframe_times(segment) for segment in segments]
+        heads, tails, fades = plan_cuts(durations, keyframes, duration)
+        print(f"Crossfading {sum(fades)} of {len(fades)} scene boundaries")
+
+        for i, segment in enumerate(segments):
+            if tails[i] - heads[i] > _EPSILON:
+                _copy_piece(segment, heads[i], tails[i], piece_path())
+            if i < len(fades) and fades[i]:
+                _crossfade_window(
+                    segment, tails[i], durations[i], segments[i + 1], heads[i + 1], piece_path(),
+                    duration, transition, profile
+                )
+
+        with open(temp_file_list, "w") as f:
+            for piece in pieces:
+                f.write(f"file '{os.path.abspath(piece)}'\n")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        run_ffmpeg(
+            ffmpeg
+            .input(temp_file_list, format='concat', safe=0)
+            .output(output_path, c='copy'),
+            name="concat_pieces"
+        )
+        print(f"Final video saved to {output_path}")
+        return output_path
+    except ffmpeg.Error as e:
+        print(f"Error crossfading segments: {e.stderr.decode() if e.stderr else e}")
+        return None
+    except Exception as e:
+        print(f"Unexpected error during crossfade: {str(e)}")
+        traceback.print_exc()
+        return None
+    finally:
+        for path in pieces + [temp_file_list]:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception as e:
+                    print(f"Error deleting {path}: {e}")
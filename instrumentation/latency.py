@@ -0,0 +1,185 @@
+import atexit
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: merges are not serialized between processes
+    fcntl = None
+
+LATENCY_HISTORY_PATH = os.getenv("LATENCY_HISTORY_PATH", "./assets/latency_history.json")
+
+# Samples kept per request shape (the most recent ones)
+MAX_SAMPLES = 100
+# New samples are written after this many have accumulated, or this many seconds after the last write
+FLUSH_SAMPLES = 10
+FLUSH_INTERVAL = 30.0
+
+# Seconds assumed for a provider or stage that has no history yet
+DEFAULT_ESTIMATES = {
+    "openai": 20.0,
+    "leonardo": 15.0,
+    "veo3": 180.0,
+    "elevenlabs": 5.0,
+    "suno": 60.0,
+    "render": 10.0,
+}
+
+def request_shape(kind, duration=None, text=None):
+    """
+    Bucketed description of a request, so similar requests share history.
+
+    Durations are kept to the second and text lengths rounded up to 100
+    characters, e.g. "video:8s" or "text:300".
+    """
+    shape = kind
+    if duration is not None:
+        shape += f":{int(math.ceil(float(duration)))}s"
+    if text is not None:
+        shape += f":{int(math.ceil(max(len(text), 1) / 100.0) * 100)}"
+    return shape
+
+class LatencyHistory:
+    """
+    Persistent latency samples per provider and request shape.
+
+    Every finished provider call (and scene render) records how long it
+    took; the samples survive the run in a small JSON file, so the next run
+    can estimate how long each scene will take before starting it (see
+    SceneScheduler) and how long a call normally takes. All access goes
+    through one lock.
+
+    Several processes (main, batch, daemon) can share the file, so new
+    samples are written in batches (every FLUSH_SAMPLES samples or
+    FLUSH_INTERVAL seconds, and at exit) and merged into the copy on disk
+    under a file lock, then written with an atomic rename.
+    """
+
+    def __init__(self, path=LATENCY_HISTORY_PATH, max_samples=MAX_SAMPLES,
+                 flush_samples=FLUSH_SAMPLES, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_samples = max_samples
+        self.flush_samples = flush_samples
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._samples = self._load()
+        self._unsaved = {}
+        self._unsaved_count = 0
+        self._last_flush = time.monotonic()
+
+    def record(self, provider, shape, seconds):
+        """
+        Add one latency sample of a successful call; it is saved with the next flush.
+        """
+        key = f"{provider}/{shape}"
+        sample = round(seconds, 3)
+        with self._lock:
+            samples = self._samples.setdefault(key, [])
+            samples.append(sample)
+            del samples[:-self.max_samples]
+            self._unsaved.setdefault(key, []).append(sample)
+            self._unsaved_count += 1
+            due = (
+                self._unsaved_count >= self.flush_samples
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def timed_call(self, provider, shape, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) and record its duration if it succeeded.
+
+        Calls that raise or return None (how renders and provider calls report
+        failure) are not recorded, so fast failures do not pull estimates down.
+        """
+        start = time.monotonic()
+        result = fn(*args, **kwargs)
+        if result is not None:
+            self.record(provider, shape, time.monotonic() - start)
+        return result
+
+    def _matching(self, provider, shape):
+        with self._lock:
+            samples = self._samples.get(f"{provider}/{shape}")
+            if samples:
+                return list(samples)
+            # Nothing for this exact shape: fall back to the same kind, then to the provider
+            kind = shape.split(":")[0] if shape else ""
+            for prefix in (f"{provider}/{kind}:", f"{provider}/{kind}", f"{provider}/"):
+                matched = [
+                    value for key, values in self._samples.items() if key.startswith(prefix) for value in values
+                ]
+                if matched:
+                    return matched
+        return []
+
+    def sample_count(self, provider, shape=""):
+        """
+        Number of samples behind the estimates of a request shape (0 when they are DEFAULT_ESTIMATES).
+        """
+        return len(self._matching(provider, shape))
+
+    def estimate(self, provider, shape=""):
+        """
+        Expected seconds for a request: the median of its history, or DEFAULT_ESTIMATES.
+        """
+        return self.percentile(provider, shape, 50)
+
+    def percentile(self, provider, shape="", percent=95):
+        """
+        Latency percentile of a request shape (nearest-rank), falling back to
+        similar shapes, then to DEFAULT_ESTIMATES.
+
+        Returns:
+            float: Seconds.
+        """
+        samples = sorted(self._matching(provider, shape))
+        if not samples:
+            return DEFAULT_ESTIMATES.get(provider, DEFAULT_ESTIMATES["render"])
+        rank = max(int(math.ceil(percent / 100.0 * len(samples))) - 1, 0)
+        return samples[rank]
+
+    def flush(self):
+        """
+        Merge the samples recorded since the last flush into the file on disk.
+
+        Samples written by other processes in the meantime are kept, and this
+        process's view is refreshed with them.
+        """
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            self._unsaved_count = 0
+            self._last_flush = time.monotonic()
+            if not unsaved:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(f"{self.path}.lock", "w") as lock_file:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    merged = self._load()
+                    for key, samples in unsaved.items():
+                        merged[key] = (merged.get(key, []) + samples)[-self.max_samples:]
+                    temp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+                    with open(temp_path, "w") as f:
+                        json.dump(merged, f)
+                    os.replace(temp_path, self.path)
+                self._samples = merged
+            except OSError as e:
+                print(f"Error saving latency history {self.path}: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+# Shared history used by every scene and job of the process
+latency_history = LatencyHistory()
+atexit.register(latency_history.flush)
@@ -0,0 +1,252 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# Tracing is off unless enabled here or with tracer.enable()
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "").lower() in ("1", "true", "yes")
+TRACE_DIR = os.getenv("TRACE_DIR", "./assets/traces")
+
+class _NullSpan:
+    """
+    Returned by Tracer.span() while tracing is disabled; every method is a no-op.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+    def add(self, key, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """
+    One timed region of a run. Recorded as a Chrome trace "complete" event on exit.
+
+    Use set() and add() to attach details (HTTP status, bytes, argv, ...) while
+    the span is open.
+    """
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self._wall_start = time.time()
+        self._start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        # Spans that run a subprocess report its CPU time instead of this thread's
+        self.args.setdefault("cpu_seconds", round(time.thread_time() - self._cpu_start, 6))
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._pop(self)
+        self.tracer._record({
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": int(self._wall_start * 1e6),
+            "dur": int(duration * 1e6),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args
+        })
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def add(self, key, value):
+        self.args[key] = self.args.get(key, 0) + value
+
+class Tracer:
+    """
+    Collects spans for the plan, provider calls, ffmpeg runs and scenes of a run.
+
+    Spans are kept in memory and exported as a Chrome trace (chrome://tracing
+    or Perfetto) and as a summary table. While disabled, span() returns a
+    shared no-op object, so instrumented code pays one attribute check.
+    """
+
+    def __init__(self, enabled=TRACE_ENABLED):
+        self.enabled = enabled
+        self._events = []
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, category="pipeline", **args):
+        """
+        Time a block of code.
+
+        Args:
+            name (str): Span name; spans with the same name are aggregated in summary().
+            category (str): Grouping such as "provider", "ffmpeg", "http" or "scene".
+            **args: Details stored with the span.
+
+        Returns:
+            Context manager yielding the span (or a no-op span when disabled).
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, category, args)
+
+    def traced(self, name=None, category="pipeline"):
+        """
+        Decorator that runs the whole function inside a span.
+        """
+        def decorator(fn):
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.span(span_name, category):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current(self):
+        """
+        Innermost open span of the calling thread (a no-op span if there is none).
+        """
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else _NULL_SPAN
+
+    def _push(self, span):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        self._local.stack.append(span)
+
+    def _pop(self, span):
+        # Generators can close their span out of order, so remove this span rather than the top
+        stack = getattr(self._local, "stack", [])
+        if span in stack:
+            stack.remove(span)
+
+    def _record(self, event):
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault((event["pid"], event["tid"]), threading.current_thread().name)
+
+    def reset(self):
+        """
+        Drop every recorded span (start of a new run).
+        """
+        with self._lock:
+            self._events = []
+            self._thread_names = {}
+
+    def drain(self):
+        """
+        Return and clear the recorded events, e.g. to ship them out of a worker process.
+        """
+        with self._lock:
+            events, self._events = self._events, []
+            names = [
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for (pid, tid), name in self._thread_names.items()
+            ]
+            self._thread_names = {}
+        return names + events
+
+    def merge(self, events):
+        """
+        Add events recorded elsewhere (see drain()) to this tracer.
+        """
+        with self._lock:
+            for event in events:
+                if event.get("ph") == "M":
+                    self._thread_names.setdefault((event["pid"], event["tid"]), event["args"]["name"])
+                else:
+                    self._events.append(event)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def export_chrome_trace(self, path):
+        """
+        Write the recorded spans in the Chrome trace event format.
+
+        Returns:
+            str: path.
+        """
+        with self._lock:
+            events = [
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for (pid, tid), name in self._thread_names.items()
+            ] + list(self._events)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(temp_path, path)
+        return path
+
+    def stats(self):
+        """
+        Aggregate spans by category and name.
+
+        Returns:
+            list: Dicts with category, name, count, total, mean, max, cpu
+            (seconds) and bytes, sorted by total time.
+        """
+        rows = {}
+        for event in self.events():
+            key = (event["cat"], event["name"])
+            row = rows.setdefault(key, {
+                "category": event["cat"], "name": event["name"],
+                "count": 0, "total": 0.0, "max": 0.0, "cpu": 0.0, "bytes": 0, "errors": 0
+            })
+            seconds = event["dur"] / 1e6
+            row["count"] += 1
+            row["total"] += seconds
+            row["max"] = max(row["max"], seconds)
+            row["cpu"] += event["args"].get("cpu_seconds", 0)
+            row["bytes"] += event["args"].get("bytes_downloaded", 0)
+            row["errors"] += 1 if "error" in event["args"] else 0
+        for row in rows.values():
+            row["mean"] = row["total"] / row["count"]
+        return sorted(rows.values(), key=lambda row: row["total"], reverse=True)
+
+    def summary(self):
+        """
+        Summary table of the recorded spans, one line per category and name.
+        Times are summed across threads, so parallel spans can exceed the run's wall time.
+        """
+        lines = [
+            f"{'category':<10} {'name':<28} {'count':>6} {'total s':>9} {'mean s':>8} "
+            f"{'max s':>8} {'cpu s':>8} {'MB':>8} {'errors':>6}"
+        ]
+        for row in self.stats():
+            lines.append(
+                f"{row['category']:<10} {row['name'][:28]:<28} {row['count']:>6} {row['total']:>9.2f} "
+                f"{row['mean']:>8.2f} {row['max']:>8.2f} {row['cpu']:>8.2f} "
+                f"{row['bytes'] / 1e6:>8.1f} {row['errors']:>6}"
+            )
+        return "\n".join(lines)
+
+# Process-wide tracer used by every instrumented module
+tracer = Tracer()
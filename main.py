@@ -1,58 +1,63 @@
 import os
 import json
+import argparse
 import uuid
 import threading
 from dotenv import load_dotenv
+
+# Load environment variables once, before the project modules read their settings
+load_dotenv()
+
 from prompts.scene_generator import generate_video_plan_from_prompt
-from ai_services.LeonardoAi import generate_leonardo_image
+from ai_services.LeonardoAI import generate_leonardo_image
 from ai_services.veo3 import generate_veo3_video
 from ai_services.voiceover import generate_voiceover
 from ai_services.music import generate_suno_music_and_save
 from ffmpeg_tools.effects import fade_in, fade_out, apply_grayscale, zoom_in, speed_up, add_background_music
 from ffmpeg_tools.combine import combine_scenes
 from video_processing.scene_processor import process_scene
+from video_processing.pipeline import generate_video
+from video_processing.manifest import load_plan
+from ffmpeg_tools.profiles import RENDER_PROFILES, DEFAULT_PROFILE
 
 def main():
-    # Load environment variables
-    load_dotenv()
+    parser = argparse.ArgumentParser(description="AI Video Generator")
+    parser.add_argument("--plan", help="Render this plan JSON (or the plan in a run manifest) instead of asking the LLM")
+    parser.add_argument("--output", help="Path of the final video")
+    parser.add_argument("--profile", choices=sorted(RENDER_PROFILES), default=DEFAULT_PROFILE,
+                        help="Render profile; draft renders a fast low-resolution preview")
+    parser.add_argument("--transition", type=float,
+                        help="Crossfade length in seconds between scenes (default TRANSITION_DURATION, 0 for hard cuts)")
+    parser.add_argument("--deadline", type=float,
+                        help="Time budget in seconds; late videos fall back to stills and late music is dropped "
+                             "(default JOB_DEADLINE_SECONDS, 0 for none)")
+    args = parser.parse_args()
 
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-    # Prompt user for video description
-    print("Welcome to the AI Video Generator!")
-    user_prompt = input("Please enter a description for your video: ")
-
-    # Generate video plan
-    os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY  # Set for scene_generator.py
-    video_plan = generate_video_plan_from_prompt(user_prompt)
-    if not video_plan or "scenes" not in video_plan:
-        print("Failed to generate video plan.")
-        return
-
-    # Process scenes concurrently
-    scene_files = []
-    lock = threading.Lock()
-    threads = []
-
-    for scene in video_plan["scenes"]:
-        thread = threading.Thread(target=process_scene, args=(scene, scene_files, lock))
-        threads.append(thread)
-        thread.start()
-
-    # Wait for all threads to complete
-    for thread in threads:
-        thread.join()
-
-    # Combine all scenes into final video
-    if scene_files:
-        final_output = "./assets/final/final_video.mp4"
-        try:
-            combine_scenes(scene_files, final_output)
-            print(f"Final video saved to {final_output}")
-        except Exception as e:
-            print(f"Error combining scenes: {e}")
+    plan = None
+    if args.plan:
+        # Re-render an existing (possibly edited) plan; unchanged scenes are reused
+        plan = load_plan(args.plan)
+        user_prompt = ""
     else:
-        print("No scenes were successfully processed.")
+        # Prompt user for video description
+        print("Welcome to the AI Video Generator!")
+        user_prompt = input("Please enter a description for your video: ")
+
+    # Generate the plan and scenes, assembling each scene as it finishes
+    if OPENAI_API_KEY:
+        os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY  # Set for scene_generator.py
+    final_output = args.output or "./assets/final/final_video.mp4"
+    if not args.output and args.profile != "final":
+        # Keep previews next to, not over, the final cut
+        final_output = f"./assets/final/final_video_{args.profile}.mp4"
+    try:
+        if generate_video(user_prompt, final_output, plan=plan, profile=args.profile, transition=args.transition,
+                          deadline=args.deadline):
+            print(f"Final video saved to {final_output}")
+    except Exception as e:
+        print(f"Error generating video: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,18 @@
 import openai
 import json
 import os
+from ai_services.cache import asset_cache
+from ai_services.limits import provider_slot
+from instrumentation.tracing import tracer
 
-def generate_video_plan_from_prompt(user_prompt):
-    system_prompt = """
+MODEL = "gpt-4-0613"
+TEMPERATURE = 0.9
+PLAN_DIR = "./assets/plans"
+
+# Keys every scene needs before it can be scheduled
+REQUIRED_SCENE_KEYS = ("scene_number", "description", "type", "duration", "audio")
+
+SYSTEM_PROMPT = """
 You are an AI video scene planner.
 
 You receive a prompt describing a video that someone wants to generate. Break it down into a list of scenes. Each scene should include:
@@ -51,20 +60,211 @@ You receive a prompt describing a video that someone wants to generate. Break it
 }
 """
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4-0613",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.9
-    )
+def scene_error(scene):
+    """
+    Check that a planned scene has everything scene processing reads.
+
+    Returns:
+        str or None: Why the scene is unusable, or None if it is valid.
+    """
+    if not isinstance(scene, dict):
+        return "not an object"
+    missing = [key for key in REQUIRED_SCENE_KEYS if key not in scene]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if not isinstance(scene["scene_number"], int):
+        return f"scene_number {scene['scene_number']!r} is not an integer"
+    if scene["type"] not in ("image", "video"):
+        return f"unknown type {scene['type']!r}"
+    if not isinstance(scene["duration"], (int, float)) or scene["duration"] <= 0:
+        return f"invalid duration {scene['duration']!r}"
+    if not isinstance(scene["audio"], dict):
+        return "audio is not an object"
+    return None
+
+def valid_scenes(scenes):
+    """
+    Yield the usable scenes of a plan, logging and skipping the others.
+    Scenes without ffmpeg_effects get an empty list.
+    """
+    for scene in scenes:
+        error = scene_error(scene)
+        if error:
+            print(f"⚠️ Skipping invalid scene ({error}): {scene}")
+            continue
+        scene.setdefault("ffmpeg_effects", [])
+        yield scene
+
+class ScenesStreamParser:
+    """
+    Incremental JSON parser for a streamed video plan.
+
+    Feed it the response text chunk by chunk; it returns every object of the
+    top-level "scenes" array as soon as that object's closing brace arrives.
+    Anything before the first brace (e.g. a code fence) is ignored, and
+    scenes that fail scene_error are logged and skipped.
+    """
+
+    def __init__(self):
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._last_string = None
+        self._capture = None
+
+    def feed(self, text):
+        """
+        Parse the next chunk of the response.
+
+        Args:
+            text (str): Next piece of streamed content.
+
+        Returns:
+            list: Scene dicts completed by this chunk.
+        """
+        scenes = []
+        for ch in text:
+            if self._capture is not None:
+                self._capture.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                else:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == "{":
+                if self._stack and self._stack[-1] == "scenes" and self._capture is None:
+                    self._capture = [ch]
+                self._stack.append("{")
+            elif ch == "[":
+                # The array that follows the root object's "scenes" key
+                if self._stack == ["{"] and self._last_string == "scenes":
+                    self._stack.append("scenes")
+                else:
+                    self._stack.append("[")
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._capture is not None and self._stack and self._stack[-1] == "scenes":
+                    raw = "".join(self._capture)
+                    self._capture = None
+                    try:
+                        scenes.extend(valid_scenes([json.loads(raw)]))
+                    except json.JSONDecodeError:
+                        print(f"⚠️ Failed to parse streamed scene:\n{raw}")
+        return scenes
+
+def _plan_cache_key(user_prompt):
+    return asset_cache.make_key("openai", user_prompt, model=MODEL, temperature=TEMPERATURE, system_prompt=SYSTEM_PROMPT)
+
+def _load_cached_plan(user_prompt):
+    """
+    Return the cached plan for this prompt, or None.
+    """
+    plan_path = os.path.join(PLAN_DIR, f"{_plan_cache_key(user_prompt)}.json")
+    if not asset_cache.fetch(_plan_cache_key(user_prompt), plan_path):
+        return None
+    try:
+        with open(plan_path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _save_cached_plan(user_prompt, video_plan):
+    os.makedirs(PLAN_DIR, exist_ok=True)
+    plan_path = os.path.join(PLAN_DIR, f"{_plan_cache_key(user_prompt)}.json")
+    with open(plan_path, "w") as f:
+        json.dump(video_plan, f)
+    asset_cache.store(_plan_cache_key(user_prompt), plan_path)
+
+def _messages(user_prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+@tracer.traced("openai.plan", category="provider")
+def generate_video_plan_from_prompt(user_prompt):
+    cached_plan = _load_cached_plan(user_prompt)
+    if cached_plan:
+        return cached_plan
+
+    with provider_slot("openai"):
+        response = openai.ChatCompletion.create(
+            model=MODEL,
+            messages=_messages(user_prompt),
+            temperature=TEMPERATURE
+        )
 
     content = response['choices'][0]['message']['content']
     try:
         video_plan = json.loads(content)
+        _save_cached_plan(user_prompt, video_plan)
         return video_plan
     except json.JSONDecodeError:
         print("⚠️ Failed to parse JSON. Raw output:\n")
         print(content)
-        return None
\ No newline at end of file
+        return None
+
+def stream_video_plan_from_prompt(user_prompt):
+    """
+    Stream a video plan, yielding each scene as soon as it is complete.
+
+    Uses the streaming completion API with ScenesStreamParser, so scene
+    processing can start while the rest of the plan is still being written.
+    Complete plans are cached by prompt hash and replayed on repeat runs.
+    Invalid scenes are skipped (see scene_error). Closing the generator
+    (e.g. when the job is cancelled) ends the stream and frees the OpenAI slot.
+
+    Args:
+        user_prompt (str): Description of the video.
+
+    Yields:
+        dict: Scene data in plan order.
+    """
+    cached_plan = _load_cached_plan(user_prompt)
+    if cached_plan:
+        yield from valid_scenes(cached_plan.get("scenes", []))
+        return
+
+    parser = ScenesStreamParser()
+    content = []
+    with tracer.span("openai.plan_stream", category="provider") as span, provider_slot("openai"):
+        response = openai.ChatCompletion.create(
+            model=MODEL,
+            messages=_messages(user_prompt),
+            temperature=TEMPERATURE,
+            stream=True
+        )
+        try:
+            for chunk in response:
+                delta = chunk['choices'][0].get('delta', {}).get('content')
+                if not delta:
+                    continue
+                content.append(delta)
+                for scene in parser.feed(delta):
+                    span.add("scenes", 1)
+                    yield scene
+        except GeneratorExit:
+            # The consumer stopped early: drop the stream, the slot is released on the way out
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+            raise
+
+    try:
+        _save_cached_plan(user_prompt, json.loads("".join(content)))
+    except json.JSONDecodeError:
+        print("⚠️ Failed to parse JSON. Raw output:\n")
+        print("".join(content))
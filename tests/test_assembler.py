@@ -0,0 +1,86 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from ffmpeg_tools import combine
+from ffmpeg_tools.combine import SceneAssembler
+
+@pytest.fixture
+def assembly(tmp_path, monkeypatch):
+    # Normalize by copying the file and record what gets concatenated
+    normalized, concatenated = [], []
+
+    def normalize(file_path, duration, output_path, profile=None):
+        if "broken" in file_path:
+            return None
+        with open(file_path, "rb") as src, open(output_path, "wb") as dst:
+            dst.write(src.read())
+        normalized.append(os.path.basename(file_path))
+        return output_path
+
+    def concat(segments, output_path, temp_dir=None, profile=None):
+        contents = []
+        for path in segments:
+            with open(path, "rb") as f:
+                contents.append(f.read().decode())
+        concatenated.append(contents)
+        return output_path
+
+    monkeypatch.setattr(combine, "normalize_scene", normalize)
+    monkeypatch.setattr(combine, "concat_segments", concat)
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield tmp_path, normalized, concatenated, pool
+    pool.shutdown()
+
+def _scene(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(name.encode())
+    return str(path)
+
+def test_segments_are_joined_in_scene_order(assembly):
+    tmp_path, normalized, concatenated, pool = assembly
+    assembler = SceneAssembler(temp_dir=str(tmp_path / "temp"), pool=pool, transition=0)
+    # Scenes finish out of order
+    assembler.add(3, _scene(tmp_path, "c.mp4"), 5)
+    assembler.add(1, _scene(tmp_path, "a.mp4"), 5)
+    assembler.add(2, _scene(tmp_path, "broken.mp4"), 5)
+    assert assembler.finish(str(tmp_path / "final.mp4"))
+    assert concatenated == [["a.mp4", "c.mp4"]]
+    assert sorted(assembler.completed) == [1, 3]
+    # Temp segments are removed once the video is joined
+    assert os.listdir(tmp_path / "temp") == []
+
+def test_each_segment_is_reported_when_normalized(assembly):
+    tmp_path, _, _, pool = assembly
+    reported = []
+    done = threading.Event()
+
+    def on_segment(order, path):
+        reported.append((order, path is not None))
+        if len(reported) == 2:
+            done.set()
+
+    assembler = SceneAssembler(temp_dir=str(tmp_path / "temp"), pool=pool, transition=0, on_segment=on_segment)
+    assembler.add(1, _scene(tmp_path, "a.mp4"), 5)
+    assembler.add(2, _scene(tmp_path, "broken.mp4"), 5)
+    assert done.wait(5)
+    assembler.close()
+    assert sorted(reported) == [(1, True), (2, False)]
+
+def test_kept_segments_and_reused_segments(assembly):
+    tmp_path, normalized, concatenated, pool = assembly
+    reused = _scene(tmp_path, "reused.mp4")
+    kept = str(tmp_path / "renders" / "b.mp4")
+    source = _scene(tmp_path, "b.mp4")
+
+    assembler = SceneAssembler(temp_dir=str(tmp_path / "temp"), pool=pool, transition=0)
+    assembler.add_segment(1, reused)
+    assembler.add(2, source, 5, remove_source=True, segment_path=kept)
+    assembler.finish(str(tmp_path / "final.mp4"))
+
+    # The reused segment is never normalized again; the new one is kept and its source removed
+    assert normalized == ["b.mp4"]
+    assert concatenated == [["reused.mp4", "b.mp4"]]
+    assert assembler.completed == {1: reused, 2: kept}
+    assert os.path.exists(kept)
+    assert not os.path.exists(source)
@@ -0,0 +1,68 @@
+import ffmpeg
+import pytest
+from ffmpeg_tools import effects
+from ffmpeg_tools.effects import build_audio_mix, render_scene
+
+def _command(stream):
+    return " ".join(ffmpeg.compile(ffmpeg.output(stream, "out.m4a")))
+
+@pytest.fixture
+def compiled(monkeypatch):
+    # Capture the ffmpeg command lines instead of running them
+    commands = []
+    monkeypatch.setattr(effects, "run_ffmpeg", lambda spec, name="ffmpeg", **kwargs: commands.append(
+        " ".join(ffmpeg.compile(spec))))
+    return commands
+
+def test_no_beds_means_no_mix():
+    assert build_audio_mix([]) is None
+
+def test_single_bed_is_not_mixed():
+    command = _command(build_audio_mix([{"path": "voice.mp3"}]))
+    assert "amix" not in command
+    assert "aformat=channel_layouts=stereo:sample_rates=44100" in command
+
+def test_beds_are_mixed_in_one_graph_with_volume_and_offset():
+    command = _command(build_audio_mix([
+        {"path": "voice.mp3"},
+        {"path": "music.mp3", "volume": 0.3, "offset": 1.5},
+    ]))
+    assert command.count("-i ") == 2
+    assert "volume=0.3" in command
+    assert "adelay=1500|1500" in command
+    assert "amix=duration=longest:inputs=2:normalize=0" in command
+    assert "sidechaincompress" not in command
+
+def test_ducked_bed_is_compressed_under_the_voice():
+    command = _command(build_audio_mix([
+        {"path": "voice.mp3"},
+        {"path": "music.mp3", "volume": 0.3, "duck": True},
+    ]))
+    # The voice feeds the mix and the sidechain key
+    assert command.count("asplit") == 1
+    assert command.count("sidechaincompress") == 1
+    assert "amix=duration=longest:inputs=2:normalize=0" in command
+
+def test_every_ducked_bed_gets_the_combined_key():
+    command = _command(build_audio_mix([
+        {"path": "voice.mp3"},
+        {"path": "source.mp4"},
+        {"path": "music.mp3", "duck": True},
+        {"path": "ambience.mp3", "duck": True},
+    ]))
+    assert command.count("sidechaincompress") == 2
+    assert "amix=duration=longest:inputs=2:normalize=0" in command
+    assert "amix=duration=longest:inputs=4:normalize=0" in command
+
+def test_render_scene_mixes_all_beds_in_one_process(compiled):
+    render_scene("clip.mp4", "out.mp4", 5, effects=["fade_in"],
+                 audio_beds=[{"path": "voice.mp3"}, {"path": "music.mp3", "duck": True}],
+                 keep_source_audio=True, profile="draft")
+    assert len(compiled) == 1
+    assert "amix=duration=longest:inputs=3:normalize=0" in compiled[0]
+    assert "apad" in compiled[0]
+
+def test_render_scene_copies_video_without_effects(compiled):
+    render_scene("clip.mp4", "out.mp4", 5, audio_beds=[{"path": "voice.mp3"}], profile="draft")
+    assert "-vcodec copy" in compiled[0]
+    assert "libx264" not in compiled[0]
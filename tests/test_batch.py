@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+import pytest
+
+pytest.importorskip("openai")
+
+import batch
+from batch import _finished_ids, _safe_name, read_jobs, run_batch
+
+@pytest.fixture
+def generated(monkeypatch):
+    # Record each job's video request and write its output instead of rendering
+    calls = []
+    lock = threading.Lock()
+
+    def generate_video(prompt, output_path, plan=None, profile=None, scene_pool=None, ffmpeg_pool=None, **kwargs):
+        with lock:
+            calls.append({"prompt": prompt, "plan": plan, "profile": profile,
+                          "scene_pool": scene_pool, "ffmpeg_pool": ffmpeg_pool})
+        if prompt == "fails":
+            raise RuntimeError("render failed")
+        if prompt == "empty":
+            return None
+        with open(output_path, "w") as f:
+            f.write(prompt)
+        return output_path
+
+    monkeypatch.setattr(batch, "generate_video", generate_video)
+    return calls
+
+def _results(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f]
+
+def test_read_jobs_skips_bad_lines_and_numbers_missing_ids(tmp_path):
+    jobs_path = tmp_path / "jobs.jsonl"
+    jobs_path.write_text('{"id": "a", "prompt": "x"}\n\nnot json\n{"prompt": "y"}\n')
+    assert read_jobs(str(jobs_path)) == [{"id": "a", "prompt": "x"}, {"id": "job4", "prompt": "y"}]
+
+def test_job_ids_become_safe_file_names():
+    assert _safe_name("../../etc/passwd") == ".._.._etc_passwd"
+    assert _safe_name(7) == "7"
+
+def test_jobs_share_the_pools_and_record_their_status(generated, tmp_path):
+    output_dir = str(tmp_path / "batch")
+    jobs = [{"id": "a", "prompt": "first"}, {"id": "b", "prompt": "fails"},
+            {"id": "c", "prompt": "empty"}, {"id": "d"}]
+    results = run_batch(jobs, output_dir=output_dir, max_jobs=2, scene_workers=2, ffmpeg_workers=1)
+
+    assert [result["status"] for result in results] == ["ok", "failed", "failed", "failed"]
+    assert results[1]["error"] == "RuntimeError: render failed"
+    assert results[3]["error"] == "ValueError: Job needs a prompt or a plan"
+    assert os.path.exists(os.path.join(output_dir, "a.mp4"))
+    # Every job ran on the same scene and ffmpeg pools
+    assert len({id(call["scene_pool"]) for call in generated}) == 1
+    assert len({id(call["ffmpeg_pool"]) for call in generated}) == 1
+    assert sorted(result["id"] for result in _results(os.path.join(output_dir, "results.jsonl"))) == ["a", "b", "c", "d"]
+
+def test_finished_jobs_are_skipped_on_rerun(generated, tmp_path):
+    output_dir = str(tmp_path / "batch")
+    jobs = [{"id": "a", "prompt": "first"}, {"id": "b", "prompt": "fails"}]
+    run_batch(jobs, output_dir=output_dir, scene_workers=1, ffmpeg_workers=1)
+    results_path = os.path.join(output_dir, "results.jsonl")
+    assert _finished_ids(results_path) == {"a"}
+
+    # Only the failed job runs again, unless a full rerun is asked for
+    assert [result["id"] for result in run_batch(jobs, output_dir=output_dir, scene_workers=1, ffmpeg_workers=1)] == ["b"]
+    assert len(run_batch(jobs, output_dir=output_dir, scene_workers=1, ffmpeg_workers=1, skip_finished=False)) == 2
+    assert _finished_ids(str(tmp_path / "missing.jsonl")) == set()
@@ -0,0 +1,75 @@
+import os
+import pytest
+from ai_services import cache
+from ai_services.cache import AssetCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A controllable time.time for access times and expiry
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+def _asset(tmp_path, name, size):
+    path = tmp_path / "generated" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+def _cache(tmp_path, **kwargs):
+    return AssetCache(cache_dir=str(tmp_path / "cache"), **kwargs)
+
+def test_keys_cover_provider_prompt_and_every_parameter():
+    key = AssetCache.make_key("veo3", "a beach", duration=8)
+    assert key == AssetCache.make_key("veo3", "a beach", duration=8)
+    assert key != AssetCache.make_key("veo3", "a beach", duration=5)
+    assert key != AssetCache.make_key("leonardo", "a beach", duration=8)
+    assert key != AssetCache.make_key("veo3", "a forest", duration=8)
+
+def test_stored_asset_is_hardlinked_to_the_caller(tmp_path):
+    assets = _cache(tmp_path)
+    assets.store("k", _asset(tmp_path, "a.mp4", 10))
+    dest = str(tmp_path / "scenes" / "a.mp4")
+    assert assets.fetch("k", dest) == dest
+    assert os.path.samefile(dest, os.path.join(assets.blob_dir, "k.mp4"))
+    assert assets.fetch("missing", dest) is None
+
+def test_index_survives_a_new_instance(tmp_path):
+    _cache(tmp_path).store("k", _asset(tmp_path, "a.mp4", 10))
+    assert _cache(tmp_path).fetch("k", str(tmp_path / "b.mp4"))
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    assets = _cache(tmp_path, max_bytes=25)
+    assets.store("old", _asset(tmp_path, "old.mp4", 10))
+    clock[0] += 1
+    assets.store("used", _asset(tmp_path, "used.mp4", 10))
+    clock[0] += 1
+    # Reading "old" makes "used" the least recently used entry
+    assets.fetch("old", str(tmp_path / "read.mp4"))
+    clock[0] += 1
+    assets.store("new", _asset(tmp_path, "new.mp4", 10))
+
+    assert assets.fetch("used", str(tmp_path / "x.mp4")) is None
+    assert assets.fetch("old", str(tmp_path / "x.mp4"))
+    assert assets.fetch("new", str(tmp_path / "x.mp4"))
+    assert sorted(os.listdir(assets.blob_dir)) == ["new.mp4", "old.mp4"]
+
+def test_expired_entries_are_misses(tmp_path, clock):
+    assets = _cache(tmp_path, max_age_seconds=60)
+    assets.store("k", _asset(tmp_path, "a.mp4", 10))
+    clock[0] += 61
+    assert assets.fetch("k", str(tmp_path / "b.mp4")) is None
+    assert os.listdir(assets.blob_dir) == []
+
+def test_entry_with_a_missing_blob_is_dropped(tmp_path):
+    assets = _cache(tmp_path)
+    assets.store("k", _asset(tmp_path, "a.mp4", 10))
+    os.remove(os.path.join(assets.blob_dir, "k.mp4"))
+    assert assets.fetch("k", str(tmp_path / "b.mp4")) is None
+    assert "k" not in assets._index
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    assets = _cache(tmp_path, enabled=False)
+    assets.store("k", _asset(tmp_path, "a.mp4", 10))
+    assert assets.fetch("k", str(tmp_path / "b.mp4")) is None
+    assert not os.path.exists(assets.cache_dir)
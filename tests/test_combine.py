@@ -0,0 +1,63 @@
+import ffmpeg
+import pytest
+from ffmpeg_tools import combine
+from ffmpeg_tools.combine import can_stream_copy, concat_segments
+
+VIDEO = {"codec_type": "video", "codec_name": "h264", "profile": "High", "width": 1280, "height": 720,
+         "pix_fmt": "yuv420p", "r_frame_rate": "30/1", "sample_aspect_ratio": "1:1"}
+AUDIO = {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2}
+
+@pytest.fixture
+def probes(monkeypatch):
+    streams = {}
+    monkeypatch.setattr(combine, "probe_media", lambda path: {"streams": streams[path]})
+    return streams
+
+@pytest.fixture
+def runs(monkeypatch):
+    # Record each ffmpeg command and the concat list it was given
+    commands = []
+
+    def run(spec, name="ffmpeg", **kwargs):
+        args = ffmpeg.compile(spec)
+        with open(args[args.index("-i") + 1], "r") as f:
+            commands.append((" ".join(args), f.read()))
+        return None, None
+
+    monkeypatch.setattr(combine, "run_ffmpeg", run)
+    return commands
+
+def test_matching_segments_can_be_stream_copied(probes):
+    probes["a.mp4"] = probes["b.mp4"] = [VIDEO, AUDIO]
+    assert can_stream_copy(["a.mp4", "b.mp4"])
+
+def test_any_differing_parameter_prevents_stream_copy(probes):
+    probes["a.mp4"] = [VIDEO, AUDIO]
+    for change in ({"width": 854}, {"r_frame_rate": "25/1"}, {"profile": "Main"}):
+        probes["b.mp4"] = [dict(VIDEO, **change), AUDIO]
+        assert not can_stream_copy(["a.mp4", "b.mp4"])
+    probes["b.mp4"] = [VIDEO, dict(AUDIO, sample_rate="48000")]
+    assert not can_stream_copy(["a.mp4", "b.mp4"])
+
+def test_concat_remuxes_matching_segments(probes, runs, tmp_path):
+    probes["a.mp4"] = probes["b.mp4"] = [VIDEO, AUDIO]
+    output = str(tmp_path / "final" / "video.mp4")
+    assert concat_segments(["a.mp4", "b.mp4"], output, temp_dir=str(tmp_path)) == output
+    command, file_list = runs[0]
+    assert "-c copy" in command
+    assert file_list.splitlines()[0].endswith("a.mp4'")
+    assert file_list.splitlines()[1].endswith("b.mp4'")
+    # The concat list is removed afterwards
+    assert [path.name for path in tmp_path.iterdir()] == ["final"]
+
+def test_concat_reencodes_mismatched_segments(probes, runs, tmp_path):
+    probes["a.mp4"] = [VIDEO, AUDIO]
+    probes["b.mp4"] = [dict(VIDEO, width=854, height=480), AUDIO]
+    concat_segments(["a.mp4", "b.mp4"], str(tmp_path / "video.mp4"), temp_dir=str(tmp_path), profile="final")
+    command, _ = runs[0]
+    assert "libx264" in command
+    assert "-c copy" not in command
+
+def test_concat_without_segments_fails(runs, tmp_path):
+    assert concat_segments([], str(tmp_path / "video.mp4"), temp_dir=str(tmp_path)) is None
+    assert runs == []
@@ -0,0 +1,48 @@
+import os
+import threading
+import pytest
+
+pytest.importorskip("openai")
+
+from daemon import FINISHED_STATES, Job, _confined_path
+
+def test_default_output_is_named_after_the_id(tmp_path):
+    job = Job({"id": "../../etc/passwd", "prompt": "x"}, str(tmp_path))
+    assert os.path.dirname(job.output) == os.path.realpath(tmp_path)
+
+def test_output_and_plan_paths_stay_in_output_dir(tmp_path):
+    job = Job({"prompt": "x", "output": "videos/a.mp4", "plan": "plans/a.json"}, str(tmp_path))
+    assert job.output == os.path.join(os.path.realpath(tmp_path), "videos", "a.mp4")
+    assert job.plan == os.path.join(os.path.realpath(tmp_path), "plans", "a.json")
+    for request in ({"output": "../a.mp4"}, {"output": "/tmp/a.mp4"}, {"plan": "/etc/passwd"}):
+        with pytest.raises(ValueError):
+            Job(dict(request, prompt="x"), str(tmp_path))
+
+def test_confined_path_follows_symlinks(tmp_path):
+    (tmp_path / "out").mkdir()
+    os.symlink("/", str(tmp_path / "out" / "root"))
+    with pytest.raises(ValueError):
+        _confined_path("root/etc/passwd", str(tmp_path / "out"))
+
+def test_finished_job_has_already_sent_its_final_event(tmp_path):
+    job = Job({"prompt": "x"}, str(tmp_path))
+    seen = []
+
+    def stream():
+        # The same exit condition as the daemon's event stream
+        since = 0
+        while True:
+            events = job.wait_for_events(since, timeout=5)
+            seen.extend(events)
+            since += len(events)
+            if job.state in FINISHED_STATES and since >= len(job.events):
+                return
+
+    reader = threading.Thread(target=stream)
+    reader.start()
+    job.event("started")
+    job.finish("failed", error="boom")
+    reader.join(5)
+    assert [entry["stage"] for entry in seen] == ["queued", "started", "failed"]
+    assert seen[-1]["error"] == "boom"
+    assert (job.state, job.error) == ("failed", "boom")
@@ -0,0 +1,49 @@
+import ffmpeg
+import pytest
+from ffmpeg_tools import effects
+from ffmpeg_tools.effects import EFFECT_PARAMS, apply_effects, build_effects_chain, effects_duration
+
+def _command(stream):
+    return " ".join(ffmpeg.compile(ffmpeg.output(stream, "out.mp4")))
+
+@pytest.fixture
+def compiled(monkeypatch):
+    # Capture the ffmpeg command lines instead of running them
+    commands = []
+    monkeypatch.setattr(effects, "run_ffmpeg", lambda spec, name="ffmpeg", **kwargs: commands.append(
+        " ".join(ffmpeg.compile(spec))))
+    return commands
+
+def test_effects_are_chained_in_list_order():
+    stream, duration = build_effects_chain(ffmpeg.input("in.mp4").video, ["grayscale", "fade_in"], 10)
+    command = _command(stream)
+    assert command.index("hue=s=0") < command.index("fade=duration=2:start_time=0:type=in")
+    assert duration == 10
+
+def test_fade_out_is_placed_from_the_tracked_duration():
+    stream, duration = build_effects_chain(ffmpeg.input("in.mp4").video, ["speed_up", "fade_out"], 12)
+    speed = EFFECT_PARAMS["speed_up"]["speed_factor"]
+    assert duration == pytest.approx(12 / speed)
+    assert f"start_time={12 / speed - 2}" in _command(stream)
+
+def test_unknown_effects_are_skipped():
+    stream, duration = build_effects_chain(ffmpeg.input("in.mp4").video, ["sparkles"], 5)
+    assert "sparkles" not in _command(stream)
+    assert duration == 5
+
+def test_effects_duration_matches_the_chain():
+    for scene_effects in ([], ["fade_in"], ["speed_up", "zoom_in"], ["speed_up", "speed_up"]):
+        _, duration = build_effects_chain(ffmpeg.input("in.mp4").video, scene_effects, 8)
+        assert effects_duration(scene_effects, 8) == pytest.approx(duration)
+
+def test_apply_effects_runs_one_encode(compiled):
+    apply_effects("in.mp4", ["fade_in", "grayscale", "zoom_in", "fade_out"], 6, "out.mp4", profile="draft")
+    assert len(compiled) == 1
+    command = compiled[0]
+    for name in ("fade=", "hue=s=0", "zoompan=", "libx264"):
+        assert name in command
+
+def test_apply_effects_loops_images_for_the_duration(compiled):
+    apply_effects("still.jpg", ["fade_in"], 4, "out.mp4", is_image=True, profile="draft")
+    assert "-loop 1" in compiled[0]
+    assert "-t 4" in compiled[0]
@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from ai_services import hedging
+from ai_services.hedging import DeadlineExceeded, hedged_call, time_left
+from instrumentation.latency import LatencyHistory
+
+SHAPE = "video:8s"
+
+@pytest.fixture
+def history(tmp_path):
+    return LatencyHistory(path=str(tmp_path / "latency.json"))
+
+def _fill(history, seconds, count=hedging.HEDGE_MIN_SAMPLES):
+    for _ in range(count):
+        history.record("veo3", SHAPE, seconds)
+
+class Request:
+    """
+    A fake provider request that returns `result` after `delay` seconds (or when released).
+    """
+
+    def __init__(self, result, delay=5.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(self.delay)
+        return self.result
+
+def test_time_left():
+    assert time_left(None) is None
+    assert time_left(time.monotonic() - 1) == 0.0
+    assert 0 < time_left(time.monotonic() + 10) <= 10
+
+def test_slow_call_is_hedged_after_its_percentile(history):
+    _fill(history, 0.05)
+    call, hedge = Request("primary"), Request("hedge", delay=0)
+    try:
+        assert hedged_call("veo3", SHAPE, call, hedge=hedge, history=history) == "hedge"
+        assert hedge.calls == 1
+    finally:
+        call.release.set()
+
+def test_fast_call_is_not_hedged(history):
+    _fill(history, 1.0)
+    call, hedge = Request("primary", delay=0), Request("hedge", delay=0)
+    assert hedged_call("veo3", SHAPE, call, hedge=hedge, history=history) == "primary"
+    assert hedge.calls == 0
+
+def test_no_hedge_without_enough_history(history):
+    # With too few samples the threshold would be a default or a single sample
+    _fill(history, 0.01, count=hedging.HEDGE_MIN_SAMPLES - 1)
+    call, hedge = Request("primary", delay=0.2), Request("hedge", delay=0)
+    assert hedged_call("veo3", SHAPE, call, hedge=hedge, history=history) == "primary"
+    assert hedge.calls == 0
+
+def test_deadline_before_hedge_point_raises_without_hedging(history):
+    _fill(history, 10.0)
+    call, hedge = Request("primary"), Request("hedge", delay=0)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            hedged_call("veo3", SHAPE, call, hedge=hedge, deadline=time.monotonic() + 0.1, history=history)
+        assert hedge.calls == 0
+    finally:
+        call.release.set()
+
+def test_deadline_after_hedge_point_lets_the_hedge_win(history):
+    _fill(history, 0.05)
+    call, hedge = Request("primary"), Request("hedge", delay=0.05)
+    try:
+        result = hedged_call("veo3", SHAPE, call, hedge=hedge, deadline=time.monotonic() + 2, history=history)
+        assert result == "hedge"
+    finally:
+        call.release.set()
+
+def test_hedge_that_also_misses_the_deadline_raises(history):
+    _fill(history, 0.05)
+    call, hedge = Request("primary"), Request("hedge")
+    try:
+        with pytest.raises(DeadlineExceeded):
+            hedged_call("veo3", SHAPE, call, hedge=hedge, deadline=time.monotonic() + 0.2, history=history)
+        assert hedge.calls == 1
+    finally:
+        call.release.set()
+        hedge.release.set()
+
+def test_failed_call_without_hedge_returns_none_or_raises(history):
+    assert hedged_call("veo3", SHAPE, Request(None, delay=0), history=history) is None
+
+    def broken():
+        raise RuntimeError("provider error")
+
+    with pytest.raises(RuntimeError):
+        hedged_call("veo3", SHAPE, broken, history=history)
+
+def test_failed_primary_waits_for_the_hedge(history):
+    _fill(history, 0.05)
+    call, hedge = Request(None, delay=0.2), Request("hedge", delay=0.2)
+    assert hedged_call("veo3", SHAPE, call, hedge=hedge, history=history) == "hedge"
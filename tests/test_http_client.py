@@ -0,0 +1,68 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from ai_services import http_client
+from ai_services.http_client import backoff_delay, download_to_file, get_session
+
+BODY = os.urandom(200 * 1024)
+
+class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the client can keep the connection open between requests
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.path != "/asset.bin":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.connections = set()
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+def test_session_is_shared_and_pooled():
+    session = get_session()
+    assert get_session() is session
+    adapter = session.get_adapter("https://api.example.com")
+    assert adapter._pool_connections == http_client.POOL_CONNECTIONS
+    assert adapter._pool_maxsize == http_client.POOL_MAXSIZE
+
+def test_download_streams_to_disk_over_one_connection(server, tmp_path):
+    for name in ("a.bin", "b.bin"):
+        dest = str(tmp_path / "assets" / name)
+        assert download_to_file(_url(server, "/asset.bin"), dest, chunk_size=4096) == dest
+        with open(dest, "rb") as f:
+            assert f.read() == BODY
+    # The second download reused the first one's keep-alive connection
+    assert len(server.connections) == 1
+
+def test_failed_download_leaves_no_file(server, tmp_path):
+    dest = tmp_path / "missing.bin"
+    with pytest.raises(requests.HTTPError):
+        download_to_file(_url(server, "/missing.bin"), str(dest))
+    assert os.listdir(tmp_path) == []
+
+def test_backoff_is_jittered_and_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=1.0, cap=8.0)
+        assert 0 <= delay <= min(8.0, 2 ** attempt)
@@ -0,0 +1,97 @@
+import threading
+import time
+import pytest
+from ai_services import limits
+from ai_services.limits import ProviderLimiter, provider_slot
+from instrumentation.latency import DEFAULT_ESTIMATES, LatencyHistory, request_shape
+
+def _history(tmp_path, **kwargs):
+    return LatencyHistory(path=str(tmp_path / "latency.json"), **kwargs)
+
+def test_request_shape_buckets_duration_and_text():
+    assert request_shape("video", 7.2) == "video:8s"
+    assert request_shape("text", text="x" * 101) == "text:200"
+    assert request_shape("text", text="") == "text:100"
+
+def test_percentile_is_nearest_rank(tmp_path):
+    history = _history(tmp_path)
+    for seconds in range(1, 11):
+        history.record("veo3", "video:8s", float(seconds))
+    assert history.percentile("veo3", "video:8s", 50) == 5.0
+    assert history.percentile("veo3", "video:8s", 95) == 10.0
+    assert history.estimate("veo3", "video:8s") == 5.0
+
+def test_estimates_fall_back_to_similar_shapes_then_defaults(tmp_path):
+    history = _history(tmp_path)
+    history.record("veo3", "video:8s", 120.0)
+    assert history.estimate("veo3", "video:6s") == 120.0
+    assert history.estimate("suno", "music:30s") == DEFAULT_ESTIMATES["suno"]
+    assert history.estimate("unknown") == DEFAULT_ESTIMATES["render"]
+
+def test_timed_call_records_only_successes(tmp_path):
+    history = _history(tmp_path)
+    assert history.timed_call("render", "image:5s", lambda: None) is None
+    with pytest.raises(RuntimeError):
+        history.timed_call("render", "image:5s", lambda: (_ for _ in ()).throw(RuntimeError("ffmpeg failed")))
+    assert len(history._matching("render", "image:5s")) == 0
+    assert history.timed_call("render", "image:5s", lambda path: path, "clip.mp4") == "clip.mp4"
+    assert len(history._matching("render", "image:5s")) == 1
+
+def test_flush_is_batched(tmp_path):
+    history = _history(tmp_path, flush_samples=3, flush_interval=3600)
+    history.record("render", "image:5s", 1.0)
+    history.record("render", "image:5s", 2.0)
+    assert not (tmp_path / "latency.json").exists()
+    history.record("render", "image:5s", 3.0)
+    assert len(LatencyHistory(path=str(tmp_path / "latency.json"))._matching("render", "image:5s")) == 3
+
+def test_flush_merges_samples_of_other_processes(tmp_path):
+    first = _history(tmp_path, flush_samples=100, flush_interval=3600)
+    second = _history(tmp_path, flush_samples=100, flush_interval=3600)
+    first.record("suno", "music:30s", 40.0)
+    second.record("suno", "music:30s", 50.0)
+    second.record("veo3", "video:8s", 90.0)
+    first.flush()
+    second.flush()
+
+    merged = LatencyHistory(path=str(tmp_path / "latency.json"))
+    assert sorted(merged._matching("suno", "music:30s")) == [40.0, 50.0]
+    assert len(merged._matching("veo3", "video:8s")) == 1
+    # The flushing process also sees what the others wrote
+    assert len(second._matching("suno", "music:30s")) == 2
+
+def test_flush_keeps_the_most_recent_samples(tmp_path):
+    history = _history(tmp_path, max_samples=3, flush_samples=100, flush_interval=3600)
+    for seconds in range(5):
+        history.record("render", "video:5s", float(seconds))
+    history.flush()
+    assert LatencyHistory(path=str(tmp_path / "latency.json"))._matching("render", "video:5s") == [2.0, 3.0, 4.0]
+
+def test_sample_count_counts_the_samples_behind_an_estimate(tmp_path):
+    history = _history(tmp_path)
+    assert history.sample_count("veo3", "video:8s") == 0
+    history.record("veo3", "video:8s", 1.0)
+    history.record("veo3", "video:6s", 1.0)
+    assert history.sample_count("veo3", "video:8s") == 1
+    # No exact match: the similar shapes the estimate falls back to
+    assert history.sample_count("veo3", "video:4s") == 2
+
+def test_provider_slot_reports_its_wait(monkeypatch):
+    # The wait for a slot must not be recorded as provider latency
+    monkeypatch.setitem(limits._limiters, "slottest", ProviderLimiter("slottest", max_concurrency=1))
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with provider_slot("slottest"):
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    threading.Timer(0.2, release.set).start()
+    with provider_slot("slottest") as queued:
+        assert queued >= 0.15
+    holder.join()
+    with provider_slot("slottest") as queued:
+        assert queued < 0.1
@@ -0,0 +1,89 @@
+import os
+import threading
+import pytest
+from ai_services import LeonardoAI
+from ai_services.cache import AssetCache
+from ai_services.LeonardoAI import LeonardoPool, generate_leonardo_images
+
+class Generator:
+    """
+    Stand-in for generate_leonardo_image that writes the prompt to the image
+    file, holding each request until released.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, unique_id, model_id="photoreal", save_dir="./assets/scenes"):
+        with self._lock:
+            self.calls.append(prompt)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.release.wait(5)
+        with self._lock:
+            self.running -= 1
+        if prompt == "fails":
+            raise RuntimeError("generation failed")
+        path = os.path.join(save_dir, f"{unique_id}_leonardo.jpg")
+        os.makedirs(save_dir, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(prompt)
+        return path
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    fake = Generator()
+    monkeypatch.setattr(LeonardoAI, "generate_leonardo_image", fake)
+    monkeypatch.setattr(LeonardoAI, "asset_cache", AssetCache(cache_dir=str(tmp_path / "cache")))
+    yield fake
+    fake.release.set()
+
+def _read(path):
+    with open(path, "r") as f:
+        return f.read()
+
+def test_identical_requests_in_flight_share_one_generation(generator, tmp_path):
+    pool = LeonardoPool(max_in_flight=2)
+    save_dir = str(tmp_path / "scenes")
+    first = pool.submit("a lighthouse", "s1", save_dir=save_dir)
+    second = pool.submit("a lighthouse", "s2", save_dir=save_dir)
+    generator.release.set()
+
+    assert _read(first.result(5)) == "a lighthouse"
+    assert second.result(5) == os.path.join(save_dir, "s2_leonardo.jpg")
+    assert _read(second.result()) == "a lighthouse"
+    assert generator.calls == ["a lighthouse"]
+
+def test_requests_are_bounded_by_max_in_flight(generator, tmp_path):
+    pool = LeonardoPool(max_in_flight=2)
+    futures = [pool.submit(f"prompt {i}", f"s{i}", save_dir=str(tmp_path)) for i in range(5)]
+    # Give a third request the chance to start before releasing the first two
+    while generator.running < 2:
+        threading.Event().wait(0.01)
+    threading.Event().wait(0.05)
+    generator.release.set()
+    assert all(future.result(5) for future in futures)
+    assert generator.peak == 2
+    assert len(generator.calls) == 5
+
+def test_cache_hits_never_wait_for_a_worker(generator, tmp_path):
+    source = tmp_path / "cached.jpg"
+    source.write_text("cached image")
+    LeonardoAI.asset_cache.store(LeonardoAI._cache_key("a lighthouse", "photoreal", 768, 512, True), str(source))
+
+    future = LeonardoPool(max_in_flight=1).submit("a lighthouse", "s1", save_dir=str(tmp_path / "scenes"))
+    assert future.done()
+    assert _read(future.result()) == "cached image"
+    assert generator.calls == []
+
+def test_batch_reports_failures_as_none(generator, tmp_path):
+    generator.release.set()
+    paths = generate_leonardo_images([
+        {"prompt": "a lighthouse", "unique_id": "s1", "save_dir": str(tmp_path)},
+        {"prompt": "fails", "unique_id": "s2", "save_dir": str(tmp_path)},
+    ], pool=LeonardoPool(max_in_flight=2))
+    assert paths == [os.path.join(str(tmp_path), "s1_leonardo.jpg"), None]
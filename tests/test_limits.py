@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+from ai_services.limits import DEFAULT_LIMITS, ProviderLimiter, TokenBucket, load_limits
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate():
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)
+    start = time.monotonic()
+    bucket.acquire()
+    bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    bucket.acquire()
+    # 600 per minute is one token every 0.1s
+    assert time.monotonic() - start >= 0.08
+
+def test_limiter_caps_concurrent_slots():
+    limiter = ProviderLimiter("test", max_concurrency=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with limiter.slot():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+def test_limits_come_from_defaults_file_and_environment(tmp_path, monkeypatch):
+    config = tmp_path / "limits.json"
+    config.write_text(json.dumps({"veo3": {"max_concurrency": 5}, "custom": {"max_concurrency": 1}}))
+    monkeypatch.setenv("PROVIDER_LIMITS_FILE", str(config))
+    monkeypatch.setenv("VEO3_RATE_PER_MINUTE", "30")
+    monkeypatch.setenv("SUNO_BURST", "3")
+
+    limits = load_limits()
+    assert limits["veo3"] == {"max_concurrency": 5, "rate_per_minute": 30.0}
+    assert limits["suno"]["burst"] == 3
+    assert limits["custom"] == {"max_concurrency": 1}
+    assert limits["leonardo"] == DEFAULT_LIMITS["leonardo"]
+
+def test_unreadable_limits_file_keeps_the_defaults(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROVIDER_LIMITS_FILE", str(tmp_path / "absent.json"))
+    assert load_limits() == DEFAULT_LIMITS
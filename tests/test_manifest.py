@@ -0,0 +1,73 @@
+import json
+from video_processing.manifest import JobManifest, load_plan, manifest_path_for, scene_input_hash
+
+def _scene(number, scene_type="image", description="A lighthouse at dusk"):
+    return {
+        "scene_number": number,
+        "type": scene_type,
+        "duration": 5,
+        "description": description,
+        "ffmpeg_effects": ["fade_in"],
+    }
+
+def _entry(scene, render, fallbacks=None):
+    assets = {"fallbacks": fallbacks} if fallbacks else {}
+    return {"scene_number": scene["scene_number"], "input_hash": scene_input_hash(scene),
+            "render": str(render), "duration": 5, "assets": assets}
+
+def test_hash_changes_with_inputs_and_profile():
+    scene = _scene(1)
+    assert scene_input_hash(scene) == scene_input_hash(dict(scene))
+    assert scene_input_hash(scene) != scene_input_hash(_scene(1, description="A harbour at dawn"))
+    assert scene_input_hash(scene, "draft") != scene_input_hash(scene, "final")
+
+def test_moved_video_scene_keeps_its_hash():
+    assert scene_input_hash(_scene(1, "video")) == scene_input_hash(_scene(4, "video"))
+
+def test_moved_image_scene_keeps_its_hash_only_with_the_same_pan():
+    # Stills pan right on odd scene numbers and left on even ones
+    assert scene_input_hash(_scene(1)) == scene_input_hash(_scene(3))
+    assert scene_input_hash(_scene(1)) != scene_input_hash(_scene(2))
+
+def test_reusable_render_needs_same_hash_and_existing_segment(tmp_path):
+    kept, missing = tmp_path / "kept.mp4", tmp_path / "missing.mp4"
+    kept.write_bytes(b"segment")
+    first, second = _scene(1), _scene(2, "video", description="Waves")
+    manifest = JobManifest(str(tmp_path / "m.json"), {"scenes": [_entry(first, kept), _entry(second, missing)]})
+
+    assert manifest.reusable_render(scene_input_hash(first))["render"] == str(kept)
+    assert manifest.reusable_render(scene_input_hash(second)) is None
+    assert manifest.reusable_render(scene_input_hash(_scene(1, description="Changed"))) is None
+
+def test_fallback_renders_are_not_reused(tmp_path):
+    kept = tmp_path / "kept.mp4"
+    kept.write_bytes(b"segment")
+    scene = _scene(1, "video")
+    manifest = JobManifest(str(tmp_path / "m.json"), {"scenes": [_entry(scene, kept, ["video_to_still"])]})
+    assert manifest.reusable_render(scene_input_hash(scene)) is None
+
+def test_save_and_load_round_trip(tmp_path):
+    output = str(tmp_path / "final.mp4")
+    path = manifest_path_for(output)
+    assert path == str(tmp_path / "final.manifest.json")
+
+    kept = tmp_path / "kept.mp4"
+    kept.write_bytes(b"segment")
+    scene = _scene(1)
+    plan = {"scenes": [scene]}
+    JobManifest(path).save("A prompt", plan, [_entry(scene, kept)], output)
+
+    loaded = JobManifest.load(path)
+    assert loaded.reusable_render(scene_input_hash(scene)) is not None
+    assert load_plan(path) == plan
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    path = tmp_path / "broken.manifest.json"
+    path.write_text("{not json")
+    assert JobManifest.load(str(path)).data == {"scenes": []}
+    assert JobManifest.load(str(tmp_path / "absent.json")).data == {"scenes": []}
+
+def test_load_plan_reads_plain_plan_files(tmp_path):
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps({"scenes": [_scene(1)]}))
+    assert load_plan(str(path)) == {"scenes": [_scene(1)]}
@@ -0,0 +1,75 @@
+import pytest
+from ffmpeg_tools.effects import EFFECT_PARAMS
+from video_processing import plan_audio
+from video_processing.plan_audio import MusicPlanner, rendered_duration
+
+def _scene(number, genre="ambient", mood="calm", music=True, duration=5, effects=(), scene_type="video"):
+    return {
+        "scene_number": number,
+        "type": scene_type,
+        "duration": duration,
+        "ffmpeg_effects": list(effects),
+        "audio": {"background_music": music, "music_genre": genre, "music_mood": mood,
+                  "music_description": f"{mood} {genre}"},
+    }
+
+@pytest.fixture
+def suno(monkeypatch):
+    # Record the tracks requested and the cuts made from them
+    calls = {"tracks": [], "slices": []}
+
+    def generate(prompt, unique_id, genre, mood, duration_seconds, save_dir):
+        if genre == "broken":
+            raise RuntimeError("suno down")
+        calls["tracks"].append((genre, mood, duration_seconds))
+        return f"{unique_id}.mp3"
+
+    def slice_audio(track_path, segments):
+        calls["slices"].append([(start, end) for start, end, _ in segments])
+        return [path for _, _, path in segments]
+
+    monkeypatch.setattr(plan_audio, "generate_suno_music_and_save", generate)
+    monkeypatch.setattr(plan_audio, "slice_audio", slice_audio)
+    return calls
+
+def test_rendered_duration_applies_speed_up_to_videos_only():
+    speed = EFFECT_PARAMS["speed_up"]["speed_factor"]
+    assert rendered_duration(_scene(1, duration=6, effects=["speed_up"])) == pytest.approx(6 / speed)
+    assert rendered_duration(_scene(1, duration=6, effects=["speed_up"], scene_type="image")) == 6
+
+def test_consecutive_scenes_with_the_same_music_share_one_track(suno, tmp_path):
+    planner = MusicPlanner(save_dir=str(tmp_path))
+    futures = [planner.add(_scene(1, duration=4)), planner.add(_scene(2, mood="Calm", duration=6)),
+               planner.add(_scene(3, genre="orchestral"))]
+    planner.shutdown()
+    paths = [future.result(5) for future in futures]
+
+    assert suno["tracks"] == [("ambient", "calm", 10), ("orchestral", "calm", 5)]
+    # The shared track is cut at the scene offsets; a single scene keeps its track
+    assert suno["slices"] == [[(0, 4), (4, 10)]]
+    assert paths[0].endswith("_music_scene1.wav") and paths[1].endswith("_music_scene2.wav")
+    assert paths[2].endswith("_music.mp3")
+
+def test_scene_without_music_ends_the_group(suno, tmp_path):
+    planner = MusicPlanner(save_dir=str(tmp_path))
+    first = planner.add(_scene(1))
+    assert planner.add(_scene(2, music=False)) is None
+    third = planner.add(_scene(3))
+    planner.shutdown()
+    first.result(5), third.result(5)
+    assert len(suno["tracks"]) == 2
+    assert suno["slices"] == []
+
+def test_group_offsets_follow_the_rendered_length(suno, tmp_path):
+    speed = EFFECT_PARAMS["speed_up"]["speed_factor"]
+    planner = MusicPlanner(save_dir=str(tmp_path))
+    futures = [planner.add(_scene(1, duration=6, effects=["speed_up"])), planner.add(_scene(2, duration=5))]
+    planner.shutdown()
+    [future.result(5) for future in futures]
+    assert suno["slices"] == [[(0, pytest.approx(6 / speed)), (pytest.approx(6 / speed), pytest.approx(6 / speed + 5))]]
+
+def test_failed_generation_resolves_every_scene_to_none(suno, tmp_path):
+    planner = MusicPlanner(save_dir=str(tmp_path))
+    futures = [planner.add(_scene(1, genre="broken")), planner.add(_scene(2, genre="broken"))]
+    planner.shutdown()
+    assert [future.result(5) for future in futures] == [None, None]
@@ -0,0 +1,65 @@
+import ffmpeg
+import pytest
+from ffmpeg_tools import combine
+from ffmpeg_tools.combine import is_conformant_audio, is_conformant_video, normalize_scene
+
+VIDEO = {"codec_type": "video", "codec_name": "h264", "profile": "High", "width": 1280, "height": 720,
+         "pix_fmt": "yuv420p", "r_frame_rate": "30/1"}
+AUDIO = {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2}
+
+@pytest.fixture
+def clip(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"")
+    return str(path)
+
+@pytest.fixture
+def normalize(monkeypatch, clip):
+    # Normalize `clip` with the given probe result and return the ffmpeg command line
+    def run(streams, duration=5, clip_duration=5, profile="final"):
+        commands = []
+        monkeypatch.setattr(combine, "probe_media", lambda path: {
+            "format": {"duration": str(clip_duration)}, "streams": streams
+        })
+        monkeypatch.setattr(combine, "run_ffmpeg", lambda spec, name="ffmpeg", **kwargs: commands.append(
+            " ".join(ffmpeg.compile(spec))))
+        assert normalize_scene(clip, duration, "out.mp4", profile=profile) == "out.mp4"
+        assert len(commands) == 1
+        return commands[0]
+    return run
+
+def test_conformance_follows_the_profile():
+    assert is_conformant_video(VIDEO, "final")
+    assert not is_conformant_video(VIDEO, "draft")
+    assert not is_conformant_video(dict(VIDEO, profile="Main"), "final")
+    assert not is_conformant_video(dict(VIDEO, r_frame_rate="24/1"), "final")
+    assert is_conformant_audio(AUDIO)
+    assert not is_conformant_audio(dict(AUDIO, channels=1))
+
+def test_conformant_input_is_remuxed(normalize):
+    command = normalize([VIDEO, AUDIO])
+    assert "-c copy" in command
+    assert "libx264" not in command
+
+def test_long_input_is_trimmed_at_the_input(normalize):
+    command = normalize([VIDEO, AUDIO], duration=5, clip_duration=8)
+    assert command.startswith("ffmpeg -t 5 -i ")
+    assert "-c copy" in command
+
+def test_only_audio_is_converted(normalize):
+    command = normalize([VIDEO, dict(AUDIO, codec_name="mp3")])
+    assert "-vcodec copy" in command
+    assert "-acodec aac" in command
+
+def test_silent_conformant_video_gets_generated_audio(normalize):
+    command = normalize([VIDEO])
+    assert "-vcodec copy" in command
+    assert "anullsrc" in command
+
+def test_other_inputs_are_reencoded(normalize):
+    command = normalize([dict(VIDEO, codec_name="vp9"), AUDIO])
+    assert "-vcodec libx264" in command
+    assert "-c copy" not in command
+
+def test_missing_input_fails(tmp_path):
+    assert normalize_scene(str(tmp_path / "absent.mp4"), 5, "out.mp4") is None
@@ -0,0 +1,74 @@
+import threading
+import pytest
+from video_processing.plan_audio import VoicePlanner, VOICE_TAIL_SECONDS, _narration_cuts
+
+def _alignment(starts, ends):
+    return {"character_start_times_seconds": starts, "character_end_times_seconds": ends}
+
+def test_narration_cuts_split_the_pause_between_scenes_at_its_midpoint():
+    # "ab cd": scene 1 speaks until 0.2s, scene 2 starts at 0.5s
+    alignment = _alignment([0.0, 0.1, 0.2, 0.5, 0.6], [0.1, 0.2, 0.5, 0.6, 0.7])
+    cuts = _narration_cuts(alignment, [(0, 2), (3, 5)])
+    assert cuts[0] == (0.0, pytest.approx(0.35))
+    assert cuts[1] == (pytest.approx(0.35), pytest.approx(0.7 + VOICE_TAIL_SECONDS))
+
+def test_narration_cuts_single_scene_keeps_the_tail():
+    alignment = _alignment([0.0, 0.1], [0.1, 0.4])
+    assert _narration_cuts(alignment, [(0, 2)]) == [(0.0, pytest.approx(0.4 + VOICE_TAIL_SECONDS))]
+
+def test_narration_cuts_are_contiguous():
+    alignment = _alignment([0.0, 0.3, 0.9, 1.2, 2.0, 2.1], [0.3, 0.6, 1.2, 1.5, 2.1, 2.4])
+    cuts = _narration_cuts(alignment, [(0, 2), (2, 4), (4, 6)])
+    assert cuts[0][0] == 0.0
+    for previous, current in zip(cuts, cuts[1:]):
+        assert previous[1] == current[0]
+        assert current[1] >= current[0]
+
+def test_narration_cuts_clamp_spans_past_a_short_alignment():
+    # The alignment stops early (e.g. trailing whitespace is not aligned)
+    alignment = _alignment([0.0, 0.1, 0.5], [0.1, 0.2, 0.6])
+    cuts = _narration_cuts(alignment, [(0, 2), (2, 9)])
+    assert cuts[0] == (0.0, pytest.approx(0.35))
+    assert cuts[1][1] == pytest.approx(0.6 + VOICE_TAIL_SECONDS)
+
+class RecordingPlanner(VoicePlanner):
+    """
+    VoicePlanner that records the groups it would synthesize instead of calling ElevenLabs.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.groups = []
+        self.sent = threading.Event()
+
+    def _generate(self, voice_id, scenes):
+        self.groups.append([scene["scene_number"] for scene, _, _ in scenes])
+        self.sent.set()
+
+def _scene(number, gender="male", text="Narration."):
+    return {"scene_number": number, "audio": {"voiceover": True, "voice_gender": gender,
+                                              "voice_style": "calm", "voice_text": text}}
+
+def test_groups_close_on_voice_change_and_scene_count():
+    planner = RecordingPlanner(max_scenes=2, window=60)
+    for scene in (_scene(1), _scene(2), _scene(3), _scene(4, gender="female"), _scene(5, gender="female")):
+        planner.add(scene)
+    planner.shutdown()
+    planner._pool.shutdown(wait=True)
+    assert planner.groups == [[1, 2], [3], [4, 5]]
+
+def test_group_is_sent_after_its_window_without_further_scenes():
+    planner = RecordingPlanner(max_scenes=10, window=0.05)
+    planner.add(_scene(1))
+    assert planner.sent.wait(2)
+    assert planner.groups == [[1]]
+    planner.shutdown()
+
+def test_scenes_without_voiceover_close_the_group():
+    planner = RecordingPlanner(max_scenes=10, window=60)
+    planner.add(_scene(1))
+    assert planner.add({"scene_number": 2, "audio": {"voiceover": False}}) is None
+    planner.add(_scene(3))
+    planner.shutdown()
+    planner._pool.shutdown(wait=True)
+    assert planner.groups == [[1], [3]]
@@ -0,0 +1,96 @@
+import json
+import pytest
+
+pytest.importorskip("openai")
+
+from ai_services.cache import AssetCache
+from prompts import scene_generator
+from prompts.scene_generator import ScenesStreamParser, scene_error, stream_video_plan_from_prompt
+
+def _scene(number, **changes):
+    scene = {
+        "scene_number": number,
+        "description": "A {curly} \"quoted\" lighthouse",
+        "type": "image",
+        "duration": 5,
+        "audio": {"voiceover": True, "voice_text": "Waves [crash]."},
+    }
+    scene.update(changes)
+    return scene
+
+PLAN = {"scenes": [_scene(1), _scene(2, type="video", ffmpeg_effects=["fade_in"])]}
+
+class Completion:
+    """
+    Stand-in for the streamed chat completion: yields `text` a few characters per chunk.
+    """
+
+    def __init__(self, text, size=7):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.chunks:
+            self.sent += 1
+            yield {"choices": [{"delta": {"content": piece}}]}
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def completion(tmp_path, monkeypatch):
+    monkeypatch.setattr(scene_generator, "asset_cache", AssetCache(cache_dir=str(tmp_path / "cache")))
+    monkeypatch.setattr(scene_generator, "PLAN_DIR", str(tmp_path / "plans"))
+    response = Completion(json.dumps(PLAN, indent=2))
+    calls = []
+
+    class ChatCompletion:
+        @staticmethod
+        def create(**kwargs):
+            calls.append(kwargs)
+            return response
+
+    monkeypatch.setattr(scene_generator.openai, "ChatCompletion", ChatCompletion, raising=False)
+    response.calls = calls
+    return response
+
+def test_scenes_are_returned_as_soon_as_they_close():
+    parser = ScenesStreamParser()
+    text = "```json\n" + json.dumps(PLAN) + "\n```"
+    completed = []
+    for i, ch in enumerate(text):
+        for scene in parser.feed(ch):
+            completed.append((scene["scene_number"], i))
+    assert [number for number, _ in completed] == [1, 2]
+    # Scene 1 came out before scene 2 had started streaming
+    assert completed[0][1] < text.index('"scene_number": 2')
+
+def test_nested_objects_and_strings_do_not_split_scenes():
+    scenes = ScenesStreamParser().feed(json.dumps(PLAN))
+    assert scenes[0]["audio"] == PLAN["scenes"][0]["audio"]
+    assert scenes[0]["description"] == PLAN["scenes"][0]["description"]
+    # Missing effects default to an empty list
+    assert scenes[0]["ffmpeg_effects"] == []
+
+def test_invalid_scenes_are_skipped():
+    plan = {"scenes": [_scene(1, type="gif"), {"scene_number": 2}, _scene(3, duration=0), _scene(4)]}
+    assert [scene["scene_number"] for scene in ScenesStreamParser().feed(json.dumps(plan))] == [4]
+    assert scene_error(_scene(1, audio="none")) == "audio is not an object"
+    assert scene_error(_scene(1)) is None
+
+def test_stream_yields_scenes_and_caches_the_plan(completion):
+    scenes = list(stream_video_plan_from_prompt("A lighthouse"))
+    assert [scene["scene_number"] for scene in scenes] == [1, 2]
+    assert completion.calls[0]["stream"] is True
+
+    # A repeat run replays the cached plan without another request
+    assert [scene["scene_number"] for scene in stream_video_plan_from_prompt("A lighthouse")] == [1, 2]
+    assert len(completion.calls) == 1
+
+def test_closing_the_stream_early_closes_the_response(completion):
+    scenes = stream_video_plan_from_prompt("A lighthouse")
+    assert next(scenes)["scene_number"] == 1
+    scenes.close()
+    assert completion.closed
+    assert completion.sent < len(completion.chunks)
@@ -0,0 +1,64 @@
+import ffmpeg
+import pytest
+from ffmpeg_tools import combine, transitions
+from ffmpeg_tools.profiles import RENDER_PROFILES, conform_video, get_profile, video_args
+
+@pytest.fixture
+def compiled(monkeypatch):
+    # Capture the ffmpeg command lines instead of running them
+    commands = []
+
+    def run(stream_spec, name="ffmpeg", **kwargs):
+        commands.append(" ".join(ffmpeg.compile(stream_spec)))
+        return None, None
+
+    monkeypatch.setattr(combine, "run_ffmpeg", run)
+    monkeypatch.setattr(transitions, "run_ffmpeg", run)
+    return commands
+
+def test_get_profile_resolves_names_and_passes_dicts_through():
+    assert get_profile("draft") == {"name": "draft", **RENDER_PROFILES["draft"]}
+    resolved = get_profile("final")
+    assert get_profile(resolved) is resolved
+    with pytest.raises(ValueError):
+        get_profile("4k")
+
+def test_video_args_force_a_keyframe_every_second():
+    args = video_args(get_profile("draft"))
+    assert args["s"] == "854x480"
+    assert args["g"] == args["keyint_min"] == RENDER_PROFILES["draft"]["fps"]
+    assert args["sc_threshold"] == 0
+
+def test_conform_video_scales_to_square_pixels():
+    stream = conform_video(ffmpeg.input("in.mp4").video, get_profile("draft"))
+    command = " ".join(ffmpeg.compile(ffmpeg.output(stream, "out.mp4")))
+    assert "scale=854:480[s0];[s0]setsar=1" in command
+
+@pytest.mark.parametrize("profile", sorted(RENDER_PROFILES))
+def test_stills_and_reencoded_videos_have_square_pixels(compiled, tmp_path, monkeypatch, profile):
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"")
+    monkeypatch.setattr(combine, "probe_media", lambda path: {
+        "format": {"duration": "5.0"},
+        "streams": [{"codec_type": "video", "codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p",
+                     "width": 1280, "height": 720, "r_frame_rate": "24/1", "sample_aspect_ratio": "1:1"}]
+    })
+    combine.render_still("image.jpg", "still.mp4", 5, profile=profile)
+    combine.normalize_scene(str(clip), 5, "normalized.mp4", profile=profile)
+    assert len(compiled) == 2
+    assert all("setsar=1" in command for command in compiled)
+
+def test_conformance_and_concat_signature_include_the_sample_aspect_ratio(monkeypatch):
+    stream = {"codec_type": "video", "codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p",
+              "width": 854, "height": 480, "r_frame_rate": "15/1"}
+    assert combine.is_conformant_video(stream, "draft")
+    assert combine.is_conformant_video(dict(stream, sample_aspect_ratio="1:1"), "draft")
+    assert not combine.is_conformant_video(dict(stream, sample_aspect_ratio="1280:1281"), "draft")
+
+    probes = {
+        "square.mp4": dict(stream, sample_aspect_ratio="1:1"),
+        "other.mp4": dict(stream, sample_aspect_ratio="3417:3416"),
+    }
+    monkeypatch.setattr(combine, "probe_media", lambda path: {"streams": [probes[path]]})
+    assert combine.can_stream_copy(["square.mp4", "square.mp4"])
+    assert not combine.can_stream_copy(["square.mp4", "other.mp4"])
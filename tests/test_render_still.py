@@ -0,0 +1,50 @@
+import ffmpeg
+import pytest
+from ffmpeg_tools import combine
+from ffmpeg_tools.combine import KEN_BURNS_ZOOM, render_still
+from ffmpeg_tools.effects import EFFECT_PARAMS
+
+@pytest.fixture
+def compiled(monkeypatch):
+    # Capture the ffmpeg command lines instead of running them
+    commands = []
+
+    def run(stream_spec, name="ffmpeg", **kwargs):
+        commands.append(" ".join(ffmpeg.compile(stream_spec)))
+        return None, None
+
+    monkeypatch.setattr(combine, "run_ffmpeg", run)
+    return commands
+
+def test_still_is_rendered_in_one_process_with_silent_audio(compiled):
+    assert render_still("image.jpg", "still.mp4", 2, profile="draft") == "still.mp4"
+    [command] = compiled
+    # zoompan emits every frame of the clip from the single decoded image
+    assert "zoompan=d=30:fps=15:s=854x480" in command
+    assert f"z=1+{(KEN_BURNS_ZOOM - 1) / 30}*on" in command
+    assert "anullsrc" in command and "apad" not in command
+    assert "-t 2 " in command
+
+def test_pan_direction_sets_the_horizontal_drift(compiled):
+    for pan in ("right", "left", "center"):
+        render_still("image.jpg", "still.mp4", 2, pan=pan, profile="draft")
+    assert "x=(iw-iw/zoom)*(on/30)" in compiled[0]
+    assert "x=(iw-iw/zoom)*(1-on/30)" in compiled[1]
+    assert "x=(iw-iw/zoom)*(0.5)" in compiled[2]
+
+def test_zoom_in_sets_the_strength_and_other_effects_are_chained(compiled):
+    render_still("image.jpg", "still.mp4", 2, effects=["zoom_in", "fade_in", "speed_up"], profile="draft")
+    assert f"z=1+{(EFFECT_PARAMS['zoom_in']['zoom_factor'] - 1) / 30}*on" in compiled[0]
+    assert "fade=duration=" in compiled[0]
+    # speed_up does not apply to stills
+    assert "setpts" not in compiled[0]
+
+def test_without_motion_the_image_holds_still(compiled):
+    render_still("image.jpg", "still.mp4", 2, effects=["zoom_in"], pan="left", motion=False, profile="draft")
+    assert "z=1+0.0*on" in compiled[0]
+    assert "x=(iw-iw/zoom)*(0.5)" in compiled[0]
+
+def test_audio_beds_are_mixed_and_padded(compiled):
+    render_still("image.jpg", "still.mp4", 2, audio_beds=[{"path": "voice.mp3"}], profile="draft")
+    assert "-i voice.mp3" in compiled[0]
+    assert "apad" in compiled[0] and "anullsrc" not in compiled[0]
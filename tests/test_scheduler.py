@@ -0,0 +1,136 @@
+import threading
+import pytest
+
+pytest.importorskip("openai")
+
+from instrumentation.latency import LatencyHistory, DEFAULT_ESTIMATES
+from video_processing.scene_processor import render_shape
+from video_processing.scheduler import SceneScheduler, scene_cost
+
+def _scene(number, scene_type="video", duration=8, voiceover=False, music=False):
+    return {
+        "scene_number": number,
+        "type": scene_type,
+        "duration": duration,
+        "ffmpeg_effects": [],
+        "audio": {"voiceover": voiceover, "voice_text": "Narration.", "background_music": music},
+    }
+
+@pytest.fixture
+def history(tmp_path):
+    return LatencyHistory(path=str(tmp_path / "latency.json"))
+
+def test_scene_cost_is_slowest_input_plus_render(history):
+    scene = _scene(1, voiceover=True, music=True)
+    history.record("veo3", "video:8s", 100.0)
+    history.record("elevenlabs", "text:100", 5.0)
+    history.record("suno", "music:8s", 200.0)
+    history.record("render", render_shape(scene), 10.0)
+    assert scene_cost(scene, history=history) == 210.0
+
+def test_scene_cost_of_image_scene_uses_defaults_without_history(history):
+    scene = _scene(1, scene_type="image")
+    assert scene_cost(scene, history=history) == DEFAULT_ESTIMATES["leonardo"] + DEFAULT_ESTIMATES["render"]
+
+class BlockingScenes:
+    """
+    Process function that records the start order and holds each scene until released.
+    """
+
+    def __init__(self):
+        self.started = []
+        self.release = threading.Event()
+
+    def __call__(self, scene, **kwargs):
+        self.started.append(scene["scene_number"])
+        self.release.wait(5)
+        return (f"scene{scene['scene_number']}.mp4", scene["duration"])
+
+def test_longest_waiting_scene_starts_first():
+    costs = {1: 1.0, 2: 2.0, 3: 5.0, 4: 3.0}
+    process = BlockingScenes()
+    scheduler = SceneScheduler(max_workers=1, process_fn=process, cost_fn=lambda scene, profile: costs[scene["scene_number"]])
+    try:
+        for number in (1, 2, 3, 4):
+            scheduler.submit(_scene(number))
+        process.release.set()
+        results = scheduler.results()
+    finally:
+        scheduler.shutdown()
+    # Scene 1 started alone; the queue then drains longest first
+    assert process.started == [1, 3, 4, 2]
+    # Results still come back in scene order
+    assert [path for path, _ in results] == ["scene1.mp4", "scene2.mp4", "scene3.mp4", "scene4.mp4"]
+
+def test_eta_replays_the_queue_over_the_workers():
+    costs = {1: 4.0, 2: 3.0, 3: 2.0, 4: 1.0}
+    process = BlockingScenes()
+    scheduler = SceneScheduler(max_workers=2, process_fn=process, cost_fn=lambda scene, profile: costs[scene["scene_number"]])
+    try:
+        assert scheduler.eta() == 0.0
+        for number in (1, 2, 3, 4):
+            scheduler.submit(_scene(number))
+        # Slots free at 4s and 3s; scene 3 (2s) takes the 3s slot, scene 4 (1s) the 4s one
+        assert scheduler.eta() == pytest.approx(5.0, abs=0.1)
+    finally:
+        process.release.set()
+        scheduler.shutdown()
+    assert scheduler.eta() == 0.0
+
+def test_scenes_run_on_at_most_max_workers():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def process(scene, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        threading.Event().wait(0.02)
+        with lock:
+            running[0] -= 1
+        return (f"scene{scene['scene_number']}.mp4", scene["duration"])
+
+    scheduler = SceneScheduler(max_workers=3, process_fn=process, cost_fn=lambda scene, profile: 1.0)
+    try:
+        for number in range(1, 11):
+            scheduler.submit(_scene(number))
+        assert len(scheduler.results()) == 10
+    finally:
+        scheduler.shutdown()
+    assert peak[0] == 3
+
+def test_failed_scenes_are_left_out_and_finished_ones_handed_on():
+    handed_on = []
+
+    def process(scene, **kwargs):
+        if scene["scene_number"] == 2:
+            raise RuntimeError("provider down")
+        return (f"scene{scene['scene_number']}.mp4", scene["duration"])
+
+    scheduler = SceneScheduler(max_workers=2, process_fn=process, cost_fn=lambda scene, profile: 1.0,
+                               on_result=lambda scene, result: handed_on.append(scene["scene_number"]))
+    try:
+        for number in (1, 2, 3):
+            scheduler.submit(_scene(number))
+        assert [path for path, _ in scheduler.results()] == ["scene1.mp4", "scene3.mp4"]
+    finally:
+        scheduler.shutdown()
+    assert sorted(handed_on) == [1, 3]
+
+def test_cancelled_scenes_still_queued_are_skipped():
+    cancel_event = threading.Event()
+    process = BlockingScenes()
+    scheduler = SceneScheduler(max_workers=1, process_fn=process, cancel_event=cancel_event,
+                               cost_fn=lambda scene, profile: 1.0)
+    try:
+        for number in (1, 2, 3):
+            scheduler.submit(_scene(number))
+        # Cancel once scene 1 is running
+        while not process.started:
+            threading.Event().wait(0.01)
+        cancel_event.set()
+        process.release.set()
+        assert [path for path, _ in scheduler.results()] == ["scene1.mp4"]
+    finally:
+        scheduler.shutdown()
+    assert process.started == [1]
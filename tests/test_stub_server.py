@@ -0,0 +1,30 @@
+import os
+import pytest
+import requests
+from benchmarks.stub_server import build_plan, start_stub_server, stub_environment
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    server, state = start_stub_server(str(tmp_path / "media"), time_scale=0.0)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+def test_build_plan_is_deterministic():
+    plan = build_plan(6, image_ratio=0.5)
+    assert plan == build_plan(6, image_ratio=0.5)
+    assert len(plan["scenes"]) == 6
+    assert {scene["type"] for scene in plan["scenes"]} <= {"image", "video"}
+
+def test_veo3_submit_counts_one_request(stub):
+    response = requests.post(f"{stub.base_url}/veo3/generate", json={"prompt": "a beach", "duration": 5})
+    assert response.status_code == 202
+    assert stub.request_counts == {"veo3": 1}
+
+def test_stub_environment_keeps_run_state_under_work_dir(tmp_path):
+    environment = stub_environment("http://127.0.0.1:1", str(tmp_path))
+    assert environment["VEO3_API_BASE"] == "http://127.0.0.1:1/veo3"
+    for key in ("LATENCY_HISTORY_PATH", "ASSET_CACHE_DIR", "VEO3_JOBS_DIR", "RENDER_DIR", "SCRATCH_DIR", "TRACE_DIR"):
+        assert environment[key].startswith(os.path.join(str(tmp_path), "assets"))
+    assert "LATENCY_HISTORY_PATH" not in stub_environment("http://127.0.0.1:1")
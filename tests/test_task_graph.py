@@ -0,0 +1,49 @@
+import threading
+import pytest
+from video_processing.task_graph import TaskGraph
+
+def test_dependencies_get_results_in_declared_order():
+    graph = TaskGraph()
+    graph.add("voice", lambda: "voice.mp3")
+    graph.add("media", lambda: "clip.mp4")
+    graph.add("render", lambda media, voice: f"{media}+{voice}", deps=("media", "voice"))
+    assert graph.run() == {"voice": "voice.mp3", "media": "clip.mp4", "render": "clip.mp4+voice.mp3"}
+
+def test_independent_tasks_run_concurrently():
+    # Each task waits for the other to start, so this only finishes if both run at once
+    barrier = threading.Barrier(2, timeout=5)
+    graph = TaskGraph()
+    graph.add("media", lambda: barrier.wait() is not None)
+    graph.add("music", lambda: barrier.wait() is not None)
+    assert graph.run() == {"media": True, "music": True}
+
+def test_failed_task_yields_none_to_its_dependents():
+    def fail():
+        raise RuntimeError("provider down")
+
+    graph = TaskGraph()
+    graph.add("music", fail)
+    graph.add("render", lambda music: f"render with {music}", deps=("music",))
+    results = graph.run()
+    assert results == {"music": None, "render": "render with None"}
+    assert graph.is_done("music")
+    assert graph.result("music") is None
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    graph = TaskGraph()
+    graph.add("render", lambda media: media, deps=("media",))
+    with pytest.raises(ValueError):
+        graph.run()
+
+    graph = TaskGraph()
+    graph.add("a", lambda b: b, deps=("b",))
+    graph.add("b", lambda a: a, deps=("a",))
+    with pytest.raises(ValueError):
+        graph.run()
+
+def test_tasks_can_check_progress_of_others():
+    graph = TaskGraph()
+    release = threading.Event()
+    graph.add("music", lambda: release.wait(5))
+    graph.add("media", lambda: (graph.is_done("music"), release.set())[0])
+    assert graph.run()["media"] is False
@@ -0,0 +1,92 @@
+import json
+import threading
+import pytest
+from instrumentation.tracing import Tracer
+
+@pytest.fixture
+def tracer():
+    return Tracer(enabled=True)
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("plan") as span:
+        span.set(status=200)
+        span.add("bytes_downloaded", 10)
+    assert tracer.current() is span
+    assert tracer.events() == []
+
+def test_span_records_a_complete_event(tracer):
+    with tracer.span("download", category="http", url="u") as span:
+        span.set(status=200)
+        tracer.current().add("bytes_downloaded", 100)
+        tracer.current().add("bytes_downloaded", 50)
+    [event] = tracer.events()
+    assert event["ph"] == "X" and event["cat"] == "http" and event["name"] == "download"
+    assert event["args"]["url"] == "u" and event["args"]["status"] == 200
+    assert event["args"]["bytes_downloaded"] == 150
+    assert "cpu_seconds" in event["args"]
+
+def test_errors_are_recorded_and_propagated(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("plan"):
+            raise ValueError("bad plan")
+    assert tracer.events()[0]["args"]["error"] == "ValueError: bad plan"
+    assert tracer.stats()[0]["errors"] == 1
+
+def test_current_is_the_innermost_span_of_each_thread(tracer):
+    seen = []
+    with tracer.span("outer") as outer:
+        with tracer.span("inner") as inner:
+            assert tracer.current() is inner
+            # Another thread has no open span
+            thread = threading.Thread(target=lambda: seen.append(tracer.current()))
+            thread.start()
+            thread.join()
+        assert tracer.current() is outer
+    assert seen[0] is not outer and seen[0] is not inner
+
+def test_traced_wraps_the_function(tracer):
+    @tracer.traced("suno.music", category="provider")
+    def generate(x):
+        return x * 2
+
+    assert generate(3) == 6
+    tracer.disable()
+    assert generate(4) == 8
+    assert [event["name"] for event in tracer.events()] == ["suno.music"]
+
+def test_stats_aggregate_by_category_and_name(tracer):
+    for _ in range(3):
+        with tracer.span("ffmpeg", category="ffmpeg") as span:
+            span.add("bytes_downloaded", 1000)
+    with tracer.span("plan"):
+        pass
+    rows = {row["name"]: row for row in tracer.stats()}
+    assert rows["ffmpeg"]["count"] == 3
+    assert rows["ffmpeg"]["bytes"] == 3000
+    assert rows["ffmpeg"]["mean"] == pytest.approx(rows["ffmpeg"]["total"] / 3)
+    # A header line plus one line per category and name
+    assert len(tracer.summary().splitlines()) == 3
+
+def test_drained_events_merge_into_another_tracer(tracer, tmp_path):
+    with tracer.span("scene", category="scene"):
+        pass
+    events = tracer.drain()
+    assert tracer.events() == []
+
+    parent = Tracer(enabled=True)
+    parent.merge(events)
+    assert [event["name"] for event in parent.events()] == ["scene"]
+
+    path = parent.export_chrome_trace(str(tmp_path / "traces" / "run.json"))
+    with open(path, "r") as f:
+        trace = json.load(f)
+    # Thread names travel with the events as metadata
+    assert [event["ph"] for event in trace["traceEvents"]] == ["M", "X"]
+    assert trace["traceEvents"][0]["args"]["name"] == threading.current_thread().name
+
+def test_reset_drops_recorded_spans(tracer):
+    with tracer.span("plan"):
+        pass
+    tracer.reset()
+    assert tracer.events() == [] and tracer.stats() == []
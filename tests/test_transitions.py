@@ -0,0 +1,42 @@
+from ffmpeg_tools.transitions import plan_cuts
+
+KEYFRAMES_5S = [0.0, 1.0, 2.0, 3.0, 4.0]
+
+def test_long_segments_crossfade_between_keyframes():
+    heads, tails, fades = plan_cuts([5.0, 5.0], [KEYFRAMES_5S, KEYFRAMES_5S], 1.0)
+    assert fades == [True]
+    # Outgoing window starts on the last keyframe at least 1s before the end,
+    # incoming window ends on the first keyframe at or after 1s
+    assert tails == [4.0, 5.0]
+    assert heads == [0.0, 1.0]
+
+def test_window_snaps_to_keyframes_for_fractional_durations():
+    heads, tails, fades = plan_cuts([5.0, 5.0], [KEYFRAMES_5S, KEYFRAMES_5S], 0.5)
+    assert fades == [True]
+    assert tails[0] == 4.0
+    assert heads[1] == 1.0
+
+def test_incoming_segment_shorter_than_crossfade_keeps_hard_cut():
+    heads, tails, fades = plan_cuts([5.0, 0.8], [KEYFRAMES_5S, [0.0]], 1.0)
+    assert fades == [False]
+    assert heads == [0.0, 0.0]
+    assert tails == [5.0, 0.8]
+
+def test_short_middle_segment_cannot_give_both_windows():
+    # The middle segment's head window already ends at 1s, so its tail window
+    # (which would start at 0s) would overlap it: the second boundary stays a hard cut
+    heads, tails, fades = plan_cuts(
+        [5.0, 1.5, 5.0], [KEYFRAMES_5S, [0.0, 1.0], KEYFRAMES_5S], 1.0
+    )
+    assert fades == [True, False]
+    assert heads == [0.0, 1.0, 0.0]
+    assert tails == [4.0, 1.5, 5.0]
+
+def test_keyframe_at_segment_end_is_not_a_head_cut():
+    # A keyframe at the very end of the incoming segment leaves nothing to copy
+    heads, tails, fades = plan_cuts([5.0, 1.0], [KEYFRAMES_5S, [0.0, 1.0]], 1.0)
+    assert fades == [False]
+
+def test_single_or_no_segment_has_no_boundaries():
+    assert plan_cuts([4.0], [[0.0, 1.0, 2.0, 3.0]], 1.0) == ([0.0], [4.0], [])
+    assert plan_cuts([], [], 1.0) == ([], [], [])
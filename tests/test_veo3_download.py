@@ -0,0 +1,237 @@
+import contextlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from ai_services import http_client, veo3
+from ai_services.cache import AssetCache
+from ai_services.http_client import download_with_resume
+from instrumentation.latency import LatencyHistory
+
+VIDEO = bytes(range(256)) * 64
+OTHER_VIDEO = b"another generation " * 1024
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the Veo3 API and its video host.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        provider = self.server.provider
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        provider.submitted += 1
+        self._json(200, provider.submit_response)
+
+    def do_GET(self):
+        provider = self.server.provider
+        provider.requests.append((self.path, self.headers.get("Range")))
+        if self.path.startswith("/jobs/"):
+            statuses = provider.jobs.get(self.path[len("/jobs/"):])
+            if statuses is None:
+                return self._json(404, {"error": "not found"})
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            if isinstance(status, int):
+                return self._json(status, {})
+            return self._json(200, {"status": status, "video_url": provider.url(self.path.replace("/jobs/", "/videos/"))})
+
+        body = provider.videos[self.path]
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range") or "")
+        offset = int(match.group(1)) if match and not provider.ignore_range else 0
+        if offset >= len(body) > 0 and match:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(body)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(206 if offset else 200)
+        if offset:
+            self.send_header("Content-Range", f"bytes {offset}-{len(body) - 1}/{len(body)}")
+        self.send_header("Content-Length", str(len(body) - offset))
+        self.end_headers()
+        if provider.truncate:
+            # Drop the connection halfway through the body
+            provider.truncate -= 1
+            self.wfile.write(body[offset:offset + (len(body) - offset) // 2])
+            return
+        self.wfile.write(body[offset:])
+
+class Provider:
+    def __init__(self):
+        self.videos = {}
+        self.jobs = {}
+        self.requests = []
+        self.submitted = 0
+        self.submit_response = {}
+        self.ignore_range = False
+        self.truncate = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.provider = self
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def ranges(self, path):
+        return [value for requested, value in self.requests if requested == path]
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt, **kwargs: 0)
+    stand_in = Provider()
+    stand_in.thread.start()
+    yield stand_in
+    stand_in.server.shutdown()
+    stand_in.server.server_close()
+
+@pytest.fixture
+def veo(provider, tmp_path, monkeypatch):
+    monkeypatch.setattr(veo3, "API_BASE", provider.url(""))
+    monkeypatch.setattr(veo3, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(veo3, "asset_cache", AssetCache(cache_dir=str(tmp_path / "cache")))
+    monkeypatch.setattr(veo3, "latency_history", LatencyHistory(path=str(tmp_path / "latency.json")))
+    monkeypatch.setattr(veo3, "backoff_delay", lambda attempt, **kwargs: 0)
+    # The real veo3 rate limit would stall the test run
+    monkeypatch.setattr(veo3, "provider_slot", lambda name: contextlib.nullcontext(0.0))
+    return provider
+
+def _write_partial(path, data, key):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    with open(f"{path}.key", "w") as f:
+        f.write(key)
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_download_without_partial(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    dest = str(tmp_path / "v.mp4")
+    download_with_resume(provider.url("/v.mp4"), dest)
+    assert _read(dest) == VIDEO
+    assert provider.ranges("/v.mp4") == [None]
+    assert os.listdir(tmp_path) == ["v.mp4"]
+
+def test_partial_is_resumed_with_range(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    dest, partial = str(tmp_path / "v.mp4"), str(tmp_path / "v.part")
+    _write_partial(partial, VIDEO[:1000], "job-1")
+    download_with_resume(provider.url("/v.mp4"), dest, partial_path=partial, resume_key="job-1")
+    assert _read(dest) == VIDEO
+    assert provider.ranges("/v.mp4") == ["bytes=1000-"]
+
+def test_full_response_to_range_request_restarts_file(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    provider.ignore_range = True
+    dest, partial = str(tmp_path / "v.mp4"), str(tmp_path / "v.part")
+    _write_partial(partial, VIDEO[:1000], "job-1")
+    download_with_resume(provider.url("/v.mp4"), dest, partial_path=partial, resume_key="job-1")
+    assert _read(dest) == VIDEO
+
+def test_short_read_is_resumed(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    provider.truncate = 1
+    dest = str(tmp_path / "v.mp4")
+    download_with_resume(provider.url("/v.mp4"), dest, chunk_size=1024)
+    assert _read(dest) == VIDEO
+    assert provider.ranges("/v.mp4") == [None, f"bytes={len(VIDEO) // 2}-"]
+
+def test_complete_partial_is_accepted_on_416(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    dest, partial = str(tmp_path / "v.mp4"), str(tmp_path / "v.part")
+    _write_partial(partial, VIDEO, "job-1")
+    download_with_resume(provider.url("/v.mp4"), dest, partial_path=partial, resume_key="job-1")
+    assert _read(dest) == VIDEO
+    assert provider.ranges("/v.mp4") == [f"bytes={len(VIDEO)}-"]
+
+def test_oversized_partial_is_discarded_on_416(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    dest, partial = str(tmp_path / "v.mp4"), str(tmp_path / "v.part")
+    _write_partial(partial, OTHER_VIDEO, "job-1")
+    download_with_resume(provider.url("/v.mp4"), dest, partial_path=partial, resume_key="job-1")
+    assert _read(dest) == VIDEO
+    assert provider.ranges("/v.mp4") == [f"bytes={len(OTHER_VIDEO)}-", None]
+
+def test_partial_of_another_download_is_not_resumed(provider, tmp_path):
+    provider.videos["/v.mp4"] = VIDEO
+    dest, partial = str(tmp_path / "v.mp4"), str(tmp_path / "v.part")
+    _write_partial(partial, OTHER_VIDEO[:1000], "job-old")
+    download_with_resume(provider.url("/v.mp4"), dest, partial_path=partial, resume_key="job-new")
+    assert _read(dest) == VIDEO
+    assert provider.ranges("/v.mp4") == [None]
+
+def test_poll_backs_off_until_completed(veo, monkeypatch):
+    attempts = []
+    monkeypatch.setattr(veo3, "backoff_delay", lambda attempt, **kwargs: attempts.append(attempt) or 0)
+    veo.jobs["job-1"] = ["running", 503, "running", "completed"]
+    assert veo3.poll_veo3_job("job-1") == veo.url("/videos/job-1")
+    assert attempts == [0, 1, 2]
+
+def test_poll_raises_for_failed_and_unknown_jobs(veo):
+    veo.jobs["job-1"] = ["failed"]
+    with pytest.raises(veo3.Veo3JobError):
+        veo3.poll_veo3_job("job-1")
+    with pytest.raises(veo3.Veo3JobError):
+        veo3.poll_veo3_job("missing")
+
+def test_poll_times_out(veo, monkeypatch):
+    monkeypatch.setattr(veo3, "backoff_delay", lambda attempt, **kwargs: 60)
+    veo.jobs["job-1"] = ["running"]
+    with pytest.raises(TimeoutError):
+        veo3.poll_veo3_job("job-1", timeout=1)
+
+def test_persisted_job_is_resumed(veo, tmp_path):
+    key = veo3.asset_cache.make_key("veo3", "a beach", duration=8)
+    veo3._update_job(key, {"job_id": "job-1", "submitted": 0})
+    veo.jobs["job-1"] = ["completed"]
+    veo.videos["/videos/job-1"] = VIDEO
+    _write_partial(veo3._partial_path("job-1"), VIDEO[:1000], "job-1")
+
+    path = veo3.generate_veo3_video("a beach", 8, "s1", save_dir=str(tmp_path / "scenes"))
+    assert _read(path) == VIDEO
+    assert veo.submitted == 0
+    assert veo.ranges("/videos/job-1") == ["bytes=1000-"]
+    assert veo3._load_jobs() == {}
+
+def test_expired_job_drops_its_partial_before_resubmitting(veo, tmp_path):
+    key = veo3.asset_cache.make_key("veo3", "a beach", duration=8)
+    veo3._update_job(key, {"job_id": "job-old", "submitted": 0})
+    _write_partial(veo3._partial_path("job-old"), OTHER_VIDEO, "job-old")
+    save_dir = str(tmp_path / "scenes")
+
+    # The provider no longer knows the job: it and its partial download are forgotten
+    assert veo3.generate_veo3_video("a beach", 8, "s1", save_dir=save_dir) is None
+    assert veo3._load_jobs() == {}
+    assert not os.path.exists(veo3._partial_path("job-old"))
+
+    veo.submit_response = {"job_id": "job-new"}
+    veo.jobs["job-new"] = ["completed"]
+    veo.videos["/videos/job-new"] = VIDEO
+    path = veo3.generate_veo3_video("a beach", 8, "s1", save_dir=save_dir)
+    assert _read(path) == VIDEO
+    assert veo.ranges("/videos/job-new") == [None]
+
+def test_video_returned_without_job_never_resumes_a_stale_partial(veo, tmp_path):
+    veo.submit_response = {"video_url": veo.url("/videos/direct")}
+    veo.videos["/videos/direct"] = VIDEO
+    save_dir = tmp_path / "scenes"
+    _write_partial(str(save_dir / "s1_veo.mp4.part"), OTHER_VIDEO, "https://elsewhere/video.mp4")
+
+    path = veo3.generate_veo3_video("a beach", 8, "s1", save_dir=str(save_dir))
+    assert _read(path) == VIDEO
+    assert veo.ranges("/videos/direct") == [None]
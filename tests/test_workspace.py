@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import pytest
+from video_processing.workspace import PID_FILE, ScratchBudgetExceeded, ScratchWorkspace
+
+def test_workspace_is_removed_when_the_block_exits(tmp_path):
+    with pytest.raises(ValueError):
+        with ScratchWorkspace(root=str(tmp_path), name="render") as workspace:
+            with open(workspace.file("segment.mp4"), "wb") as f:
+                f.write(b"data")
+            assert os.path.basename(workspace.path).startswith("render_")
+            raise ValueError("scene failed")
+    assert not os.path.exists(workspace.path)
+
+def test_budget_is_enforced(tmp_path):
+    with ScratchWorkspace(root=str(tmp_path), max_bytes=100) as workspace:
+        with open(workspace.file("small.bin"), "wb") as f:
+            f.write(b"x" * 50)
+        workspace.check_budget()
+        with open(workspace.file("large.bin"), "wb") as f:
+            f.write(b"x" * 100)
+        with pytest.raises(ScratchBudgetExceeded):
+            workspace.check_budget()
+
+def test_release_only_deletes_files_inside_the_workspace(tmp_path):
+    outside = tmp_path / "final.mp4"
+    outside.write_bytes(b"final")
+    with ScratchWorkspace(root=str(tmp_path / "scratch")) as workspace:
+        inside = workspace.file("segment.mp4")
+        with open(inside, "wb") as f:
+            f.write(b"segment")
+        workspace.release(inside, str(outside), workspace.file("missing.mp4"), None)
+        assert not os.path.exists(inside)
+        assert outside.exists()
+        assert not workspace.owns(workspace.path + "_sibling/file.mp4")
+
+def test_workspaces_of_dead_processes_are_swept(tmp_path):
+    # A workspace whose owner has exited, and one owned by this process
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    stale = tmp_path / "job_stale"
+    stale.mkdir()
+    (stale / PID_FILE).write_text(dead)
+    live = tmp_path / "job_live"
+    live.mkdir()
+    (live / PID_FILE).write_text(str(os.getpid()))
+
+    with ScratchWorkspace(root=str(tmp_path)):
+        assert not stale.exists()
+        assert live.exists()
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import time
+from ffmpeg_tools.profiles import get_profile
+
+# Normalized scene segments kept between runs, named by their input hash
+RENDER_DIR = os.getenv("RENDER_DIR", "./assets/renders")
+
+# Bump when a rendering change makes previously kept segments stale
+RENDER_VERSION = 2
+
+def scene_pan(scene):
+    """
+    Ken Burns pan direction of a still: alternates with the scene number.
+    """
+    return "right" if scene["scene_number"] % 2 else "left"
+
+def scene_input_hash(scene, profile=None):
+    """
+    Hash of everything that determines a scene's rendered segment.
+
+    The scene number itself is left out, so a video scene that only moved in
+    the plan keeps its render; an image scene keeps it only if its pan
+    direction, which follows the number, is unchanged. The render profile
+    settings are included, so draft and final segments never stand in for
+    each other.
+
+    Args:
+        scene (dict): Scene data from the video plan.
+        profile (str or dict): Render profile of the segment.
+
+    Returns:
+        str: Hex digest.
+    """
+    inputs = {key: value for key, value in scene.items() if key != "scene_number"}
+    if scene.get("type") == "image":
+        inputs["pan"] = scene_pan(scene)
+    payload = json.dumps(
+        {"render_version": RENDER_VERSION, "profile": get_profile(profile), "scene": inputs}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def render_path(input_hash):
+    """
+    Where the normalized segment for a scene input hash is kept.
+    """
+    return os.path.join(RENDER_DIR, f"{input_hash}.mp4")
+
+def manifest_path_for(output_path):
+    """
+    Manifest location for a final video: next to it, as <name>.manifest.json.
+    """
+    return f"{os.path.splitext(output_path)[0]}.manifest.json"
+
+def load_plan(path):
+    """
+    Load a video plan from a plan JSON file or from a run manifest.
+
+    Returns:
+        dict: The plan ({"scenes": [...]}).
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data.get("plan", data)
+
+class JobManifest:
+    """
+    Record of one run: the plan, and per scene its input hash, generated
+    assets and kept render.
+
+    A re-run loads the previous manifest and reuses the render of every scene
+    whose input hash is unchanged, so only changed scenes are generated and
+    rendered again before the final concat. Scenes rendered with a deadline
+    fallback (e.g. a still in place of a late video) are never reused, so the
+    next run tries the real inputs again.
+    """
+
+    def __init__(self, path, data=None):
+        self.path = path
+        self.data = data or {"scenes": []}
+        self._renders = {
+            entry["input_hash"]: entry for entry in self.data.get("scenes", [])
+            if entry.get("input_hash") and entry.get("render")
+            and not (entry.get("assets") or {}).get("fallbacks")
+        }
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a manifest, or start an empty one if it is missing or unreadable.
+        """
+        try:
+            with open(path, "r") as f:
+                return cls(path, json.load(f))
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable manifest {path}: {e}")
+            return cls(path)
+
+    def reusable_render(self, input_hash):
+        """
+        Entry of a scene rendered by the previous run with the same inputs, if its segment still exists.
+
+        Returns:
+            dict or None: {"input_hash", "render", "duration", "assets"}.
+        """
+        entry = self._renders.get(input_hash)
+        if entry and os.path.exists(entry["render"]):
+            return entry
+        return None
+
+    def save(self, prompt, plan, scenes, output_path):
+        """
+        Write the manifest for a finished run (atomically).
+
+        Args:
+            prompt (str): The user prompt.
+            plan (dict): The plan that was rendered.
+            scenes (list): Per-scene entries: scene_number, input_hash,
+                render, duration and assets.
+            output_path (str): The final video.
+        """
+        self.data = {
+            "version": RENDER_VERSION,
+            "created": time.time(),
+            "prompt": prompt,
+            "output": output_path,
+            "plan": plan,
+            "scenes": scenes
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(temp_path, self.path)
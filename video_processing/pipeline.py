@@ -0,0 +1,236 @@
+import os
+import time
+from prompts.scene_generator import stream_video_plan_from_prompt, valid_scenes
+from ffmpeg_tools.combine import SceneAssembler
+from ffmpeg_tools.profiles import get_profile
+from video_processing.scheduler import SceneScheduler
+from video_processing.plan_audio import MusicPlanner, VoicePlanner
+from video_processing.workspace import ScratchWorkspace
+from video_processing.manifest import JobManifest, manifest_path_for, render_path, scene_input_hash
+from instrumentation.tracing import tracer, TRACE_DIR
+
+# Default time budget of a job in seconds (0 for none), and the part of it kept for the final assembly
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", 0))
+ASSEMBLY_RESERVE_SECONDS = float(os.getenv("ASSEMBLY_RESERVE_SECONDS", 15))
+
+class JobCancelled(Exception):
+    """
+    Raised by generate_video when its cancel_event is set during the run.
+    """
+
+def generate_video(user_prompt, output_path="./assets/final/final_video.mp4", plan=None, profile=None,
+                   scene_pool=None, ffmpeg_pool=None, export_trace=True, on_progress=None, cancel_event=None,
+                   transition=None, deadline=None):
+    """
+    Generate a full video from a prompt: plan, scenes, then assembly.
+
+    The plan is streamed, and each scene is handed to the scheduler as soon as
+    it is complete, so media and voice generation overlap with planning.
+    Background music is generated once per group of consecutive scenes with
+    the same genre and mood, and narration once per group of consecutive
+    scenes with the same voice; both are sliced per scene.
+    Assembly is pipelined with scene generation: each scene is normalized
+    to the concat format as soon as it finishes, so once the last scene lands
+    only the stream-copy concat remains.
+    Each run writes a manifest next to the output (see JobManifest). Scenes
+    whose inputs match the previous run's manifest reuse its normalized
+    segment, so a re-run only renders changed scenes and redoes the concat.
+    Intermediates live in a per-run scratch workspace (SCRATCH_DIR) that is
+    removed when the run ends, whether it succeeds or not.
+    With TRACE_ENABLED set, the run is traced: a Chrome trace is written to
+    TRACE_DIR and a per-stage summary is printed when it ends.
+
+    Args:
+        user_prompt (str): Description of the video.
+        output_path (str): Path to save the final video.
+        plan (dict): Use this plan instead of asking the LLM (e.g. an edited
+            plan, or the "plan" of an earlier manifest).
+        profile (str): Render profile, e.g. "draft" for a quick preview. A
+            draft promotes to final by re-running with "final": generated
+            assets come from the asset cache and only the renders are redone.
+        scene_pool (concurrent.futures.Executor): Shared scene worker pool
+            (e.g. across batch jobs); defaults to a pool for this run.
+        ffmpeg_pool (concurrent.futures.ProcessPoolExecutor): Shared
+            normalization pool; defaults to a pool for this run.
+        export_trace (bool): Reset the tracer for this run and export its
+            trace at the end (when tracing is enabled). Batch runs pass False
+            and export one trace for the whole batch.
+        on_progress (callable): Optional callback(stage, scene_number, **info)
+            called as the run advances: "planned", "generated" (scene
+            rendered) and "rendered" (segment normalized, or "reused") per
+            scene, "eta" with the estimated seconds until every scene is
+            rendered (see SceneScheduler.eta), then "assembled" with the
+            final path.
+        cancel_event (threading.Event): When set, no further scenes are
+            started, queued scenes are skipped and the run stops with
+            JobCancelled before assembly. Scenes already running finish first.
+        transition (float): Crossfade length in seconds between scenes
+            (TRANSITION_DURATION by default, 0 for hard cuts). Only the
+            boundaries are re-encoded, so unchanged scenes stay reusable.
+        deadline (float): Time budget of the job in seconds, from now
+            (JOB_DEADLINE_SECONDS by default, 0 for none). Every scene is due
+            ASSEMBLY_RESERVE_SECONDS before it; slow provider calls are
+            hedged, and inputs that are still missing at a scene's deadline
+            fall back (a video becomes a still, music is dropped). Scenes
+            that used a fallback are not reused by the next run.
+
+    Returns:
+        str or None: Path to the final video, or None if generation failed.
+
+    Raises:
+        JobCancelled: If cancel_event was set.
+    """
+    options = {
+        "scene_pool": scene_pool,
+        "ffmpeg_pool": ffmpeg_pool,
+        "on_progress": on_progress,
+        "cancel_event": cancel_event,
+        "transition": transition,
+        "deadline": deadline
+    }
+    if not tracer.enabled or not export_trace:
+        return _generate_video(user_prompt, output_path, plan, profile, **options)
+
+    # Traced run: export a Chrome trace and print a per-stage summary at the end
+    tracer.reset()
+    try:
+        with tracer.span("generate_video", category="pipeline"):
+            return _generate_video(user_prompt, output_path, plan, profile, **options)
+    finally:
+        trace_path = os.path.join(TRACE_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        tracer.export_chrome_trace(trace_path)
+        print(tracer.summary())
+        print(f"Trace saved to {trace_path}")
+
+def _generate_video(user_prompt, output_path, plan=None, profile=None, scene_pool=None, ffmpeg_pool=None,
+                    on_progress=None, cancel_event=None, transition=None, deadline=None):
+    deadline = JOB_DEADLINE_SECONDS if deadline is None else deadline
+    scene_deadline = time.monotonic() + deadline - ASSEMBLY_RESERVE_SECONDS if deadline else None
+    with ScratchWorkspace(name="video") as workspace:
+        return _run_pipeline(
+            user_prompt, output_path, workspace, plan, get_profile(profile), scene_pool, ffmpeg_pool,
+            on_progress, cancel_event, transition, scene_deadline
+        )
+
+def _progress_reporter(on_progress):
+    def report(stage, scene_number=None, **info):
+        if on_progress is None:
+            return
+        try:
+            on_progress(stage, scene_number, **info)
+        except Exception as e:
+            print(f"Error reporting progress ({stage}): {e}")
+    return report
+
+def _run_pipeline(user_prompt, output_path, workspace, plan=None, profile=None, scene_pool=None, ffmpeg_pool=None,
+                  on_progress=None, cancel_event=None, transition=None, scene_deadline=None):
+    report = _progress_reporter(on_progress)
+    cancelled = cancel_event.is_set if cancel_event is not None else lambda: False
+    manifest = JobManifest.load(manifest_path_for(output_path))
+    entries = {}
+    assembler = SceneAssembler(
+        temp_dir=workspace.path,
+        profile=profile,
+        pool=ffmpeg_pool,
+        on_segment=lambda order, path: report("rendered" if path else "failed", order),
+        transition=transition
+    )
+    music_planner = MusicPlanner()
+    voice_planner = VoicePlanner()
+
+    def scene_done(scene, result):
+        report("generated", scene["scene_number"], duration=result[1])
+        report("eta", seconds=round(scheduler.eta(), 1))
+        assembler.add(
+            scene["scene_number"], *result,
+            remove_source=workspace.owns(result[0]),
+            segment_path=entries[scene["scene_number"]]["render"]
+        )
+
+    scheduler = SceneScheduler(pool=scene_pool, on_result=scene_done, cancel_event=cancel_event)
+    scenes = valid_scenes(plan["scenes"]) if plan is not None else stream_video_plan_from_prompt(user_prompt)
+    planned_scenes = []
+    try:
+        reused = 0
+        for scene in scenes:
+            if cancelled():
+                break
+            scene_number = scene.get("scene_number")
+            print(f"Planned scene {scene_number}")
+            report("planned", scene_number, type=scene.get("type"), duration=scene.get("duration"))
+            planned_scenes.append(scene)
+            input_hash = scene_input_hash(scene, profile)
+            previous = manifest.reusable_render(input_hash)
+            if previous:
+                # Unchanged since the last run: reuse its segment. The music and
+                # voice groups end here, since this scene keeps its old slices.
+                print(f"Scene {scene_number} unchanged, reusing {previous['render']}")
+                music_planner.close()
+                voice_planner.close()
+                entries[scene_number] = dict(previous, scene_number=scene_number)
+                assembler.add_segment(scene_number, previous["render"])
+                report("reused", scene_number)
+                reused += 1
+                continue
+            entries[scene_number] = {
+                "scene_number": scene_number,
+                "input_hash": input_hash,
+                "render": render_path(input_hash),
+                "duration": scene["duration"],
+                "assets": {}
+            }
+            scheduler.submit(
+                scene,
+                music=music_planner.add(scene),
+                voice=voice_planner.add(scene),
+                workspace=workspace,
+                assets=entries[scene_number]["assets"],
+                profile=profile,
+                deadline=scene_deadline
+            )
+        planned = len(planned_scenes)
+        # The plan is complete: send the last music and voice groups right away
+        music_planner.close()
+        voice_planner.close()
+        if cancelled():
+            raise JobCancelled("Job cancelled")
+        if planned:
+            eta = scheduler.eta()
+            print(f"Estimated time to render all scenes: {eta:.0f}s")
+            report("eta", seconds=round(eta, 1))
+        if not planned:
+            print("Failed to generate video plan.")
+            assembler.close()
+            return None
+        with tracer.span("wait_for_scenes", category="pipeline"):
+            scene_files = scheduler.results()
+        if cancelled():
+            raise JobCancelled("Job cancelled")
+    except Exception:
+        assembler.close()
+        raise
+    finally:
+        # A stream left early (cancel, error) releases its OpenAI slot now, not at garbage collection
+        scenes.close()
+        music_planner.close()
+        voice_planner.close()
+        scheduler.shutdown()
+        music_planner.shutdown()
+        voice_planner.shutdown()
+
+    # Combine all scenes into final video
+    if not scene_files and not reused:
+        print("No scenes were successfully processed.")
+        assembler.close()
+        return None
+    final_path = assembler.finish(output_path)
+    report("assembled", output=final_path)
+
+    # Record what was rendered so the next run can skip unchanged scenes
+    manifest.save(
+        user_prompt,
+        {"scenes": planned_scenes},
+        [entries[number] for number in sorted(assembler.completed) if number in entries],
+        final_path
+    )
+    return final_path
@@ -0,0 +1,260 @@
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from ai_services.music import generate_suno_music_and_save
+from ai_services.voiceover import generate_voiceover_with_timestamps, voice_id_for
+from ffmpeg_tools.audio import slice_audio
+from ffmpeg_tools.effects import effects_duration
+
+# Longest narration sent in one ElevenLabs request (the API caps text length)
+VOICE_MAX_CHARS = 4500
+# A narration group is sent once it has VOICE_MAX_SCENES scenes, or VOICE_GROUP_WINDOW
+# seconds after its first scene, so early scenes never wait for the whole plan
+VOICE_MAX_SCENES = 3
+VOICE_GROUP_WINDOW = 2.0
+# Audio kept after the last character of a scene's narration (its final syllable decays past the alignment)
+VOICE_TAIL_SECONDS = 0.3
+
+def rendered_duration(scene):
+    """
+    Length of the scene as rendered: speed_up shortens video scenes (it does not apply to stills).
+    """
+    if scene["type"] == "image":
+        return scene["duration"]
+    return effects_duration(scene.get("ffmpeg_effects", []), scene["duration"])
+
+class MusicPlanner:
+    """
+    Plan-level background music.
+
+    Scenes are added in plan order. Consecutive scenes with background music
+    and the same genre and mood form a group; each group gets one Suno track
+    covering the whole group, which is then cut at the scene offsets with
+    sample-accurate trims. This replaces one Suno call and download per scene
+    with one per group, and removes the audible cut between scenes of a group.
+    """
+
+    def __init__(self, save_dir="./assets/audio", max_workers=4):
+        self.save_dir = save_dir
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="music")
+        self._group = None
+
+    def add(self, scene):
+        """
+        Add the next scene of the plan.
+
+        Args:
+            scene (dict): Scene data from the video plan.
+
+        Returns:
+            concurrent.futures.Future or None: Resolves to the scene's music
+            file (or None on failure); None if the scene has no music.
+        """
+        audio = scene["audio"]
+        if not audio.get("background_music"):
+            self.close()
+            return None
+
+        key = (str(audio.get("music_genre", "")).lower(), str(audio.get("music_mood", "")).lower())
+        if self._group is not None and self._group["key"] != key:
+            self.close()
+        if self._group is None:
+            self._group = {"key": key, "scenes": []}
+
+        future = Future()
+        self._group["scenes"].append((scene, future))
+        return future
+
+    def close(self):
+        """
+        End the current group (the plan moved on, or ended) and start its generation.
+        """
+        group, self._group = self._group, None
+        if group:
+            self._pool.submit(self._generate, group["scenes"])
+
+    def shutdown(self):
+        self.close()
+        self._pool.shutdown(wait=False)
+
+    def _generate(self, scenes):
+        first_scene = scenes[0][0]
+        audio = first_scene["audio"]
+        group_id = str(uuid.uuid4())
+        total_duration = sum(rendered_duration(scene) for scene, _ in scenes)
+        scene_numbers = [scene["scene_number"] for scene, _ in scenes]
+        try:
+            track_path = generate_suno_music_and_save(
+                prompt=audio["music_description"],
+                unique_id=f"{group_id}_music",
+                genre=audio["music_genre"],
+                mood=audio["music_mood"],
+                duration_seconds=total_duration,
+                save_dir=self.save_dir
+            )
+            if len(scenes) == 1:
+                slices = [track_path]
+            else:
+                print(f"Slicing one music track for scenes {scene_numbers}")
+                segments = []
+                offset = 0
+                for scene, _ in scenes:
+                    output_path = os.path.join(self.save_dir, f"{group_id}_music_scene{scene['scene_number']}.wav")
+                    length = rendered_duration(scene)
+                    segments.append((offset, offset + length, output_path))
+                    offset += length
+                slices = slice_audio(track_path, segments)
+        except Exception as e:
+            print(f"Failed to generate music for scenes {scene_numbers}: {e}")
+            slices = [None] * len(scenes)
+
+        for (_, future), path in zip(scenes, slices):
+            future.set_result(path)
+
+class VoicePlanner:
+    """
+    Plan-level narration.
+
+    Scenes are added in plan order. Consecutive scenes with a voiceover in the
+    same voice form a group; the group's texts are joined and synthesized in
+    one ElevenLabs request with character timestamps, and the audio is split
+    back into one file per scene midway through the pause between scenes.
+    This replaces one TTS round trip per scene with one per group, and keeps
+    the prosody continuous across the group. Each scene also gets the exact
+    length of its narration from the alignment, without probing the file.
+
+    With a streamed plan, a group is also sent once it has `max_scenes`
+    scenes or `window` seconds after its first scene arrived, so the first
+    scenes' narration (and their single-pass render) does not wait for the
+    rest of the plan.
+    """
+
+    def __init__(self, save_dir="./assets/audio", max_workers=4, max_chars=VOICE_MAX_CHARS,
+                 max_scenes=VOICE_MAX_SCENES, window=VOICE_GROUP_WINDOW):
+        self.save_dir = save_dir
+        self.max_chars = max_chars
+        self.max_scenes = max_scenes
+        self.window = window
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voice")
+        self._group = None
+        self._lock = threading.Lock()
+
+    def add(self, scene):
+        """
+        Add the next scene of the plan.
+
+        Args:
+            scene (dict): Scene data from the video plan.
+
+        Returns:
+            concurrent.futures.Future or None: Resolves to (voice file,
+            duration in seconds), or (None, None) on failure; None if the
+            scene has no voiceover.
+        """
+        audio = scene["audio"]
+        text = str(audio.get("voice_text") or "").strip()
+        if not audio.get("voiceover") or not text:
+            self.close()
+            return None
+
+        voice_id = voice_id_for(audio.get("voice_gender", "male"), audio.get("voice_style", "calm"))
+        future = Future()
+        with self._lock:
+            if self._group is not None and (
+                self._group["voice_id"] != voice_id or self._group["chars"] + len(text) + 1 > self.max_chars
+            ):
+                self._close()
+            if self._group is None:
+                self._group = {"voice_id": voice_id, "chars": 0, "scenes": []}
+                self._group["timer"] = threading.Timer(self.window, self._expire, args=(self._group,))
+                self._group["timer"].daemon = True
+                self._group["timer"].start()
+
+            self._group["scenes"].append((scene, text, future))
+            self._group["chars"] += len(text) + 1
+            if len(self._group["scenes"]) >= self.max_scenes:
+                self._close()
+        return future
+
+    def close(self):
+        """
+        End the current group (the plan moved on, or ended) and start its synthesis.
+        """
+        with self._lock:
+            self._close()
+
+    def _expire(self, group):
+        # The group's window is over: send it unless it was already closed
+        with self._lock:
+            if self._group is group:
+                self._close()
+
+    def _close(self):
+        group, self._group = self._group, None
+        if group:
+            group["timer"].cancel()
+            self._pool.submit(self._generate, group["voice_id"], group["scenes"])
+
+    def shutdown(self):
+        self.close()
+        self._pool.shutdown(wait=False)
+
+    def _generate(self, voice_id, scenes):
+        group_id = str(uuid.uuid4())
+        scene_numbers = [scene["scene_number"] for scene, _, _ in scenes]
+        try:
+            # Remember where each scene's text starts in the joined narration
+            spans = []
+            text = ""
+            for _, scene_text, _ in scenes:
+                if text:
+                    text += " "
+                spans.append((len(text), len(text) + len(scene_text)))
+                text += scene_text
+
+            audio_path, alignment = generate_voiceover_with_timestamps(
+                text, unique_id=f"{group_id}_voice", voice_id=voice_id, save_dir=self.save_dir
+            )
+            if not audio_path:
+                raise RuntimeError("no audio returned")
+            cuts = _narration_cuts(alignment, spans)
+            if len(scenes) > 1:
+                print(f"Splitting one voiceover for scenes {scene_numbers}")
+            segments = [
+                (start, end, os.path.join(self.save_dir, f"{group_id}_voice_scene{scene['scene_number']}.wav"))
+                for (scene, _, _), (start, end) in zip(scenes, cuts)
+            ]
+            paths = slice_audio(audio_path, segments)
+            results = [(path, round(end - start, 3)) for path, (start, end, _) in zip(paths, segments)]
+        except Exception as e:
+            print(f"Failed to generate voiceover for scenes {scene_numbers}: {e}")
+            results = [(None, None)] * len(scenes)
+
+        for (_, _, future), result in zip(scenes, results):
+            future.set_result(result)
+
+def _narration_cuts(alignment, spans):
+    """
+    (start, end) seconds of each scene's narration in the joined audio.
+
+    Consecutive scenes are split halfway between the end of one scene's last
+    character and the start of the next scene's first character, so the
+    pause between them is shared and no syllable is cut.
+    """
+    starts = alignment["character_start_times_seconds"]
+    ends = alignment["character_end_times_seconds"]
+    speech = []
+    for first, last in spans:
+        last = min(last, len(ends)) - 1
+        speech.append((starts[min(first, len(starts) - 1)], ends[max(last, 0)]))
+
+    cuts = []
+    for i, (speech_start, speech_end) in enumerate(speech):
+        start = 0.0 if i == 0 else cuts[-1][1]
+        if i + 1 < len(speech):
+            end = (speech_end + speech[i + 1][0]) / 2
+        else:
+            end = speech_end + VOICE_TAIL_SECONDS
+        cuts.append((start, max(end, start)))
+    return cuts
@@ -4,119 +4,414 @@ import uuid
 import threading
 from dotenv import load_dotenv
 from prompts.scene_generator import generate_video_plan_from_prompt
-from ai_services.LeonardoAi import generate_leonardo_image
+from ai_services.LeonardoAI import generate_leonardo_image, image_pool
 from ai_services.veo3 import generate_veo3_video
 from ai_services.voiceover import generate_voiceover
 from ai_services.music import generate_suno_music_and_save
-from ffmpeg_tools.effects import fade_in, fade_out, apply_grayscale, zoom_in, speed_up, add_background_music
-from ffmpeg_tools.combine import combine_scenes
+from ffmpeg_tools.effects import render_scene, apply_effects, mux_audio, effects_duration, has_audio_stream
+from ffmpeg_tools.combine import combine_scenes, render_still
+from ffmpeg_tools.profiles import get_profile
+from video_processing.task_graph import TaskGraph
+from video_processing.manifest import scene_pan
+from instrumentation.tracing import tracer
+from instrumentation.latency import latency_history, request_shape
+from ai_services.hedging import hedged_call, time_left, DeadlineExceeded
 
-def process_scene(scene, scene_files, lock):
+VOICEOVER_VOLUME = 1.0
+MUSIC_VOLUME = 0.3
+
+# What a video scene becomes when its Veo3 video misses the deadline: "still"
+# renders a Leonardo image of the same description with Ken Burns motion,
+# "none" drops the scene. Voiceover and music that miss it are left out.
+VIDEO_DEADLINE_FALLBACK = os.getenv("VIDEO_DEADLINE_FALLBACK", "still")
+
+def _wait(future, deadline):
     """
-    Process a single scene: generate media, voiceover, music, and apply FFmpeg effects.
-    Append the result (file_path, duration) to scene_files using a thread-safe lock.
+    Result of a plan-level future (pooled image, narration, music), bounded by the deadline.
+    """
+    try:
+        return future.result(timeout=time_left(deadline))
+    except DeadlineExceeded:
+        raise
+    except TimeoutError:
+        raise DeadlineExceeded("plan-level result missed its deadline")
 
-    Args:
-        scene (dict): Scene data from the video plan.
-        scene_files (list): Shared list to store (file_path, duration) tuples.
-        lock (threading.Lock): Lock for thread-safe access to scene_files.
+def _generate_media(scene, unique_id, deadline=None):
+    """
+    Generate the scene's image (Leonardo) or video (Veo3).
+    Veo3 calls are hedged (see hedged_call). Raises DeadlineExceeded if the
+    media is not there by `deadline`.
     """
     scene_number = scene["scene_number"]
-    unique_id = str(uuid.uuid4())  # Generate unique ID using UUID
-    print(f"Processing scene {scene_number} in thread {threading.current_thread().name}...")
 
-    # Generate image or video
-    media_path = None
+    def request_video(suffix=""):
+        return generate_veo3_video(
+            prompt=scene["description"],
+            duration_seconds=scene["duration"],
+            unique_id=f"{unique_id}{suffix}",
+            save_dir="./assets/scenes",
+            resume=not suffix
+        )
+
     try:
         if scene["type"] == "image":
-            media_path = generate_leonardo_image(
+            # Shares the bounded Leonardo pool with the other image scenes
+            media_path = _wait(image_pool.submit(
                 prompt=scene["description"],
                 unique_id=unique_id,
                 save_dir="./assets/scenes"
-            )
+            ), deadline)
         elif scene["type"] == "video":
-            media_path = generate_veo3_video(
-                prompt=scene["description"],
-                duration_seconds=scene["duration"],
-                unique_id=unique_id,
-                save_dir="./assets/scenes"
+            media_path = hedged_call(
+                "veo3",
+                request_shape("video", scene["duration"]),
+                request_video,
+                hedge=lambda: request_video("_hedge"),
+                deadline=deadline
             )
+        else:
+            media_path = None
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"Failed to generate media for scene {scene_number}: {e}")
-        return
+        return None
 
     if not media_path:
         print(f"Failed to generate media for scene {scene_number}")
-        return
+    return media_path
 
-    # Generate voiceover if specified
-    audio_path = None
-    if scene["audio"]["voiceover"]:
-        try:
-            voice_text = scene["audio"]["voice_text"]
-            audio_path = generate_voiceover(
-                text=voice_text,
-                unique_id=f"{unique_id}_voice",
-                voice_gender=scene["audio"]["voice_gender"],
-                voice_style=scene["audio"]["voice_style"],
-                save_dir="./assets/audio"
+def _generate_fallback_still(scene, unique_id, deadline=None):
+    """
+    Leonardo image for a video scene that missed its deadline.
+    """
+    try:
+        return hedged_call(
+            "leonardo",
+            request_shape("image"),
+            lambda: generate_leonardo_image(
+                prompt=scene["description"],
+                unique_id=f"{unique_id}_fallback",
+                save_dir="./assets/scenes"
+            ),
+            deadline=deadline
+        )
+    except Exception as e:
+        print(f"Failed to generate a fallback image for scene {scene['scene_number']}: {e}")
+        return None
+
+def _generate_voiceover(scene, unique_id, voice=None, timing=None, deadline=None, fallbacks=None):
+    """
+    Generate the scene's voiceover if specified, or wait for the plan-level
+    narration slice when one is provided (falling back to a per-scene request
+    if that failed). The narration length, when known, goes into `timing`.
+    A voiceover that misses `deadline` is left out (noted in `fallbacks`).
+    """
+    if not scene["audio"]["voiceover"]:
+        return None
+
+    def request_voice(suffix=""):
+        return generate_voiceover(
+            text=scene["audio"]["voice_text"],
+            unique_id=f"{unique_id}_voice{suffix}",
+            voice_gender=scene["audio"]["voice_gender"],
+            voice_style=scene["audio"]["voice_style"],
+            save_dir="./assets/audio"
+        )
+
+    try:
+        if voice is not None:
+            voice_path, voice_duration = _wait(voice, deadline)
+            if voice_path:
+                if timing is not None:
+                    timing["voice_duration"] = voice_duration
+                if voice_duration and voice_duration > scene["duration"]:
+                    print(
+                        f"Voiceover of scene {scene['scene_number']} runs {voice_duration:.1f}s, "
+                        f"longer than the {scene['duration']}s scene; it will be cut"
+                    )
+                return voice_path
+        return hedged_call(
+            "elevenlabs",
+            request_shape("text", text=scene["audio"]["voice_text"]),
+            request_voice,
+            hedge=lambda: request_voice("_hedge"),
+            deadline=deadline
+        )
+    except DeadlineExceeded:
+        print(f"Voiceover of scene {scene['scene_number']} missed its deadline, leaving it out")
+        if fallbacks is not None:
+            fallbacks.append("no_voiceover")
+        return None
+    except Exception as e:
+        print(f"Failed to generate voiceover for scene {scene['scene_number']}: {e}")
+        return None
+
+def _generate_music(scene, unique_id, music=None, deadline=None, fallbacks=None):
+    """
+    Generate the scene's background music if specified, or wait for the
+    plan-level music slice when one is provided. Music that misses
+    `deadline` is left out (noted in `fallbacks`).
+    """
+    if not scene["audio"]["background_music"]:
+        return None
+
+    def request_music(suffix=""):
+        return generate_suno_music_and_save(
+            prompt=scene["audio"]["music_description"],
+            unique_id=f"{unique_id}_music{suffix}",
+            genre=scene["audio"]["music_genre"],
+            mood=scene["audio"]["music_mood"],
+            duration_seconds=scene["duration"],
+            save_dir="./assets/audio"
+        )
+
+    try:
+        if music is not None:
+            return _wait(music, deadline)
+        return hedged_call(
+            "suno",
+            request_shape("music", scene["duration"]),
+            request_music,
+            hedge=lambda: request_music("_hedge"),
+            deadline=deadline
+        )
+    except DeadlineExceeded:
+        print(f"Music of scene {scene['scene_number']} missed its deadline, leaving it out")
+        if fallbacks is not None:
+            fallbacks.append("no_music")
+        return None
+    except Exception as e:
+        print(f"Failed to generate music for scene {scene['scene_number']}: {e}")
+        return None
+
+def render_shape(scene, profile=None):
+    """
+    Latency-history shape of a scene render: its type, render profile and duration.
+    """
+    kind = f"{scene['type']}.{get_profile(profile).get('name', 'custom')}"
+    return request_shape(kind, scene["duration"])
+
+def _audio_beds(audio_path, music_path):
+    """
+    Voiceover and music as beds of a single audio graph, music ducked under the voice.
+    """
+    audio_beds = []
+    if audio_path:
+        audio_beds.append({"path": audio_path, "volume": VOICEOVER_VOLUME})
+    if music_path:
+        audio_beds.append({"path": music_path, "volume": MUSIC_VOLUME, "duck": bool(audio_path)})
+    return audio_beds
+
+def process_scene(scene, scene_files=None, lock=None, music=None, workspace=None, assets=None, profile=None,
+                  voice=None, deadline=None):
+    """
+    Process a single scene: generate media, voiceover, music, and apply FFmpeg effects.
+    If scene_files is given, also append the result to it using a thread-safe lock.
+
+    The work runs as a small task graph: media, voiceover and music are fetched
+    in parallel, the video render starts as soon as the media lands, and the
+    audio mix runs once the video and its audio inputs are ready. When the
+    audio is already there by the time the media lands, video and audio are
+    rendered together in a single ffmpeg pass.
+    If the fused graph fails on the scene's effects, the scene is rendered
+    again without them instead of being dropped.
+
+    With a deadline, the inputs must arrive early enough to leave time for
+    the render (and, for video scenes, for the fallback still); provider
+    calls are hedged, and an input that misses its deadline is replaced
+    (VIDEO_DEADLINE_FALLBACK) or left out.
+
+    Args:
+        scene (dict): Scene data from the video plan.
+        scene_files (list): Optional shared list to store (file_path, duration) tuples.
+        lock (threading.Lock): Lock for thread-safe access to scene_files.
+        music (concurrent.futures.Future): Optional plan-level music for this
+            scene (see MusicPlanner); replaces the per-scene Suno call.
+        voice (concurrent.futures.Future): Optional plan-level narration for
+            this scene (see VoicePlanner); replaces the per-scene ElevenLabs call.
+        workspace (ScratchWorkspace): Where intermediates and the rendered
+            scene are written. Defaults to ./assets/scenes.
+        assets (dict): Optional dict that receives the generated media,
+            voice and music paths and the voiceover duration (for the run manifest).
+        profile (str or dict): Render profile (e.g. "draft" or "final"). Only
+            the renders depend on it; generated assets are shared.
+        deadline (float): time.monotonic() time by which the scene should be
+            rendered. Fallbacks used to meet it are listed in assets["fallbacks"].
+
+    Returns:
+        tuple or None: (file_path, duration) of the rendered scene, or None on failure.
+    """
+    scene_number = scene["scene_number"]
+    unique_id = str(uuid.uuid4())  # Generate unique ID using UUID
+    print(f"Processing scene {scene_number} in thread {threading.current_thread().name}...")
+
+    is_image = scene["type"] == "image"
+    effects = scene["ffmpeg_effects"]
+    duration = scene["duration"]
+    graph = TaskGraph(name=f"scene{scene_number}")
+    timing = {}
+    fallbacks = []
+    # Effects actually rendered; emptied when the fused graph fails on them
+    applied_effects = list(effects)
+
+    # Inputs are due early enough to leave time for the render, and for video
+    # scenes also for generating and rendering the fallback still
+    media_deadline = audio_deadline = still_deadline = None
+    if deadline is not None:
+        audio_deadline = deadline - latency_history.percentile("render", render_shape(scene, profile))
+        media_deadline = audio_deadline
+        if scene["type"] == "video" and VIDEO_DEADLINE_FALLBACK == "still":
+            # The fallback still must land early enough to leave time for its own render
+            still_deadline = deadline - latency_history.percentile(
+                "render", render_shape(dict(scene, type="image"), profile)
             )
-        except Exception as e:
-            print(f"Failed to generate voiceover for scene {scene_number}: {e}")
+            media_deadline = still_deadline - latency_history.percentile("leonardo", request_shape("image"))
 
-    # Generate background music if specified
-    music_path = None
-    if scene["audio"]["background_music"]:
+    def fetch_media():
+        nonlocal is_image
         try:
-            music_path = generate_suno_music_and_save(
-                prompt=scene["audio"]["music_description"],
-                unique_id=f"{unique_id}_music",
-                genre=scene["audio"]["music_genre"],
-                mood=scene["audio"]["music_mood"],
-                duration_seconds=scene["duration"],
-                save_dir="./assets/audio"
-            )
-        except Exception as e:
-            print(f"Failed to generate music for scene {scene_number}: {e}")
+            return _generate_media(scene, unique_id, media_deadline)
+        except DeadlineExceeded:
+            if scene["type"] != "video" or VIDEO_DEADLINE_FALLBACK != "still":
+                print(f"Media for scene {scene_number} missed its deadline")
+                return None
+            print(f"Video for scene {scene_number} missed its deadline, falling back to a still image")
+            fallbacks.append("video_to_still")
+            is_image = True
+            return _generate_fallback_still(scene, unique_id, still_deadline)
+
+    def scratch_path(name):
+        if workspace is None:
+            return os.path.join("./assets/scenes", name)
+        return workspace.file(name)
+
+    def written(path):
+        if workspace is not None:
+            workspace.check_budget()
+        return path
 
-    # Apply FFmpeg effects
-    current_media_path = media_path
-    for effect in scene["ffmpeg_effects"]:
-        output_path = f"./assets/scenes/{unique_id}_effect_{effect}.mp4"
+    def with_effects(render):
+        # One bad effect fails the whole fused graph, so retry the scene without
+        # effects rather than dropping it
+        nonlocal applied_effects
         try:
-            if effect == "fade_in":
-                current_media_path = fade_in(current_media_path, duration=2, output_path=output_path)
-            elif effect == "fade_out":
-                current_media_path = fade_out(current_media_path, duration=2, output_path=output_path)
-            elif effect == "grayscale":
-                current_media_path = apply_grayscale(current_media_path, output_path=output_path)
-            elif effect == "zoom_in":
-                current_media_path = zoom_in(current_media_path, zoom_factor=1.5, duration=scene["duration"], output_path=output_path)
-            elif effect == "speed_up":
-                current_media_path = speed_up(current_media_path, speed_factor=1.2, output_path=output_path)
+            return render(applied_effects)
         except Exception as e:
-            print(f"Error applying effect {effect} to scene {scene_number}: {e}")
-            continue
+            if not applied_effects:
+                raise
+            print(f"Error applying effects {applied_effects} to scene {scene_number}: {e}; rendering without effects")
+            applied_effects = []
+            return render(applied_effects)
 
-    # Combine audio (voiceover and/or music) with video/image
-    final_scene_path = f"./assets/scenes/{unique_id}_final.mp4"
-    try:
-        if audio_path and music_path:
-            # First add voiceover
-            temp_path = f"./assets/scenes/{unique_id}_temp.mp4"
-            add_background_music(current_media_path, audio_path, temp_path, video_volume=1.0, audio_volume=0.7)
-            # Then add background music
-            add_background_music(temp_path, music_path, final_scene_path, video_volume=1.0, audio_volume=0.3)
-        elif audio_path:
-            add_background_music(current_media_path, audio_path, final_scene_path, video_volume=1.0, audio_volume=0.7)
-        elif music_path:
-            add_background_music(current_media_path, music_path, final_scene_path, video_volume=1.0, audio_volume=0.3)
-        else:
-            final_scene_path = current_media_path
-    except Exception as e:
-        print(f"Error combining audio for scene {scene_number}: {e}")
-        return
+    def render_video(media_path):
+        if not media_path:
+            return None
+
+        # Stills are rendered with motion and audio straight to the concat format
+        if is_image:
+            if graph.is_done("voice") and graph.is_done("music"):
+                audio_beds = _audio_beds(graph.result("voice"), graph.result("music"))
+                final = True
+            else:
+                audio_beds = []
+                final = False
+            # The intermediate only feeds mux_audio's stream copy, so NUT is enough
+            video_path = with_effects(lambda scene_effects: render_still(
+                media_path,
+                scratch_path(f"{unique_id}_final.mp4" if final else f"{unique_id}_still.nut"),
+                duration=duration,
+                effects=scene_effects,
+                audio_beds=audio_beds,
+                pan=scene_pan(scene),
+                profile=profile
+            ))
+            return {"path": written(video_path), "final": final, "source_audio": None}
+
+        keep_source_audio = has_audio_stream(media_path)
+
+        # Audio already landed: render effects and audio mix in one pass
+        if graph.is_done("voice") and graph.is_done("music"):
+            audio_beds = _audio_beds(graph.result("voice"), graph.result("music"))
+            if effects or audio_beds:
+                final_scene_path = scratch_path(f"{unique_id}_final.mp4")
+                with_effects(lambda scene_effects: render_scene(
+                    media_path,
+                    final_scene_path,
+                    duration=duration,
+                    effects=scene_effects,
+                    audio_beds=audio_beds,
+                    keep_source_audio=keep_source_audio,
+                    profile=profile
+                ))
+                return {"path": written(final_scene_path), "final": True}
+            return {"path": media_path, "final": True}
+
+        # Otherwise render the video now and mix the audio when it arrives
+        video_path = media_path
+        if effects:
+            video_path = written(with_effects(lambda scene_effects: apply_effects(
+                media_path,
+                scene_effects,
+                duration=duration,
+                output_path=scratch_path(f"{unique_id}_effects.nut"),
+                profile=profile
+            ) if scene_effects else media_path))
+        return {
+            "path": video_path,
+            "final": False,
+            "source_audio": media_path if keep_source_audio else None
+        }
+
+    def mix_audio(video, audio_path, music_path):
+        if not video:
+            return None
+        if video["final"]:
+            return video["path"]
+
+        audio_beds = _audio_beds(audio_path, music_path)
+        # speed_up does not apply to stills
+        video_duration = duration if is_image else effects_duration(applied_effects, duration)
+        if video["source_audio"]:
+            audio_beds.insert(0, {"path": video["source_audio"], "tempo": duration / video_duration})
+        if not audio_beds:
+            return video["path"]
+
+        final_scene_path = written(mux_audio(
+            video["path"], scratch_path(f"{unique_id}_final.mp4"), video_duration, audio_beds, profile=profile
+        ))
+        if workspace is not None:
+            workspace.release(video["path"])
+        return final_scene_path
+
+    graph.add("media", fetch_media)
+    graph.add("voice", lambda: _generate_voiceover(scene, unique_id, voice, timing, audio_deadline, fallbacks))
+    graph.add("music", lambda: _generate_music(scene, unique_id, music, audio_deadline, fallbacks))
+    def timed_render(media_path):
+        if not media_path:
+            return None
+        # Render time feeds the scene cost estimates of the scheduler
+        rendered_as = dict(scene, type="image") if is_image else scene
+        return latency_history.timed_call("render", render_shape(rendered_as, profile), render_video, media_path)
+
+    graph.add("video", timed_render, deps=("media",))
+    graph.add("scene", mix_audio, deps=("video", "voice", "music"))
+
+    with tracer.span("process_scene", category="scene", scene_number=scene_number, type=scene["type"]):
+        results = graph.run()
+    final_scene_path = results["scene"]
+    if assets is not None:
+        assets.update(media=results["media"], voice=results["voice"], music=results["music"], **timing)
+        if fallbacks:
+            assets["fallbacks"] = fallbacks
+    if not final_scene_path:
+        print(f"Error rendering scene {scene_number}")
+        return None
+
+    result = (final_scene_path, duration)
 
     # Append result to scene_files with thread-safe lock
-    with lock:
-        scene_files.append((final_scene_path, scene["duration"]))
\ No newline at end of file
+    if scene_files is not None:
+        with lock:
+            scene_files.append(result)
+    return result
@@ -0,0 +1,192 @@
+import os
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from video_processing.scene_processor import process_scene, render_shape
+from instrumentation.latency import latency_history, request_shape
+
+DEFAULT_SCENE_WORKERS = 8
+
+def scene_cost(scene, profile=None, history=latency_history):
+    """
+    Estimated seconds from starting a scene to its rendered clip.
+
+    Media, voiceover and music are fetched in parallel, so the scene's
+    critical path is the slowest of them followed by the render. Each part
+    is estimated from the latency history of its provider and request shape.
+
+    Args:
+        scene (dict): Scene data from the video plan.
+        profile (str or dict): Render profile of the scene.
+        history (LatencyHistory): Where the estimates come from.
+
+    Returns:
+        float: Seconds.
+    """
+    audio = scene.get("audio", {})
+    if scene.get("type") == "video":
+        inputs = [history.estimate("veo3", request_shape("video", scene["duration"]))]
+    else:
+        inputs = [history.estimate("leonardo", request_shape("image"))]
+    if audio.get("voiceover"):
+        inputs.append(history.estimate("elevenlabs", request_shape("text", text=audio.get("voice_text") or "")))
+    if audio.get("background_music"):
+        inputs.append(history.estimate("suno", request_shape("music", scene["duration"])))
+    return max(inputs) + history.estimate("render", render_shape(scene, profile))
+
+class SceneScheduler:
+    """
+    Run scenes on a bounded worker pool.
+
+    Provider calls made by the scenes are additionally capped and rate limited
+    per provider (see ai_services.limits), so extra scenes queue instead of
+    bursting requests at the APIs. Results come back in scene_number order,
+    independent of which scene finished first; on_result(scene, result) is
+    also called from the worker as soon as each scene succeeds.
+
+    Passing `pool` runs the scenes on a shared executor instead (e.g. one
+    bounded pool for every job of a batch); shutdown() then only waits for
+    this scheduler's scenes.
+
+    Scenes still queued when `cancel_event` is set are skipped (they resolve
+    to None); scenes already running are left to finish.
+
+    At most max_workers scenes run at once. When more are waiting, the one
+    with the longest estimated critical path (see scene_cost) starts first,
+    so slow video generations are not left for the end of the run. eta()
+    estimates the time until every submitted scene is done.
+    """
+
+    def __init__(self, max_workers=None, process_fn=process_scene, on_result=None, pool=None, cancel_event=None,
+                 cost_fn=scene_cost):
+        self.max_workers = max_workers or int(os.getenv("SCENE_WORKERS", DEFAULT_SCENE_WORKERS))
+        self.process_fn = process_fn
+        self.on_result = on_result
+        self.cancel_event = cancel_event
+        self.cost_fn = cost_fn
+        self._owns_pool = pool is None
+        self._pool = pool or ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scene")
+        self._futures = {}
+        self._waiting = []
+        self._running = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def submit(self, scene, **kwargs):
+        """
+        Queue a scene for processing.
+
+        Args:
+            scene (dict): Scene data from the video plan.
+            **kwargs: Extra arguments for the process function (e.g. music).
+
+        Returns:
+            concurrent.futures.Future: Resolves to (file_path, duration) or None.
+        """
+        future = Future()
+        cost = self.cost_fn(scene, kwargs.get("profile"))
+        with self._lock:
+            # Longest estimate first; plan order among equal estimates
+            heapq.heappush(self._waiting, (-cost, next(self._order), scene, kwargs, future))
+            self._futures[scene["scene_number"]] = future
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while self._waiting and len(self._running) < self.max_workers:
+                negative_cost, _, scene, kwargs, future = heapq.heappop(self._waiting)
+                self._running[scene["scene_number"]] = (time.monotonic(), -negative_cost)
+                started.append((scene, kwargs, future))
+        for scene, kwargs, future in started:
+            self._pool.submit(self._run, scene, kwargs).add_done_callback(
+                lambda done, scene=scene, future=future: self._finished(scene, done, future)
+            )
+
+    def _finished(self, scene, done, future):
+        with self._lock:
+            self._running.pop(scene["scene_number"], None)
+        self._dispatch()
+        future.set_result(None if done.cancelled() or done.exception() else done.result())
+
+    def eta(self):
+        """
+        Estimated seconds until every submitted scene is done.
+
+        Replays the dispatch order over max_workers slots, with the running
+        scenes' remaining estimates and the waiting scenes' full estimates.
+
+        Returns:
+            float: Seconds (0 when nothing is left).
+        """
+        now = time.monotonic()
+        with self._lock:
+            slots = [max(cost - (now - started), 0.0) for started, cost in self._running.values()]
+            waiting = sorted((-negative_cost for negative_cost, *_ in self._waiting), reverse=True)
+        if not slots and not waiting:
+            return 0.0
+        slots += [0.0] * max(self.max_workers - len(slots), 0)
+        heapq.heapify(slots)
+        for cost in waiting:
+            heapq.heappush(slots, heapq.heappop(slots) + cost)
+        return max(slots)
+
+    def _run(self, scene, kwargs):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            print(f"Skipping scene {scene['scene_number']}: job cancelled")
+            return None
+        try:
+            result = self.process_fn(scene, **kwargs)
+        except Exception as e:
+            print(f"Unexpected error processing scene {scene['scene_number']}: {e}")
+            return None
+        if result and self.on_result:
+            # Hand the scene on (e.g. to assembly) as soon as it is done
+            try:
+                self.on_result(scene, result)
+            except Exception as e:
+                print(f"Error handing off scene {scene['scene_number']}: {e}")
+        return result
+
+    def results(self):
+        """
+        Wait for every submitted scene and return the successful ones.
+
+        Returns:
+            list: (file_path, duration) tuples ordered by scene_number.
+        """
+        with self._lock:
+            futures = dict(self._futures)
+        wait(futures.values())
+        ordered = [futures[number].result() for number in sorted(futures)]
+        return [result for result in ordered if result]
+
+    def shutdown(self):
+        with self._lock:
+            futures = list(self._futures.values())
+        wait(futures)
+        if self._owns_pool:
+            self._pool.shutdown(wait=True)
+
+def run_scenes(scenes, max_workers=None, on_result=None):
+    """
+    Process all scenes of a plan and return their results in scene order.
+
+    Args:
+        scenes (list): Scene dicts from the video plan.
+        max_workers (int): Maximum number of scenes in flight.
+        on_result (callable): Optional callback(scene, result) per finished scene.
+
+    Returns:
+        list: (file_path, duration) tuples ordered by scene_number.
+    """
+    scheduler = SceneScheduler(max_workers=max_workers, on_result=on_result)
+    try:
+        for scene in scenes:
+            scheduler.submit(scene)
+        return scheduler.results()
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,85 @@
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from instrumentation.tracing import tracer
+
+class TaskGraph:
+    """
+    Small dependency graph of tasks run on a thread pool.
+
+    Each task starts as soon as all of its dependencies have finished and is
+    called with their results as positional arguments, in the order the
+    dependencies were declared. A task that raises is logged and yields None.
+    """
+
+    def __init__(self, name="graph"):
+        self.name = name
+        self._tasks = {}
+        self._futures = {}
+
+    def add(self, name, fn, deps=()):
+        """
+        Add a task to the graph.
+
+        Args:
+            name (str): Unique task name.
+            fn (callable): Called with the results of `deps`.
+            deps (tuple): Names of tasks that must finish first.
+        """
+        self._tasks[name] = (fn, tuple(deps))
+
+    def is_done(self, name):
+        """
+        Check whether a task has already finished.
+        """
+        future = self._futures.get(name)
+        return future is not None and future.done()
+
+    def result(self, name):
+        """
+        Result of a finished task (None if it failed).
+        """
+        future = self._futures[name]
+        return None if future.exception() else future.result()
+
+    def _run_task(self, name, fn, args):
+        with tracer.span(name, category="task", graph=self.name):
+            return fn(*args)
+
+    def run(self):
+        """
+        Run every task and wait for the graph to finish.
+
+        Returns:
+            dict: Task name -> result.
+        """
+        for name, (_, deps) in self._tasks.items():
+            missing = [dep for dep in deps if dep not in self._tasks]
+            if missing:
+                raise ValueError(f"Task {name} depends on unknown tasks {missing}")
+
+        results = {}
+        pending = dict(self._tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=len(self._tasks) or 1, thread_name_prefix=self.name) as pool:
+            while pending or running:
+                for name, (fn, deps) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        future = pool.submit(self._run_task, name, fn, [results[dep] for dep in deps])
+                        self._futures[name] = future
+                        running[future] = name
+                        del pending[name]
+
+                if not running:
+                    raise ValueError(f"Dependency cycle between tasks {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error:
+                        print(f"Task {name} in {self.name} failed: {error}")
+                        traceback.print_exception(type(error), error, error.__traceback__)
+                        results[name] = None
+                    else:
+                        results[name] = future.result()
+        return results
@@ -0,0 +1,127 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+
+# Scratch space for intermediates; point SCRATCH_DIR at a tmpfs (e.g. /dev/shm) to keep them off disk
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", "./assets/temp")
+SCRATCH_MAX_BYTES = int(os.getenv("SCRATCH_MAX_BYTES", 8 * 1024 ** 3))
+PID_FILE = ".owner_pid"
+
+class ScratchBudgetExceeded(RuntimeError):
+    """
+    Raised when a job's scratch workspace grows past its byte budget.
+    """
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def sweep_stale_workspaces(root=SCRATCH_DIR):
+    """
+    Remove workspaces left behind by processes that died without cleaning up.
+    """
+    if not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        pid_path = os.path.join(entry.path, PID_FILE)
+        if not entry.is_dir() or not os.path.exists(pid_path):
+            continue
+        try:
+            with open(pid_path) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if not _pid_alive(pid):
+            print(f"Removing stale scratch workspace {entry.path}")
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+class ScratchWorkspace:
+    """
+    Per-job directory for intermediate files, with a byte budget and guaranteed cleanup.
+
+    The directory is created under `root` and removed when the workspace is
+    closed, when the with-block exits (also on errors), or at interpreter
+    exit. Workspaces orphaned by a killed process are swept the next time a
+    workspace is created under the same root.
+    """
+
+    def __init__(self, root=SCRATCH_DIR, max_bytes=SCRATCH_MAX_BYTES, name="job"):
+        os.makedirs(root, exist_ok=True)
+        sweep_stale_workspaces(root)
+        self.path = tempfile.mkdtemp(prefix=f"{name}_", dir=root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        with open(os.path.join(self.path, PID_FILE), "w") as f:
+            f.write(str(os.getpid()))
+        atexit.register(self.cleanup)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def file(self, name):
+        """
+        Path for an intermediate file inside the workspace.
+        """
+        return os.path.join(self.path, name)
+
+    def owns(self, path):
+        """
+        Check whether a path lies inside the workspace.
+        """
+        return bool(path) and os.path.abspath(path).startswith(os.path.abspath(self.path) + os.sep)
+
+    def usage(self):
+        """
+        Bytes currently used by the workspace.
+        """
+        total = 0
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        return total
+
+    def check_budget(self):
+        """
+        Raise ScratchBudgetExceeded if the workspace is over its byte budget.
+        Call after writing an intermediate.
+        """
+        with self._lock:
+            used = self.usage()
+        if used > self.max_bytes:
+            raise ScratchBudgetExceeded(
+                f"Scratch workspace {self.path} uses {used} bytes, over its budget of {self.max_bytes}"
+            )
+
+    def release(self, *paths):
+        """
+        Delete intermediates that are no longer needed, before the job ends.
+        """
+        for path in paths:
+            if self.owns(path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error deleting {path}: {e}")
+
+    def cleanup(self):
+        """
+        Remove the workspace and everything in it.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        atexit.unregister(self.cleanup)